@@ -0,0 +1,256 @@
+# Throughput and latency benchmark for process_images_to_pdf (single and
+# separate mode) and extend_document over synthetic corpora. Results are written
+# as JSON; pass --baseline with an earlier results file to compare against it.
+#
+#   python -m benchmarks.bench_converters [--quick] [--repeat N] [--workers N]
+#       [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+#       [--only PATTERN]
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import PIL
+from PIL import Image
+
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.extender import extend_document
+
+# name -> (format, mode, size, count)
+CORPORA = {
+    "rgb-png-small-many": ("PNG", "RGB", (320, 240), 200),
+    "rgba-png-small-many": ("PNG", "RGBA", (320, 240), 200),
+    "p-png-small-many": ("PNG", "P", (320, 240), 200),
+    "l-png-small-many": ("PNG", "L", (320, 240), 200),
+    "jpeg-small-many": ("JPEG", "RGB", (320, 240), 200),
+    "rgb-png-large-few": ("PNG", "RGB", (2480, 3508), 6),
+    "rgba-png-large-few": ("PNG", "RGBA", (2480, 3508), 6),
+    "jpeg-large-few": ("JPEG", "RGB", (2480, 3508), 6),
+}
+QUICK_SCALE = 4
+
+
+def _make_image(mode, size, seed):
+    # Gradient plus noise: smooth regions and detail, so encoders do real work
+    gradient = Image.linear_gradient("L").resize(size).rotate(seed * 37 % 360)
+    noise = Image.effect_noise(size, 24 + seed % 16)
+    base = Image.blend(gradient, noise, 0.3)
+    if mode == "L":
+        return base
+    rgb = Image.merge("RGB", [base, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient])
+    if mode == "RGB":
+        return rgb
+    if mode == "RGBA":
+        return Image.merge("RGBA", [*rgb.split(), gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM)])
+    return rgb.quantize(64)
+
+
+def build_corpus(root, name, quick):
+    fmt, mode, size, count = CORPORA[name]
+    if quick:
+        size = (max(16, size[0] // QUICK_SCALE), max(16, size[1] // QUICK_SCALE))
+        count = max(2, count // QUICK_SCALE)
+    directory = root / name
+    directory.mkdir(parents=True)
+    suffix = ".jpg" if fmt == "JPEG" else ".png"
+    paths = []
+    for i in range(count):
+        path = directory / f"{i:04d}{suffix}"
+        _make_image(mode, size, i).save(path, fmt)
+        paths.append(path)
+    return paths
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _output_bytes(directory):
+    return sum(p.stat().st_size for p in directory.rglob("*.pdf"))
+
+
+def _run_convert(paths, out_dir, mode, workers, streaming):
+    # Per-page latency is the gap between consecutive pages finishing
+    finished = []
+
+    def status(_path, text, _color):
+        if text in ("✔", "✖"):
+            finished.append(time.perf_counter())
+
+    started = time.perf_counter()
+    converted, skipped = process_images_to_pdf(
+        png_paths=[str(p) for p in paths],
+        output_dir=out_dir,
+        output_mode=mode,
+        ask_overwrite_callback=MagicMock(return_value="overwrite"),
+        get_new_name_callback=MagicMock(),
+        update_status_callback=status,
+        update_overall_progress_callback=lambda *_args: None,
+        options=ConversionOptions(streaming=streaming, workers=workers),
+    )
+    elapsed = time.perf_counter() - started
+    if skipped:
+        raise RuntimeError(f"{skipped} images were skipped")
+    latencies = [b - a for a, b in zip([started] + finished, finished)]
+    return elapsed, latencies
+
+
+def _run_extend(paths, out_dir, base_pdf):
+    started = time.perf_counter()
+    extend_document(
+        base_path=base_pdf,
+        base_type="pdf",
+        attachment_paths=paths,
+        output_dir=out_dir,
+        output_filename="extended.pdf",
+        temp_dir=out_dir / "work",
+        rename_base_to_original=False,
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, [elapsed / len(paths)] * len(paths)
+
+
+def scenarios(workers):
+    yield "single-legacy", lambda paths, out, base: _run_convert(paths, out, "single", 1, False)
+    yield "single-streaming", lambda paths, out, base: _run_convert(paths, out, "single", 1, True)
+    if workers > 1:
+        yield f"single-streaming-{workers}w", lambda paths, out, base: _run_convert(paths, out, "single", workers, True)
+    yield "separate", lambda paths, out, base: _run_convert(paths, out, "separate", 1, False)
+    if workers > 1:
+        yield f"separate-{workers}w", lambda paths, out, base: _run_convert(paths, out, "separate", workers, False)
+    yield "extend", lambda paths, out, base: _run_extend(paths, out, base)
+
+
+def run_benchmarks(root, quick, repeat, workers, only):
+    base_pdf = root / "base.pdf"
+    Image.new("RGB", (850, 1100), "white").save(base_pdf, "PDF")
+
+    results = []
+    for corpus in CORPORA:
+        scenario_list = [(s, run) for s, run in scenarios(workers) if fnmatch.fnmatch(f"{corpus}/{s}", only)]
+        if not scenario_list:
+            continue
+        paths = build_corpus(root / "corpora", corpus, quick)
+        input_bytes = sum(p.stat().st_size for p in paths)
+
+        for scenario, run in scenario_list:
+            timings = []
+            latencies = []
+            output_bytes = 0
+            for _ in range(repeat):
+                out_dir = root / "out"
+                out_dir.mkdir()
+                elapsed, page_latencies = run(paths, out_dir, base_pdf)
+                output_bytes = _output_bytes(out_dir)
+                shutil.rmtree(out_dir)
+                timings.append(elapsed)
+                latencies.extend(page_latencies)
+
+            seconds = statistics.median(timings)
+            result = {
+                "name": f"{corpus}/{scenario}",
+                "corpus": corpus,
+                "scenario": scenario,
+                "images": len(paths),
+                "input_bytes": input_bytes,
+                "seconds": round(seconds, 6),
+                "images_per_second": round(len(paths) / seconds, 3),
+                "mb_per_second": round(input_bytes / seconds / 1e6, 3),
+                "latency_ms": {
+                    "p50": round(_percentile(latencies, 0.5) * 1000, 3),
+                    "p95": round(_percentile(latencies, 0.95) * 1000, 3),
+                    "max": round(max(latencies) * 1000, 3),
+                },
+                "output_bytes": output_bytes,
+            }
+            results.append(result)
+            print(
+                f"{result['name']:<42} {result['images_per_second']:>9.1f} img/s {result['mb_per_second']:>8.2f} MB/s "
+                f"p50 {result['latency_ms']['p50']:>8.2f} ms p95 {result['latency_ms']['p95']:>8.2f} ms "
+                f"{output_bytes / 1e6:>8.2f} MB out",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Returns the names whose throughput dropped by more than threshold
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<42} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        change = result["images_per_second"] / before["images_per_second"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print(
+            f"{result['name']:<42} {before['images_per_second']:>10.1f} {result['images_per_second']:>10.1f} "
+            f"{change:>+7.1%}{flag}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core converters")
+    parser.add_argument("--quick", action="store_true", help="smaller images and fewer of them")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--only", default="*", help="glob over corpus/scenario names")
+    parser.add_argument("--output", help="write results JSON here (default stdout)")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed throughput drop before failing")
+    parser.add_argument("--keep", help="build corpora and outputs in this directory and keep them")
+    args = parser.parse_args()
+
+    if args.keep:
+        root = Path(args.keep)
+        root.mkdir(parents=True, exist_ok=False)
+        results = run_benchmarks(root, args.quick, args.repeat, args.workers, args.only)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run_benchmarks(Path(tmp), args.quick, args.repeat, args.workers, args.only)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "quick": args.quick,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Micro-benchmark for alpha flattening: the split()/paste() code previously
+# duplicated in the converter and extender against src.core.imaging.flatten_to_rgb.
+# For LA and P images the legacy code only called convert('RGB'), which drops the
+# alpha channel instead of compositing, so those rows are not like-for-like.
+#
+#   python -m benchmarks.bench_flatten [--repeat N]
+
+import argparse
+import time
+
+from PIL import Image
+
+from src.core.imaging import flatten_to_rgb
+
+SIZES = {"4K": (3840, 2160), "8K": (7680, 4320)}
+
+
+def _legacy_flatten(image):
+    if image.mode == "RGBA":
+        rgb_image = Image.new("RGB", image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[3])
+        return rgb_image
+    return image.convert("RGB")
+
+
+def _make_image(mode, size):
+    gradient = Image.linear_gradient("L").resize(size)
+    if mode == "RGBA":
+        return Image.merge("RGBA", [gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient, gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM)])
+    if mode == "LA":
+        return Image.merge("LA", [gradient, gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM)])
+    image = gradient.convert("P")
+    image.info["transparency"] = 0
+    return image
+
+
+def _best_of(func, image, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':<4} {'mode':<5} {'legacy ms':>10} {'shared ms':>10} {'speedup':>8}")
+    for label, size in SIZES.items():
+        for mode in ("RGBA", "LA", "P"):
+            image = _make_image(mode, size)
+            image.load()
+            legacy = _best_of(_legacy_flatten, image, args.repeat)
+            shared = _best_of(flatten_to_rgb, image, args.repeat)
+            print(f"{label:<4} {mode:<5} {legacy * 1000:>10.1f} {shared * 1000:>10.1f} {legacy / shared:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
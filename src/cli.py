@@ -0,0 +1,403 @@
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.core.admission import ALONE, DOWNSCALE, AdmissionController
+from src.core.batch_extend import FAILED, JobResult, extend_batch, load_manifest
+from src.core.conflicts import OutputPlanner
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.imaging import PAGE_SIZES
+from src.core.journal import JobControl, JobJournal
+from src.core.naming import OutputNameAllocator
+from src.core.page_cache import PageCache, default_cache_dir
+from src.core.stats import ConversionStats
+from src.core.watcher import FolderWatcher
+
+
+# Headless entry points: python -m src.cli convert|watch|extend-batch ... Only
+# src.core is imported here, never tkinter, so it starts quickly and runs
+# without a display.
+# Results are printed to stdout as JSON; progress goes to stderr with --verbose.
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tiff", ".tif", ".gif"}
+
+
+def _is_image(path: Path) -> bool:
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def _directory_images(directory: Path, recursive: bool) -> List[Path]:
+    pattern = "**/*" if recursive else "*"
+    return sorted(p for p in directory.glob(pattern) if p.is_file() and _is_image(p))
+
+
+def collect_inputs(patterns: Iterable[str], file_list: Optional[str] = None, recursive: bool = False) -> List[str]:
+    # Expands files, directories and glob patterns in the order given; a file
+    # list holds one path per line ("-" reads stdin). Duplicates keep their first
+    # position.
+    specs = list(patterns)
+    if file_list is not None:
+        fp = sys.stdin if file_list == "-" else open(file_list, encoding="utf-8")
+        try:
+            specs.extend(line.strip() for line in fp if line.strip() and not line.startswith("#"))
+        finally:
+            if fp is not sys.stdin:
+                fp.close()
+
+    found: List[str] = []
+    seen: Set[str] = set()
+    for spec in specs:
+        path = Path(spec)
+        if path.is_dir():
+            matches = _directory_images(path, recursive)
+        elif glob.has_magic(spec):
+            matches = sorted(Path(p) for p in glob.glob(spec, recursive=recursive) if _is_image(Path(p)))
+        else:
+            matches = [path] # Missing files are reported as failed by the converter
+        for match in matches:
+            key = os.path.abspath(match)
+            if key not in seen:
+                seen.add(key)
+                found.append(str(match))
+    return found
+
+
+def _page_size(value: str):
+    if value.lower() in PAGE_SIZES:
+        return PAGE_SIZES[value.lower()]
+    try:
+        width, height = (float(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(PAGE_SIZES)} or WIDTHxHEIGHT in points")
+    return width, height
+
+
+class _Reporter:
+    # Collects per-file outcomes from the converter's callbacks and answers its
+    # overwrite/rename questions from the --on-conflict policy.
+    def __init__(self, on_conflict: str, verbose: bool) -> None:
+        self.on_conflict = on_conflict
+        self.verbose = verbose
+        self.files: Dict[str, str] = {}
+        self._allocators: Dict[Path, OutputNameAllocator] = {}
+
+    def ask_overwrite(self, _png_path, _pdf_path) -> str:
+        return self.on_conflict
+
+    def new_name(self, pdf_path: Path) -> Path:
+        # Names handed out in this run count as taken even before they are
+        # written. So does pdf_path, which the converter only asks to replace
+        # because it is taken, perhaps by a write that has not happened yet.
+        allocator = self._allocators.get(pdf_path.parent)
+        if allocator is None:
+            allocator = self._allocators[pdf_path.parent] = OutputNameAllocator(pdf_path.parent)
+        return allocator.allocate(pdf_path, reserve=False, taken=(pdf_path,))
+
+    def status(self, file_path, status_text: str, color: str) -> None:
+        if status_text == "✔":
+            self.files[str(file_path)] = "converted"
+        elif status_text == "✖":
+            self.files[str(file_path)] = "skipped" if color == "orange" else "failed"
+        else:
+            self.files.setdefault(str(file_path), "pending")
+            return
+        if self.verbose:
+            print(f"{self.files[str(file_path)]}: {file_path}", file=sys.stderr)
+
+    def progress(self, text: str, _current, _total) -> None:
+        if self.verbose:
+            print(text, file=sys.stderr)
+
+
+@contextlib.contextmanager
+def _stop_on_signals(stop):
+    # Ctrl+C and SIGTERM call stop() instead of raising, for the duration
+    previous = {signum: signal.signal(signum, lambda _signum, _frame: stop()) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        yield
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def _page_cache(args: argparse.Namespace) -> Optional[PageCache]:
+    if not args.cache:
+        return None
+    return PageCache(args.cache_dir or default_cache_dir())
+
+
+def _admission(args: argparse.Namespace) -> Optional[AdmissionController]:
+    if not args.memory_budget:
+        return None
+    return AdmissionController(int(args.memory_budget * 1024 * 1024), args.oversize)
+
+
+def _convert(
+    args: argparse.Namespace,
+    inputs: List[str],
+    output_dir: Path,
+    reporter: _Reporter,
+    stats: ConversionStats,
+    page_cache: Optional[PageCache],
+    single_pdf_filename: str,
+    pool: Optional[Executor] = None,
+    journal: Optional[JobJournal] = None,
+    control: Optional[JobControl] = None,
+):
+    # Separate outputs are all named before anything is converted, so inputs
+    # sharing a stem never race for one name across workers
+    output_plan = None
+    if args.mode == "separate":
+        output_plan = OutputPlanner(inputs, output_dir, "separate").plan(args.on_conflict)
+    return process_images_to_pdf(
+        png_paths=inputs,
+        output_dir=output_dir,
+        output_mode=args.mode,
+        ask_overwrite_callback=reporter.ask_overwrite,
+        get_new_name_callback=reporter.new_name,
+        update_status_callback=reporter.status,
+        update_overall_progress_callback=reporter.progress,
+        single_pdf_filename=single_pdf_filename,
+        auto_rename_if_exists=args.on_conflict == "rename",
+        options=ConversionOptions(
+            workers=args.workers,
+            stats=stats,
+            target_dpi=args.target_dpi,
+            page_size=args.page_size,
+            page_cache=page_cache,
+            incremental=getattr(args, "incremental", False),
+            pool=pool,
+            journal=journal,
+            control=control,
+            output_plan=output_plan,
+            admission=_admission(args),
+        ),
+    )
+
+
+def run_convert(args: argparse.Namespace) -> int:
+    inputs = collect_inputs(args.inputs, args.file_list, args.recursive)
+    if not inputs:
+        print("no input images found", file=sys.stderr)
+        return 2
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    page_cache = _page_cache(args)
+
+    # Ctrl+C or SIGTERM stops after the files in progress; with --journal a
+    # rerun of the same command picks up where this one stopped.
+    control = JobControl()
+    journal = JobJournal(args.journal) if args.journal else None
+
+    reporter = _Reporter(args.on_conflict, args.verbose)
+    stats = ConversionStats()
+    started = time.perf_counter()
+    with _stop_on_signals(control.cancel):
+        converted, skipped = _convert(args, inputs, output_dir, reporter, stats, page_cache, args.name, None, journal, control)
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "mode": args.mode,
+        "output_dir": str(output_dir),
+        "inputs": len(inputs),
+        "converted": converted,
+        "skipped": skipped,
+        "failed": sum(1 for status in reporter.files.values() if status == "failed"),
+        "cancelled": control.cancelled,
+        "elapsed_seconds": round(elapsed, 3),
+        "pages": {
+            "passthrough": stats.passthrough_pages,
+            "encoded": stats.encoded_pages,
+            "reused": stats.reused_pages,
+            "resumed": stats.resumed_inputs,
+        },
+        "files": [{"path": path, "status": reporter.files.get(path, "pending")} for path in inputs],
+    }
+    if page_cache is not None:
+        summary["cache"] = page_cache.stats()
+    json.dump(summary, sys.stdout, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+    if control.cancelled:
+        return 130
+    return 1 if summary["failed"] else 0
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"not a directory: {directory}", file=sys.stderr)
+        return 2
+    output_dir = Path(args.output_dir or directory)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    page_cache = _page_cache(args)
+
+    # One process pool for the daemon's lifetime; workers are recycled now and
+    # then so nothing they accumulate can grow without bound.
+    pool = None
+    if args.mode == "separate" and args.workers > 1:
+        pool_options = {"max_tasks_per_child": 500} if sys.version_info >= (3, 11) else {}
+        pool = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"), **pool_options)
+
+    def convert_batch(paths: List[str]) -> Dict[str, str]:
+        reporter = _Reporter(args.on_conflict, args.verbose)
+        name = time.strftime(args.name)
+        _convert(args, paths, output_dir, reporter, ConversionStats(), page_cache, name, pool)
+        return reporter.files
+
+    def report(metrics: Dict[str, float]) -> None:
+        print(json.dumps(dict(metrics, source=watcher.source_name)), flush=True)
+
+    watcher = FolderWatcher(
+        directory,
+        convert_batch,
+        IMAGE_EXTENSIONS,
+        settle_seconds=args.settle,
+        batch_window=args.batch_window,
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.poll,
+        include_existing=args.include_existing,
+        processed_dir=args.processed_dir,
+        report=report,
+        report_interval=args.report_interval,
+    )
+    try:
+        with _stop_on_signals(watcher.stop):
+            metrics = watcher.run()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return 1 if metrics.files_failed else 0
+
+
+def run_extend_batch(args: argparse.Namespace) -> int:
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"invalid manifest: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("the manifest has no jobs", file=sys.stderr)
+        return 2
+
+    def report(result: JobResult) -> None:
+        if args.verbose:
+            detail = result.error or f"{result.pages} pages"
+            print(f"[{result.status}] {result.job.output} ({result.seconds:.2f}s): {detail}", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    results, shared = extend_batch(
+        jobs,
+        workers=args.workers,
+        target_dpi=args.target_dpi,
+        page_size=args.page_size,
+        page_cache=_page_cache(args),
+        on_result=report,
+        in_place=args.in_place,
+    )
+    elapsed = time.perf_counter() - started
+
+    failed = sum(1 for result in results if result.status == FAILED)
+    summary = {
+        "manifest": str(args.manifest),
+        "jobs": len(jobs),
+        "succeeded": len(jobs) - failed,
+        "failed": failed,
+        "shared_attachments": len(shared),
+        "elapsed_seconds": round(elapsed, 3),
+        "results": [
+            {
+                "base": str(result.job.base),
+                "output": str(result.job.output),
+                "status": result.status,
+                "pages": result.pages,
+                "seconds": round(result.seconds, 3),
+                "error": result.error,
+            }
+            for result in results
+        ],
+    }
+    json.dump(summary, sys.stdout, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+    return 1 if failed else 0
+
+
+def _add_conversion_arguments(parser: argparse.ArgumentParser, mode: str, name: str) -> None:
+    parser.add_argument("-m", "--mode", choices=("single", "separate"), default=mode)
+    parser.add_argument("-n", "--name", default=name, help="file name in single mode")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--on-conflict", choices=("overwrite", "rename", "skip"), default="rename",
+                        help="what to do when an output file already exists")
+    parser.add_argument("--target-dpi", type=float)
+    parser.add_argument("--page-size", type=_page_size, help=f"{', '.join(PAGE_SIZES)} or WIDTHxHEIGHT in points")
+    parser.add_argument("--cache", action="store_true", help="reuse encoded pages across runs")
+    parser.add_argument("--cache-dir", help=f"page cache directory (default {default_cache_dir()})")
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="limit the estimated size of images decoded at once")
+    parser.add_argument("--oversize", choices=(ALONE, DOWNSCALE), default=ALONE,
+                        help="images larger than the budget run alone or are downscaled to fit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="report progress on stderr")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="UtilityBox batch tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="convert images to PDF")
+    convert.add_argument("inputs", nargs="*", help="image files, directories or glob patterns")
+    convert.add_argument("--file-list", help="file with one input per line, or - for stdin")
+    convert.add_argument("-r", "--recursive", action="store_true", help="descend into directories and ** globs")
+    convert.add_argument("-o", "--output-dir", default=".")
+    _add_conversion_arguments(convert, "single", "combined_images.pdf")
+    convert.add_argument("--incremental", action="store_true", help="single mode: re-encode only changed inputs")
+    convert.add_argument("--journal", help="separate mode: record finished inputs here and skip them when rerun")
+    convert.add_argument("--pretty", action="store_true", help="indent the JSON summary")
+    convert.set_defaults(func=run_convert)
+
+    watch = subparsers.add_parser("watch", help="convert images as they arrive in a directory")
+    watch.add_argument("directory")
+    watch.add_argument("-o", "--output-dir", help="defaults to the watched directory")
+    _add_conversion_arguments(watch, "separate", "scan-%Y%m%d-%H%M%S.pdf")
+    watch.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged")
+    watch.add_argument("--batch-window", type=float, default=5.0, help="seconds to collect arrivals into one batch")
+    watch.add_argument("--batch-size", type=int, default=50, help="convert as soon as this many files are ready")
+    watch.add_argument("--poll", action="store_true", help="scan the directory instead of using inotify")
+    watch.add_argument("--poll-interval", type=float, default=1.0)
+    watch.add_argument("--include-existing", action="store_true", help="also convert files present at startup")
+    watch.add_argument("--processed-dir", help="move converted inputs here")
+    watch.add_argument("--report-interval", type=float, default=60.0, help="seconds between JSON metric lines")
+    watch.set_defaults(func=run_watch)
+
+    extend = subparsers.add_parser("extend-batch", help="append attachments to many documents from a manifest")
+    extend.add_argument("manifest", help="JSON or CSV file listing base, attachments and output per job")
+    extend.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    extend.add_argument("--target-dpi", type=float)
+    extend.add_argument("--page-size", type=_page_size, help=f"{', '.join(PAGE_SIZES)} or WIDTHxHEIGHT in points")
+    extend.add_argument("--cache", action="store_true", help="reuse encoded pages across runs")
+    extend.add_argument("--cache-dir", help=f"page cache directory (default {default_cache_dir()})")
+    extend.add_argument("--in-place", action="store_true", help="move each PDF base to its output and append there instead of copying it")
+    extend.add_argument("-v", "--verbose", action="store_true", help="report each finished job on stderr")
+    extend.add_argument("--pretty", action="store_true", help="indent the JSON summary")
+    extend.set_defaults(func=run_extend_batch)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
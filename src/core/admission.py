@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Tuple, TypeVar, Union
+
+from PIL import Image
+
+from src.core.imaging import PageOptions, page_geometry
+
+
+# Memory-aware admission for concurrent page jobs. What a job costs is set by
+# the pixels it decodes, not by the number of files, so each job is priced from
+# its image header alone (size and mode; nothing is decoded) and jobs are only
+# started while their summed estimates fit the budget. A job that can never fit
+# either runs alone, once everything before it has finished, or is downscaled
+# (a lower target_dpi) until its estimate fits.
+
+T = TypeVar("T")
+
+ALONE = "alone"
+DOWNSCALE = "downscale"
+
+# Pillow draft() scales JPEGs by these factors while decoding
+_JPEG_DRAFT_SCALES = (8, 4, 2)
+
+
+def _bands(mode: str) -> int:
+    try:
+        return Image.getmodebands(mode)
+    except ValueError:
+        return 4
+
+
+def _likely_passthrough(image: Image.Image) -> bool:
+    # Mirrors the fast paths in passthrough.py closely enough for an estimate
+    if "transparency" in image.info:
+        return False
+    if image.format == "JPEG":
+        return image.mode in ("L", "RGB", "CMYK")
+    if image.format == "PNG":
+        return image.mode in ("L", "RGB", "P") and not image.info.get("interlace")
+    return False
+
+
+def estimate_cost(path: Union[str, Path], options: PageOptions) -> int:
+    # Approximate peak bytes held while loading path as a page: the decoded
+    # image plus its flattened RGB copy, or only the file's bytes when they are
+    # likely to be embedded as they are. Unreadable files cost nothing; loading
+    # them fails straight away.
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            _size_pt, decode_size = page_geometry(width, height, options)
+            if decode_size is None and _likely_passthrough(image):
+                return os.path.getsize(path)
+
+            decode_width, decode_height = width, height
+            if decode_size is not None and image.format == "JPEG":
+                for scale in _JPEG_DRAFT_SCALES:
+                    if width // scale >= decode_size[0] and height // scale >= decode_size[1]:
+                        decode_width, decode_height = -(-width // scale), -(-height // scale)
+                        break
+            out_width, out_height = decode_size or (width, height)
+            return decode_width * decode_height * _bands(image.mode) + out_width * out_height * 3
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return 0
+
+
+class AdmissionController:
+    def __init__(self, budget_bytes: int, oversize: str = ALONE) -> None:
+        if oversize not in (ALONE, DOWNSCALE):
+            raise ValueError(f"Unknown oversize policy: {oversize!r}")
+        self.budget_bytes = budget_bytes
+        self.oversize = oversize
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._running = 0
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def plan(self, path: Union[str, Path], options: PageOptions) -> Tuple[PageOptions, int]:
+        # The options to load path with and the cost to acquire for it. With the
+        # downscale policy an oversized image gets a reduced target_dpi.
+        cost = estimate_cost(path, options)
+        if cost <= self.budget_bytes or self.oversize != DOWNSCALE:
+            return options, cost
+
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return options, cost
+        (width_pt, height_pt), decode_size = page_geometry(width, height, options)
+        dpi = (decode_size or (width, height))[0] * 72.0 / width_pt
+        # Cost scales with the pixel count, i.e. with the square of the density
+        while cost > self.budget_bytes and dpi > 1:
+            dpi *= max(0.5, min(0.9, (self.budget_bytes / cost) ** 0.5))
+            reduced = dataclasses.replace(options, target_dpi=dpi)
+            reduced_cost = estimate_cost(path, reduced)
+            if reduced_cost > cost * 0.95:
+                break # The full-size decode dominates (only JPEGs decode reduced); it runs alone
+            options, cost = reduced, reduced_cost
+        return options, cost
+
+    def acquire(self, cost: int, blocking: bool = True) -> bool:
+        # A job that does not fit waits for others to finish; one larger than the
+        # whole budget is admitted once nothing else is running.
+        with self._cond:
+            while self._running and self._in_use + cost > self.budget_bytes:
+                if not blocking:
+                    return False
+                self._cond.wait()
+            self._in_use += cost
+            self._running += 1
+            return True
+
+    def release(self, cost: int) -> None:
+        with self._cond:
+            self._in_use -= cost
+            self._running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def admitted(self, cost: int) -> Iterator[None]:
+        self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def admit_loader(self, loader: Callable[[Union[str, Path], PageOptions], T]) -> Callable[[Union[str, Path], PageOptions], T]:
+        # Wraps a page loader so each call is planned, waits for room in the
+        # budget and releases it once the page is loaded
+        def load(path: Union[str, Path], options: PageOptions) -> T:
+            options, cost = self.plan(path, options)
+            with self.admitted(cost):
+                return loader(path, options)
+        return load
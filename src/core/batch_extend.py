@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import csv
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.core.docx_pdf import DocxConverter, UnoserverBackend, default_docx_converter
+from src.core.extender import attachment_options, extend_document, prepare_attachment
+from src.core.imaging import WHITE
+from src.core.page_cache import PageCache
+from src.core.pdfappend import PreparedPages
+
+
+# Extends many documents from a manifest. Each job is a base document, its
+# attachments and an output path. Attachments used by more than one job (cover
+# sheets, standard exhibits) are parsed once, up front, and the prepared pages
+# are handed to every worker process when it starts. Jobs run on a process pool
+# and append as a PDF incremental update; one failing job is reported and the
+# rest carry on.
+#
+# A job still copies its base to its output first, which costs as much as the
+# base is large, unless the output is the base itself or the batch runs
+# in_place: then a PDF base is moved to its output and appended to there (see
+# extend_document's append_in_place), and only the pages added are written.
+#
+# DOCX bases on a pool share one LibreOffice listener, started by the calling
+# process before the workers; each worker connects to it and never starts or
+# stops one of its own, so workers cannot race for its port.
+
+OK = "ok"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class ExtendJob:
+    base: Path
+    attachments: Tuple[Path, ...]
+    output: Path
+
+    @property
+    def base_type(self) -> str:
+        return "docx" if self.base.suffix.lower() == ".docx" else "pdf"
+
+
+@dataclass(frozen=True)
+class JobResult:
+    job: ExtendJob
+    status: str
+    pages: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def _job(entry: Dict[str, Any], root: Path, where: str) -> ExtendJob:
+    try:
+        base, attachments, output = entry["base"], entry["attachments"], entry["output"]
+    except (KeyError, TypeError):
+        raise ValueError(f"{where}: expected base, attachments and output")
+    if isinstance(attachments, str):
+        attachments = [a for a in attachments.split(";") if a.strip()]
+    if not base or not output or not attachments:
+        raise ValueError(f"{where}: base, attachments and output must not be empty")
+    return ExtendJob(root / str(base).strip(), tuple(root / str(a).strip() for a in attachments), root / str(output).strip())
+
+
+def _check_distinct(jobs: List[Tuple[str, ExtendJob]]) -> None:
+    # Two jobs on one file would race in parallel, and with in_place the first
+    # would move the second's base away. A job may still write over its own base.
+    claimed: Dict[str, str] = {}
+    for where, job in jobs:
+        base, output = (os.path.normcase(os.path.abspath(p)) for p in (job.base, job.output))
+        for key, role in ((base, "base"), (output, "output")):
+            if key in claimed and not (key == base == output and claimed[key] == where):
+                raise ValueError(f"{where}: {role} {key} is already used by {claimed[key]}")
+            claimed[key] = where
+
+
+def load_manifest(path: Union[str, Path]) -> List[ExtendJob]:
+    # JSON: a list of {"base", "attachments", "output"} objects (or {"jobs": [...]}).
+    # CSV: a header row with base, attachments and output columns, attachments
+    # separated by ";". Relative paths are relative to the manifest. No two jobs
+    # may share a base or an output, or write over another job's base.
+    path = Path(path)
+    root = path.parent
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as fp:
+            jobs = [(f"{path.name} line {line}", row) for line, row in enumerate(csv.DictReader(fp), start=2)]
+    else:
+        with path.open(encoding="utf-8") as fp:
+            entries = json.load(fp)
+        if isinstance(entries, dict):
+            entries = entries.get("jobs")
+        if not isinstance(entries, list):
+            raise ValueError(f"{path.name}: expected a list of jobs")
+        jobs = [(f"{path.name} job {index}", entry) for index, entry in enumerate(entries, start=1)]
+
+    parsed = [(where, _job(entry, root, where)) for where, entry in jobs]
+    _check_distinct(parsed)
+    return [job for _where, job in parsed]
+
+
+def _error(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+_worker_prepared: Dict[str, PreparedPages] = {}
+_worker_docx: Optional[DocxConverter] = None
+
+
+def _init_worker(prepared: Dict[str, PreparedPages], docx: Optional[Dict[str, Any]] = None) -> None:
+    global _worker_prepared, _worker_docx
+    _worker_prepared = prepared
+    if docx is not None:
+        _worker_docx = DocxConverter(UnoserverBackend(**docx["backend"]), docx["cache_dir"], docx["max_bytes"])
+
+
+def _shared_docx_server(converter: DocxConverter) -> Optional[Dict[str, Any]]:
+    # Starts the converter's listener here and returns what a worker needs to
+    # use it; None when the backend is not a listener (docx2pdf), in which case
+    # workers make their own
+    try:
+        backend = converter.backend
+    except RuntimeError:
+        return None # No backend at all: every DOCX job reports it
+    if not isinstance(backend, UnoserverBackend):
+        return None
+    backend.start()
+    return {"backend": backend.connection(), "cache_dir": converter.cache_dir, "max_bytes": converter.max_bytes}
+
+
+def _run_job(
+    job: ExtendJob,
+    settings: Dict[str, Any],
+    prepared: Optional[Dict[str, PreparedPages]] = None,
+    in_place: bool = False,
+    docx_converter: Optional[DocxConverter] = None,
+) -> JobResult:
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _, _, pages = extend_document(
+                base_path=job.base,
+                base_type=job.base_type,
+                attachment_paths=list(job.attachments),
+                output_dir=job.output.parent,
+                output_filename=job.output.name,
+                temp_dir=Path(temp_dir),
+                rename_base_to_original=False,
+                incremental=True,
+                append_in_place=in_place and job.base_type == "pdf",
+                docx_converter=_worker_docx if docx_converter is None else docx_converter,
+                prepared=_worker_prepared if prepared is None else prepared,
+                **settings,
+            )
+    except Exception as e:
+        return JobResult(job, FAILED, seconds=time.perf_counter() - started, error=_error(e))
+    return JobResult(job, OK, pages, time.perf_counter() - started)
+
+
+def extend_batch(
+    jobs: List[ExtendJob],
+    workers: int = 1,
+    background: Tuple[int, int, int] = WHITE,
+    target_dpi: Optional[float] = None,
+    page_size: Optional[Tuple[float, float]] = None,
+    page_cache: Optional[PageCache] = None,
+    on_result: Optional[Callable[[JobResult], None]] = None,
+    in_place: bool = False,
+    docx_converter: Optional[DocxConverter] = None,
+) -> Tuple[List[JobResult], Dict[str, Optional[str]]]:
+    # Returns the results in job order, and the shared attachments that were
+    # prepared up front (absolute path -> None, or the error preparing it).
+    # on_result is called as each job finishes. in_place moves each PDF base
+    # to its output instead of copying it; a job that fails puts its base back.
+    # DOCX bases are converted by docx_converter, by default the process's
+    # shared one.
+    options = attachment_options(background, target_dpi, page_size)
+    settings = {"background": background, "target_dpi": target_dpi, "page_size": page_size, "page_cache": page_cache}
+
+    uses = Counter(path for job in jobs for path in {os.path.abspath(a) for a in job.attachments})
+    prepared: Dict[str, PreparedPages] = {}
+    shared: Dict[str, Optional[str]] = {}
+    for path, count in uses.items():
+        if count < 2:
+            continue
+        try:
+            prepared[path] = prepare_attachment(Path(path), options, page_cache)
+            shared[path] = None
+        except Exception as e:
+            shared[path] = _error(e)
+
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+
+    def finish(index: int, result: JobResult) -> None:
+        results[index] = result
+        if on_result is not None:
+            on_result(result)
+
+    runnable = []
+    for index, job in enumerate(jobs):
+        # A job whose shared attachment could not be prepared fails without running
+        failed = next((shared[p] for p in map(os.path.abspath, job.attachments) if shared.get(p)), None)
+        if failed is not None:
+            finish(index, JobResult(job, FAILED, error=failed))
+        else:
+            runnable.append(index)
+
+    if workers <= 1 or len(runnable) <= 1:
+        for index in runnable:
+            finish(index, _run_job(jobs[index], settings, prepared, in_place, docx_converter))
+    else:
+        docx = None
+        if any(jobs[index].base_type == "docx" for index in runnable):
+            try:
+                docx = _shared_docx_server(docx_converter if docx_converter is not None else default_docx_converter())
+            except Exception as e:
+                for index in [i for i in runnable if jobs[i].base_type == "docx"]:
+                    finish(index, JobResult(jobs[index], FAILED, error=_error(e)))
+                    runnable.remove(index)
+        with ProcessPoolExecutor(
+            min(workers, max(len(runnable), 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(prepared, docx),
+        ) as pool:
+            futures = {pool.submit(_run_job, jobs[index], settings, None, in_place): index for index in runnable}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e: # The worker process died
+                    result = JobResult(jobs[index], FAILED, error=_error(e))
+                finish(index, result)
+
+    return results, shared
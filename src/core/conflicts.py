@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Set, Union
+
+from src.core.naming import OutputNameAllocator
+
+
+# Resolves every output name of a conversion before it starts. OutputPlanner
+# lists the output directory once, reports each input whose PDF would replace
+# an existing file or another input's PDF, and turns the caller's decisions
+# (one for all, or one per input) into an OutputPlan. The converter then takes
+# output paths from the plan and never calls the overwrite/rename callbacks, so
+# an interactive front end asks all its questions before any work is queued.
+# Renamed outputs are reserved on disk with an empty placeholder as they are
+# planned, so another planner or process cannot pick the same name before the
+# conversion writes it; the converter releases the ones it never wrote.
+
+OVERWRITE = "overwrite"
+RENAME = "rename"
+SKIP = "skip"
+DECISIONS = (OVERWRITE, RENAME, SKIP)
+
+
+@dataclass(frozen=True)
+class OutputConflict:
+    input_path: str
+    output_path: Path
+    # False when the file does not exist yet but an earlier input in the batch
+    # writes to the same name
+    exists: bool
+
+
+@dataclass
+class OutputPlan:
+    # Output for every input; None means the input is skipped
+    outputs: Dict[str, Optional[Path]]
+    # Renamed outputs held by an empty placeholder until they are written
+    reserved: Set[Path] = field(default_factory=set)
+
+    def output_for(self, input_path) -> Optional[Path]:
+        return self.outputs[str(input_path)]
+
+    def release(self) -> None:
+        # Removes the placeholders of outputs that were never written (their
+        # input was skipped, failed or cancelled)
+        for path in self.reserved:
+            try:
+                if path.stat().st_size == 0:
+                    path.unlink()
+            except OSError:
+                pass
+        self.reserved.clear()
+
+
+class OutputPlanner:
+    def __init__(
+        self,
+        png_paths: List[str],
+        output_dir: Union[str, Path],
+        output_mode: str = "separate",
+        single_pdf_filename: str = "combined_images.pdf",
+    ) -> None:
+        self.png_paths = [str(p) for p in png_paths]
+        self.output_dir = Path(output_dir)
+        self.output_mode = output_mode
+        self._allocator = OutputNameAllocator(self.output_dir)
+        self._natural: Dict[str, Path] = {}
+        self.conflicts: List[OutputConflict] = []
+
+        if output_mode == "single":
+            combined = self.output_dir / single_pdf_filename
+            self._natural = {png_path: combined for png_path in self.png_paths}
+            if self.png_paths and self._allocator.is_taken(combined):
+                self.conflicts.append(OutputConflict(self.png_paths[0], combined, True))
+            return
+
+        seen = set()
+        for png_path in self.png_paths:
+            pdf_path = self.output_dir / f"{Path(png_path).stem}.pdf"
+            self._natural[png_path] = pdf_path
+            if self._allocator.is_taken(pdf_path):
+                self.conflicts.append(OutputConflict(png_path, pdf_path, os.path.normcase(pdf_path.name) not in seen))
+            else:
+                # Marks the name taken, so later inputs and renames see it
+                self._allocator.allocate(pdf_path, reserve=False)
+                seen.add(os.path.normcase(pdf_path.name))
+
+    def plan(self, decisions: Union[str, Mapping[str, str]] = OVERWRITE, default: str = SKIP) -> OutputPlan:
+        # decisions is one of DECISIONS for every conflict, or a mapping from
+        # input path to decision; conflicts missing from it get default.
+        # Renamed outputs get the first free stem_N name, reserved on disk, so a
+        # planner is meant to be planned once.
+        outputs: Dict[str, Optional[Path]] = dict(self._natural)
+        reserved: Set[Path] = set()
+        if self.output_mode == "single" and self.conflicts:
+            combined = self.conflicts[0].output_path
+            decision = decisions if isinstance(decisions, str) else decisions.get(self.conflicts[0].input_path, default)
+            resolved = self._resolve(combined, decision, reserved)
+            return OutputPlan({png_path: resolved for png_path in self.png_paths}, reserved)
+
+        for conflict in self.conflicts:
+            decision = decisions if isinstance(decisions, str) else decisions.get(conflict.input_path, default)
+            outputs[conflict.input_path] = self._resolve(conflict.output_path, decision, reserved)
+        return OutputPlan(outputs, reserved)
+
+    def _resolve(self, pdf_path: Path, decision: str, reserved: Set[Path]) -> Optional[Path]:
+        if decision == SKIP:
+            return None
+        if decision == RENAME:
+            renamed = self._allocator.allocate(pdf_path)
+            reserved.add(renamed)
+            return renamed
+        if decision == OVERWRITE:
+            return pdf_path
+        raise ValueError(f"Unknown conflict decision: {decision!r}")
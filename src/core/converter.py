@@ -1,22 +1,459 @@
-from PIL import Image
+import multiprocessing
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 
+from src.core.admission import AdmissionController
+from src.core.conflicts import OutputPlan
+from src.core.imaging import WHITE, PageOptions, load_page, open_flattened
+from src.core.incremental import IncrementalBuild
+from src.core.journal import JobControl, JobJournal
+from src.core.naming import unique_path
+from src.core.page_cache import PageCache
+from src.core.passthrough import passthrough_page
+from src.core.pdfwriter import PageImage, StreamingPdfWriter
+from src.core.stats import ConversionStats
 
-def _ensure_unique_path(target_path: Path) -> Path:
-    if not target_path.exists():
-        return target_path
 
-    stem = target_path.stem
-    suffix = target_path.suffix
-    parent = target_path.parent
+@dataclass
+class ConversionOptions:
+    # Everything process_images_to_pdf can be tuned with beyond its callbacks.
+    # streaming (single mode) writes each page as soon as it is encoded; turning
+    # it off keeps every decoded image in memory and saves them with Pillow.
+    # target_dpi caps the pixel density embedded in each page and page_size (in
+    # points) caps its physical size; oversized images are decoded reduced.
+    # incremental (single mode) re-encodes only inputs changed since the last
+    # run; the output is still rewritten in full (see IncrementalBuild).
+    # pool is an optional long-lived process pool for separate mode, so repeated
+    # calls do not start new worker processes each time.
+    # journal (separate mode) records finished inputs so a rerun of the same job
+    # skips them; control allows cancelling or pausing between files.
+    # output_plan (from OutputPlanner) fixes every output name upfront, in which
+    # case the overwrite/rename callbacks are never called.
+    # admission limits how many decoded pixels are in memory at once (see
+    # AdmissionController); single mode then always streams.
+    streaming: bool = True
+    workers: int = 1
+    stats: Optional[ConversionStats] = None
+    background: Tuple[int, int, int] = WHITE
+    target_dpi: Optional[float] = None
+    page_size: Optional[Tuple[float, float]] = None
+    page_cache: Optional[PageCache] = None
+    incremental: bool = False
+    pool: Optional[Executor] = None
+    journal: Optional[JobJournal] = None
+    control: Optional[JobControl] = None
+    output_plan: Optional[OutputPlan] = None
+    admission: Optional[AdmissionController] = None
+
+
+def _convert_separate_pdf(png_path, pdf_path, options: PageOptions, page_cache: Optional[PageCache] = None) -> bool:
+    # Returns True when the page was embedded without decoding
+    if page_cache is not None:
+        page = page_cache.load_page(png_path, options)
+    elif options.resizes:
+        page = load_page(png_path, options)
+    else:
+        page = passthrough_page(png_path)
+        if page is None:
+            image = open_flattened(png_path, options.background)
+            image.save(pdf_path, 'PDF', resolution=options.resolution, quality=options.quality)
+            return False
+
+    with StreamingPdfWriter(pdf_path, title=Path(pdf_path).stem) as writer:
+        writer.add_image_page(page, resolution=options.resolution)
+    return page.passthrough
+
+
+def _convert_separate_group(
+    jobs: List[Tuple[str, Path]],
+    options: PageOptions,
+    page_cache: Optional[PageCache] = None,
+    job_options: Optional[List[PageOptions]] = None,
+) -> Tuple[List[Optional[bool]], Tuple[int, int, int]]:
+    # Runs in a worker process. Jobs sharing an output path arrive as one group so
+    # they are written in input order, the same as the serial loop would. Each
+    # result is None on failure, otherwise whether the fast path was taken. The
+    # cache counters this group added are returned for the parent to fold in.
+    # job_options, when given, replaces options per job (see AdmissionController.plan).
+    before = page_cache.counts() if page_cache is not None else (0, 0, 0)
+    results = []
+    for i, (png_path, pdf_path) in enumerate(jobs):
+        try:
+            results.append(_convert_separate_pdf(png_path, pdf_path, job_options[i] if job_options else options, page_cache))
+        except Exception:
+            results.append(None)
+    after = page_cache.counts() if page_cache is not None else (0, 0, 0)
+    return results, (after[0] - before[0], after[1] - before[1], after[2] - before[2])
+
+
+def _resume_from_journal(
+    png_path: str,
+    journal: Optional[JobJournal],
+    update_status_callback,
+    stats: Optional[ConversionStats],
+) -> bool:
+    # True when an earlier run of the same job already converted png_path
+    if journal is None or journal.completed_output(png_path) is None:
+        return False
+    if stats is not None:
+        stats.resumed_inputs += 1
+    update_status_callback(png_path, "✔", "green")
+    return True
+
+
+def _admission_group(
+    jobs: List[Tuple[str, Path]],
+    options: PageOptions,
+    admission: Optional[AdmissionController],
+) -> Tuple[List[Tuple[str, Path]], Optional[List[PageOptions]], int]:
+    # A group's jobs run one after another, so it costs as much as its largest
+    if admission is None:
+        return jobs, None, 0
+    planned = [admission.plan(png_path, options) for png_path, _pdf_path in jobs]
+    return jobs, [job_options for job_options, _cost in planned], max(cost for _job_options, cost in planned)
+
+
+def _separate_output_path(
+    png_path: str,
+    output_dir: Path,
+    pending,
+    ask_overwrite_callback,
+    get_new_name_callback,
+    output_plan: Optional[OutputPlan],
+) -> Optional[Path]:
+    # Returns None when the input is to be skipped. pending holds outputs this
+    # run is about to write, which count as existing.
+    if output_plan is not None:
+        return output_plan.output_for(png_path)
+    pdf_path = output_dir / f"{Path(png_path).stem}.pdf"
+    if pdf_path.exists() or pdf_path in pending:
+        response = ask_overwrite_callback(png_path, pdf_path)
+        if response == "skip":
+            return None
+        elif response == "rename":
+            return get_new_name_callback(pdf_path)
+    return pdf_path
+
+
+def _convert_separate_parallel(
+    png_paths: List[str],
+    output_dir: Path,
+    ask_overwrite_callback,
+    get_new_name_callback,
+    update_status_callback,
+    update_overall_progress_callback,
+    workers: int,
+    options: PageOptions,
+    stats: Optional[ConversionStats] = None,
+    page_cache: Optional[PageCache] = None,
+    pool: Optional[Executor] = None,
+    journal: Optional[JobJournal] = None,
+    control: Optional[JobControl] = None,
+    output_plan: Optional[OutputPlan] = None,
+    admission: Optional[AdmissionController] = None,
+) -> Tuple[int, int]:
+    converted_count = 0
+    skipped_count = 0
+    total_images = len(png_paths)
+
+    # Output paths are resolved on the calling thread before anything is submitted,
+    # because the overwrite/rename callbacks may prompt the user.
+    groups: Dict[Path, List[Tuple[str, Path]]] = {}
+    for png_path in png_paths:
+        update_status_callback(png_path, "(Converting)", "blue")
+        if _resume_from_journal(png_path, journal, update_status_callback, stats):
+            converted_count += 1
+            continue
+        try:
+            pdf_path = _separate_output_path(
+                png_path, output_dir, groups, ask_overwrite_callback, get_new_name_callback, output_plan
+            )
+            if pdf_path is None:
+                update_status_callback(png_path, "✖", "orange")
+                skipped_count += 1
+                continue
+        except Exception:
+            update_status_callback(png_path, "✖", "red")
+            skipped_count += 1
+            continue
+
+        groups.setdefault(pdf_path, []).append((png_path, pdf_path))
+
+    if not groups:
+        if journal is not None:
+            journal.close()
+        return converted_count, skipped_count
+
+    done = converted_count + skipped_count
+    owns_pool = pool is None
+    queue = deque(groups.values())
+    head = None # Admission plan of queue[0], worked out when it is next in line
+    in_flight = {}
+    # Groups are submitted a window at a time so a cancel or pause takes effect
+    # after the files already running rather than after the whole batch. With an
+    # admission controller the window also closes while the next group's pixels
+    # do not fit the memory budget.
+    max_in_flight = max(1, workers) * 2
+
+    try:
+        while queue or in_flight:
+            if control is not None and (control.cancelled or control.paused) and in_flight:
+                finished, _ = wait(in_flight)
+            else:
+                if control is not None and control.paused:
+                    if owns_pool and pool is not None:
+                        pool.shutdown() # Hand the worker processes back while paused
+                        pool = None
+                    control.wait_while_paused()
+                if control is not None and control.cancelled:
+                    break
+
+                if pool is None:
+                    context = multiprocessing.get_context("spawn")
+                    pool = ProcessPoolExecutor(max_workers=min(workers, len(groups)), mp_context=context)
+                while queue and len(in_flight) < max_in_flight:
+                    if head is None:
+                        head = _admission_group(queue[0], options, admission)
+                    jobs, job_options, cost = head
+                    if admission is not None and not admission.acquire(cost, blocking=not in_flight):
+                        break
+                    queue.popleft()
+                    head = None
+                    future = pool.submit(_convert_separate_group, jobs, options, page_cache, job_options)
+                    in_flight[future] = (jobs, cost)
+                finished, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                jobs, cost = in_flight.pop(future)
+                if admission is not None:
+                    admission.release(cost)
+                try:
+                    results, cache_counts = future.result()
+                    if page_cache is not None:
+                        page_cache.add_counts(*cache_counts)
+                except Exception:
+                    results = [None] * len(jobs)
+
+                for (png_path, pdf_path), passthrough in zip(jobs, results):
+                    done += 1
+                    update_overall_progress_callback(f"Converting {done}/{total_images}...", done, total_images)
+                    if passthrough is not None:
+                        converted_count += 1
+                        if journal is not None:
+                            journal.record(png_path, pdf_path)
+                        if stats is not None:
+                            stats.record_page(passthrough)
+                        update_status_callback(png_path, "✔", "green")
+                    else:
+                        skipped_count += 1
+                        update_status_callback(png_path, "✖", "red")
+    finally:
+        if owns_pool and pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if admission is not None:
+            for _jobs, cost in in_flight.values():
+                admission.release(cost)
+        if journal is not None:
+            journal.close()
+
+    skipped_count += sum(len(jobs) for jobs in queue) # Left unstarted by a cancel
+
+    if page_cache is not None:
+        page_cache.trim()
+
+    return converted_count, skipped_count
+
+
+def _resolve_single_pdf_path(
+    single_pdf_path: Path,
+    first_png_path: str,
+    ask_overwrite_callback,
+    get_new_name_callback,
+    auto_rename_if_exists: bool,
+    output_plan: Optional[OutputPlan] = None,
+) -> Tuple[Optional[Path], bool]:
+    # The path is None when the user chose to skip writing the combined PDF. The
+    # flag is set when the path is an empty placeholder reserved here, which the
+    # caller removes if writing the PDF fails.
+    if output_plan is not None:
+        return output_plan.output_for(first_png_path), False
+    if auto_rename_if_exists:
+        path = unique_path(single_pdf_path)
+        return path, path != single_pdf_path
+    if not single_pdf_path.exists():
+        return single_pdf_path, False
+
+    response = ask_overwrite_callback(str(Path(first_png_path).name), single_pdf_path) # Pass first image name for context
+    if response == "skip":
+        return None, False
+    elif response == "rename":
+        return get_new_name_callback(single_pdf_path), False
+    return single_pdf_path, False
+
+
+def _encoded_pages(
+    png_paths: List[str],
+    workers: int,
+    options: PageOptions,
+    page_cache: Optional[PageCache] = None,
+    incremental: Optional[IncrementalBuild] = None,
+    admission: Optional[AdmissionController] = None,
+) -> Iterator[Tuple[str, Optional[PageImage]]]:
+    # Yields (path, page) in input order; page is None when the image failed.
+    # With workers > 1 upcoming pages are decoded and compressed on a thread pool
+    # (Pillow releases the GIL for both) while the caller writes finished ones.
+    loader = page_cache.load_page if page_cache is not None else load_page
+    if admission is not None:
+        loader = admission.admit_loader(loader) # Pages reused by an incremental build cost nothing
+    if incremental is not None:
+        loader = incremental.loader(loader)
+
+    if workers <= 1:
+        for png_path in png_paths:
+            try:
+                yield png_path, loader(png_path, options)
+            except Exception:
+                yield png_path, None
+        return
+
+    max_in_flight = workers * 2 # Bounds memory to a few encoded pages per worker
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for png_path in png_paths:
+                pending.append((png_path, pool.submit(loader, png_path, options)))
+                if len(pending) >= max_in_flight:
+                    yield _pending_result(pending.popleft())
+            while pending:
+                yield _pending_result(pending.popleft())
+        finally:
+            for _png_path, future in pending:
+                future.cancel()
+
+
+def _pending_result(item) -> Tuple[str, Optional[PageImage]]:
+    png_path, future = item
+    try:
+        return png_path, future.result()
+    except Exception:
+        return png_path, None
+
+
+def _write_single_pdf_streaming(
+    png_paths: List[str],
+    output_dir: Path,
+    ask_overwrite_callback,
+    get_new_name_callback,
+    update_status_callback,
+    update_overall_progress_callback,
+    single_pdf_filename: str,
+    auto_rename_if_exists: bool,
+    workers: int,
+    options: PageOptions,
+    stats: Optional[ConversionStats] = None,
+    page_cache: Optional[PageCache] = None,
+    incremental: bool = False,
+    control: Optional[JobControl] = None,
+    output_plan: Optional[OutputPlan] = None,
+    admission: Optional[AdmissionController] = None,
+) -> Tuple[int, int]:
+    # Each page is written as soon as it is encoded, so peak memory is about one
+    # page (or the in-flight window when pipelined). Pages go to a partial file
+    # first because the final name is only resolved once a page has converted;
+    # its name is unique so runs writing the same output never share it.
+    # An incremental build copies pages whose input is unchanged from the
+    # previous output and replaces that output.
+    converted_count = 0
+    skipped_count = 0
+    total_images = len(png_paths)
+    pages_written = 0
+    cancelled = False
+
+    try:
+        with tempfile.NamedTemporaryFile(dir=output_dir, prefix=f".{single_pdf_filename}.", suffix=".partial", delete=False) as fp:
+            partial_path = Path(fp.name)
+    except OSError:
+        return converted_count, total_images
+    build = IncrementalBuild(output_dir / single_pdf_filename, options) if incremental else None
+
+    try:
+        with StreamingPdfWriter(partial_path, title=Path(single_pdf_filename).stem) as writer:
+            for i, (png_path, page) in enumerate(_encoded_pages(png_paths, workers, options, page_cache, build, admission), 1):
+                if control is not None and not control.wait_while_paused():
+                    cancelled = True
+                    break
+                update_overall_progress_callback(f"Processing image {i}/{total_images} for single PDF...", i, total_images)
+                update_status_callback(png_path, "(Processing)", "blue")
+                if page is None:
+                    update_status_callback(png_path, "✖", "red")
+                    skipped_count += 1
+                    continue
+
+                offset = writer.add_image_page(page, resolution=options.resolution)
+                pages_written += 1
+                reused = build.record(png_path, page, offset) if build is not None else False
+                if stats is not None:
+                    stats.record_page(page.passthrough, reused)
+                update_status_callback(png_path, "✔", "green")
+    except Exception:
+        if build is not None:
+            build.close()
+        partial_path.unlink(missing_ok=True)
+        return converted_count, total_images # Count all as skipped if writing the combined PDF fails
+
+    if build is not None:
+        build.close()
+
+    if cancelled:
+        partial_path.unlink(missing_ok=True)
+        return converted_count, total_images # A cancelled combined PDF is not written at all
+
+    if not pages_written:
+        partial_path.unlink(missing_ok=True)
+        return converted_count, skipped_count
+
+    update_overall_progress_callback("Creating combined PDF...", total_images, total_images)
+    placeholder = None
+    try:
+        if build is not None and build.has_previous:
+            single_pdf_path = output_dir / single_pdf_filename # Updating our own previous output
+        else:
+            single_pdf_path, reserved = _resolve_single_pdf_path(
+                output_dir / single_pdf_filename,
+                png_paths[0],
+                ask_overwrite_callback,
+                get_new_name_callback,
+                auto_rename_if_exists,
+                output_plan,
+            )
+            placeholder = single_pdf_path if reserved else None
+        if single_pdf_path is None:
+            partial_path.unlink(missing_ok=True)
+            skipped_count += 1 # Count the whole combined PDF as skipped
+            return converted_count, skipped_count
+
+        shutil.move(str(partial_path), str(single_pdf_path))
+        converted_count += pages_written
+    except Exception:
+        partial_path.unlink(missing_ok=True)
+        if placeholder is not None:
+            placeholder.unlink(missing_ok=True)
+        skipped_count += pages_written
+        return converted_count, skipped_count
+
+    if build is not None:
+        try:
+            build.commit(single_pdf_path)
+        except OSError:
+            pass # Without a manifest the next run simply rebuilds everything
+
+    return converted_count, skipped_count
 
-    i = 1
-    while True:
-        candidate = parent / f"{stem}_{i}{suffix}"
-        if not candidate.exists():
-            return candidate
-        i += 1
 
 def process_images_to_pdf(
     png_paths: List[str],
@@ -28,7 +465,102 @@ def process_images_to_pdf(
     update_overall_progress_callback,
     single_pdf_filename: str = "combined_images.pdf",
     auto_rename_if_exists: bool = False,
+    options: Optional[ConversionOptions] = None,
+) -> Tuple[int, int]:
+    if options is None:
+        options = ConversionOptions()
+    try:
+        return _process_images_to_pdf(
+            png_paths,
+            output_dir,
+            output_mode,
+            ask_overwrite_callback,
+            get_new_name_callback,
+            update_status_callback,
+            update_overall_progress_callback,
+            single_pdf_filename,
+            auto_rename_if_exists,
+            options,
+        )
+    finally:
+        if options.output_plan is not None:
+            options.output_plan.release() # Renamed outputs that were never written
+
+
+def _process_images_to_pdf(
+    png_paths: List[str],
+    output_dir: Path,
+    output_mode: str,
+    ask_overwrite_callback,
+    get_new_name_callback,
+    update_status_callback,
+    update_overall_progress_callback,
+    single_pdf_filename: str,
+    auto_rename_if_exists: bool,
+    options: ConversionOptions,
 ) -> Tuple[int, int]:
+    background = options.background
+    stats = options.stats
+    page_cache = options.page_cache
+    journal = options.journal
+    control = options.control
+    output_plan = options.output_plan
+    admission = options.admission
+    if output_mode == "single":
+        page_options = PageOptions(resolution=100.0, background=background, target_dpi=options.target_dpi, page_size=options.page_size)
+    else:
+        page_options = PageOptions(resolution=100.0, quality=100, background=background, target_dpi=options.target_dpi, page_size=options.page_size)
+
+    if output_mode != "single" and journal is not None:
+        journal.begin({"mode": output_mode, "output_dir": str(Path(output_dir).resolve()), "options": repr(page_options)})
+
+    if output_mode == "single" and (
+        options.streaming
+        or options.workers > 1
+        or page_options.resizes
+        or page_cache is not None
+        or options.incremental
+        or control is not None
+        or admission is not None
+    ):
+        return _write_single_pdf_streaming(
+            png_paths,
+            output_dir,
+            ask_overwrite_callback,
+            get_new_name_callback,
+            update_status_callback,
+            update_overall_progress_callback,
+            single_pdf_filename,
+            auto_rename_if_exists,
+            options.workers,
+            page_options,
+            stats,
+            page_cache,
+            options.incremental,
+            control,
+            output_plan,
+            admission,
+        )
+
+    if output_mode != "single" and (options.pool is not None or options.workers > 1) and len(png_paths) > 1:
+        return _convert_separate_parallel(
+            png_paths,
+            output_dir,
+            ask_overwrite_callback,
+            get_new_name_callback,
+            update_status_callback,
+            update_overall_progress_callback,
+            options.workers,
+            page_options,
+            stats,
+            page_cache,
+            options.pool,
+            journal,
+            control,
+            output_plan,
+            admission,
+        )
+
     converted_count = 0
     skipped_count = 0
     total_images = len(png_paths)
@@ -39,13 +571,7 @@ def process_images_to_pdf(
             update_overall_progress_callback(f"Processing image {i}/{total_images} for single PDF...", i, total_images)
             update_status_callback(png_path, "(Processing)", "blue")
             try:
-                image = Image.open(png_path)
-                if image.mode == 'RGBA':
-                    rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                    rgb_image.paste(image, mask=image.split()[3])
-                    image = rgb_image
-                elif image.mode != 'RGB':
-                    image = image.convert('RGB')
+                image = open_flattened(png_path, background)
                 images_for_single_pdf.append(image)
                 update_status_callback(png_path, "✔", "green")
             except Exception:
@@ -57,61 +583,66 @@ def process_images_to_pdf(
             first_image = images_for_single_pdf[0]
             other_images = images_for_single_pdf[1:]
             single_pdf_path = output_dir / single_pdf_filename
+            placeholder = None
             try:
                 # Check if combined PDF already exists
-                if single_pdf_path.exists():
-                    if auto_rename_if_exists:
-                        single_pdf_path = _ensure_unique_path(single_pdf_path)
-                    else:
-                        response = ask_overwrite_callback(str(Path(png_paths[0]).name), single_pdf_path) # Pass first image name for context
-                        if response == "skip":
-                            skipped_count += 1 # Count the whole combined PDF as skipped
-                            return converted_count, skipped_count
-                        elif response == "rename":
-                            single_pdf_path = get_new_name_callback(single_pdf_path)
-                            if single_pdf_path is None:
-                                skipped_count += 1
-                                return converted_count, skipped_count
+                single_pdf_path, reserved = _resolve_single_pdf_path(
+                    single_pdf_path,
+                    png_paths[0],
+                    ask_overwrite_callback,
+                    get_new_name_callback,
+                    auto_rename_if_exists,
+                    output_plan,
+                )
+                if single_pdf_path is None:
+                    skipped_count += 1 # Count the whole combined PDF as skipped
+                    return converted_count, skipped_count
 
+                placeholder = single_pdf_path if reserved else None
                 first_image.save(single_pdf_path, "PDF", resolution=100.0, save_all=True, append_images=other_images)
                 converted_count += len(images_for_single_pdf) # Count all images as converted if combined successfully
             except Exception:
+                if placeholder is not None:
+                    placeholder.unlink(missing_ok=True)
                 skipped_count += len(images_for_single_pdf) # Count all as skipped if combined fails
 
     else:  # Separate PDFs
         for i, png_path in enumerate(png_paths, 1):
+            if control is not None and not control.wait_while_paused():
+                skipped_count += total_images - i + 1
+                break
             update_overall_progress_callback(f"Converting {i}/{total_images}...", i, total_images)
             update_status_callback(png_path, "(Converting)", "blue")
+            if _resume_from_journal(png_path, journal, update_status_callback, stats):
+                converted_count += 1
+                continue
             try:
-                pdf_path = output_dir / f"{Path(png_path).stem}.pdf"
+                pdf_path = _separate_output_path(
+                    png_path, output_dir, (), ask_overwrite_callback, get_new_name_callback, output_plan
+                )
+                if pdf_path is None:
+                    update_status_callback(png_path, "✖", "orange")
+                    skipped_count += 1
+                    continue
 
-                if pdf_path.exists():
-                    response = ask_overwrite_callback(png_path, pdf_path)
-                    if response == "skip":
-                        update_status_callback(png_path, "✖", "orange")
-                        skipped_count += 1
-                        continue
-                    elif response == "rename":
-                        pdf_path = get_new_name_callback(pdf_path)
-                        if pdf_path is None:
-                            update_status_callback(png_path, "✖", "orange")
-                            skipped_count += 1
-                            continue
-
-                image = Image.open(png_path)
-                if image.mode == 'RGBA':
-                    rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                    rgb_image.paste(image, mask=image.split()[3])
-                    image = rgb_image
-                elif image.mode != 'RGB':
-                    image = image.convert('RGB')
-
-                image.save(pdf_path, 'PDF', resolution=100.0, quality=100)
+                if admission is not None:
+                    job_options, cost = admission.plan(png_path, page_options)
+                    with admission.admitted(cost):
+                        passthrough = _convert_separate_pdf(png_path, pdf_path, job_options, page_cache)
+                else:
+                    passthrough = _convert_separate_pdf(png_path, pdf_path, page_options, page_cache)
                 converted_count += 1
+                if journal is not None:
+                    journal.record(png_path, pdf_path)
+                if stats is not None:
+                    stats.record_page(passthrough)
                 update_status_callback(png_path, "✔", "green")
 
             except Exception:
                 update_status_callback(png_path, "✖", "red")
                 skipped_count += 1
 
+        if journal is not None:
+            journal.close()
+
     return converted_count, skipped_count
\ No newline at end of file
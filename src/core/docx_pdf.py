@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from pypdf import PdfWriter
+
+from src.core.page_cache import default_cache_dir, file_digest
+
+
+# DOCX to PDF conversion for the extender. A backend converts one file:
+# Docx2PdfBackend drives Word through docx2pdf (Windows and macOS, one Word
+# session per call); UnoserverBackend starts one LibreOffice listener
+# (unoserver) on first use and sends it every conversion, so the office
+# start-up is paid once per process; its connection() lets other processes use
+# that listener without starting their own. StubBackend writes a blank page,
+# for tests.
+# DocxConverter puts a cache keyed on the DOCX's content hash in front of a
+# backend, so the same document is never converted twice.
+
+_CACHE_VERSION = 1
+
+
+def default_docx_cache_dir() -> Path:
+    return default_cache_dir().parent / "docx"
+
+
+class Docx2PdfBackend:
+    name = "docx2pdf"
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> None:
+        from docx2pdf import convert
+
+        convert(str(docx_path), str(pdf_path))
+
+    def close(self) -> None:
+        pass
+
+
+def _port_open(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+class UnoserverBackend:
+    name = "unoserver"
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 2003,
+        server: str = "unoserver",
+        client: str = "unoconvert",
+        start_timeout: float = 60.0,
+        timeout: float = 300.0,
+        start_server: bool = True,
+    ) -> None:
+        # Without start_server the listener must already be up; it is used but
+        # never started or stopped, as when another process owns it
+        self.host = host
+        self.port = port
+        self.server = server
+        self.client = client
+        self.start_timeout = start_timeout
+        self.timeout = timeout
+        self.start_server = start_server
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_server()
+
+    def connection(self) -> Dict[str, Any]:
+        # Arguments for a backend in another process that uses this listener
+        return {"host": self.host, "port": self.port, "server": self.server, "client": self.client,
+                "timeout": self.timeout, "start_server": False}
+
+    def _ensure_server(self) -> None:
+        # A listener that is already up, ours or one started elsewhere, is reused
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = None
+        if _port_open(self.host, self.port):
+            return
+        if not self.start_server:
+            raise RuntimeError(f"no {self.server} listening on {self.host}:{self.port}")
+        self._process = subprocess.Popen(
+            [self.server, "--interface", self.host, "--port", str(self.port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.start_timeout
+        while not _port_open(self.host, self.port):
+            if self._process.poll() is not None:
+                self._process = None
+                raise RuntimeError(f"{self.server} exited before accepting connections")
+            if time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError(f"{self.server} did not start within {self.start_timeout:g}s")
+            time.sleep(0.1)
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> None:
+        with self._lock:
+            self._ensure_server()
+            subprocess.run(
+                [self.client, "--host", self.host, "--port", str(self.port), "--convert-to", "pdf", str(docx_path), str(pdf_path)],
+                check=True,
+                capture_output=True,
+                timeout=self.timeout,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._process is None:
+                return
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+
+class StubBackend:
+    # Writes a one-page blank PDF and records what it was asked to convert
+    name = "stub"
+
+    def __init__(self) -> None:
+        self.converted: List[Path] = []
+
+    def convert(self, docx_path: Path, pdf_path: Path) -> None:
+        self.converted.append(Path(docx_path))
+        writer = PdfWriter()
+        writer.add_blank_page(612, 792)
+        writer.write(pdf_path)
+
+    def close(self) -> None:
+        pass
+
+
+def default_backend():
+    if sys.platform in ("win32", "darwin"):
+        return Docx2PdfBackend()
+    if shutil.which("unoserver") and shutil.which("unoconvert"):
+        return UnoserverBackend()
+    raise RuntimeError("No DOCX converter available: install docx2pdf (Windows, macOS) or unoserver (LibreOffice)")
+
+
+class DocxConverter:
+    def __init__(self, backend=None, cache_dir: Optional[Union[str, Path]] = None, max_bytes: int = 512 * 1024 * 1024) -> None:
+        # backend is made on first use when not given; without cache_dir every
+        # conversion goes to the caller's work directory
+        self._backend = backend
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Size of the cache, counted from the directory on the first insert and
+        # kept up to date after that, so the directory is only walked again
+        # when the total goes past max_bytes
+        self._cache_bytes: Optional[int] = None
+        self._size_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = default_backend()
+            return self._backend
+
+    def key(self, docx_path: Union[str, Path]) -> str:
+        # Output from another backend is not reused, so switching backends
+        # (e.g. away from the stub) converts again
+        digest = hashlib.sha256(f"{_CACHE_VERSION}|{self.backend.name}|".encode("utf-8"))
+        digest.update(file_digest(docx_path).encode("ascii"))
+        return digest.hexdigest()
+
+    def convert(self, docx_path: Union[str, Path], work_dir: Union[str, Path]) -> Path:
+        # Path of a PDF of docx_path. A cached PDF is shared and must not be
+        # modified by the caller.
+        docx_path = Path(docx_path)
+        if self.cache_dir is None:
+            pdf_path = Path(work_dir) / f"{docx_path.stem}.pdf"
+            pdf_path.parent.mkdir(parents=True, exist_ok=True)
+            self.backend.convert(docx_path, pdf_path)
+            return pdf_path
+
+        key = self.key(docx_path)
+        pdf_path = self.cache_dir / key[:2] / f"{key}.pdf"
+        if pdf_path.exists():
+            os.utime(pdf_path)
+            return pdf_path
+
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        # Converters choose the output format from the suffix, so it stays .pdf
+        tmp_path = pdf_path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.pdf")
+        try:
+            self.backend.convert(docx_path, tmp_path)
+            os.replace(tmp_path, pdf_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._added(pdf_path)
+        return pdf_path
+
+    def _added(self, pdf_path: Path) -> None:
+        size = pdf_path.stat().st_size
+        with self._size_lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = self._evict(keep=pdf_path) # The scan counts pdf_path
+                return
+            self._cache_bytes += size
+            if self._cache_bytes > self.max_bytes:
+                # Also picks up what other processes sharing the directory did
+                self._cache_bytes = self._evict(keep=pdf_path)
+
+    def _evict(self, keep: Path) -> int:
+        # Least recently used PDFs go first once the cache is past max_bytes;
+        # returns the size of what is left
+        entries = []
+        for bucket in os.scandir(self.cache_dir):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".pdf") and not entry.name.startswith("."):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.path, st.st_size))
+        total = sum(size for _mtime, _path, size in entries)
+        for _mtime, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if Path(path) == keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            if self._backend is not None:
+                self._backend.close()
+
+
+_default_converter: Optional[DocxConverter] = None
+_default_lock = threading.Lock()
+
+
+def default_docx_converter() -> DocxConverter:
+    # Shared by every extend in the process, so a converter process started for
+    # one document serves the next; it is stopped at exit
+    global _default_converter
+    with _default_lock:
+        if _default_converter is None:
+            _default_converter = DocxConverter(cache_dir=default_docx_cache_dir())
+            atexit.register(_default_converter.close)
+        return _default_converter
@@ -1,51 +1,78 @@
 from __future__ import annotations
 
+import dataclasses
+import os
+import shutil
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Callable, Iterable, List, Mapping, Optional, Tuple
 
-from PIL import Image
 from pypdf import PdfReader, PdfWriter
-
-
-def _ensure_unique_path(target_path: Path) -> Path:
-    if not target_path.exists():
-        return target_path
-
-    stem = target_path.stem
-    suffix = target_path.suffix
-    parent = target_path.parent
-
-    i = 1
-    while True:
-        candidate = parent / f"{stem}_{i}{suffix}"
-        if not candidate.exists():
-            return candidate
-        i += 1
-
-
-def _image_paths_to_pdf(
-    image_paths: List[Path],
-    output_pdf_path: Path,
-    resolution: float = 300.0,
-) -> None:
-    images: List[Image.Image] = []
-
-    for image_path in image_paths:
-        img = Image.open(image_path)
-        if img.mode == "RGBA":
-            rgb = Image.new("RGB", img.size, (255, 255, 255))
-            rgb.paste(img, mask=img.split()[3])
-            img = rgb
-        elif img.mode != "RGB":
-            img = img.convert("RGB")
-        images.append(img)
-
-    if not images:
-        raise ValueError("No images provided")
-
-    first = images[0]
-    rest = images[1:]
-    first.save(output_pdf_path, "PDF", resolution=resolution, save_all=True, append_images=rest)
+from pypdf.generic import DictionaryObject, NameObject
+
+from src.core.admission import AdmissionController
+from src.core.docx_pdf import DocxConverter, default_docx_converter
+from src.core.imaging import WHITE, PageOptions, load_page
+from src.core.pdfappend import (
+    IncrementalPdfAppender,
+    PreparedPages,
+    image_page_objects,
+    prepare_image_page,
+    prepare_pdf_pages,
+)
+from src.core.naming import unique_path
+from src.core.page_cache import PageCache
+from src.core.pdfwriter import PageImage, page_size_pt
+from src.core.stats import ConversionStats
+
+
+_IMAGE_PAGE_OPTIONS = PageOptions(resolution=300.0)
+
+_FICLONE = 0x40049409 # Linux ioctl making dst a copy-on-write clone of src
+
+
+def attachment_options(
+    background: Tuple[int, int, int] = WHITE,
+    target_dpi: Optional[float] = None,
+    page_size: Optional[Tuple[float, float]] = None,
+) -> PageOptions:
+    return dataclasses.replace(_IMAGE_PAGE_OPTIONS, background=background, target_dpi=target_dpi, page_size=page_size)
+
+
+def prepare_attachment(path: Path, options: PageOptions = _IMAGE_PAGE_OPTIONS, page_cache: Optional[PageCache] = None) -> PreparedPages:
+    # An attachment parsed (or loaded) once, for appending to many documents
+    # through extend_document's prepared argument
+    if path.suffix.lower() == ".pdf":
+        return prepare_pdf_pages(path)
+    loader = page_cache.load_page if page_cache is not None else load_page
+    return prepare_image_page(loader(path, options), options.resolution)
+
+
+def _add_image_page(writer: PdfWriter, page: PageImage, resolution: float) -> None:
+    # The page's already encoded image goes in as is, as with StreamingPdfWriter.
+    # Streams have to be indirect objects and pypdf has no public way to add
+    # one to a writer, hence _add_object (see the pypdf pin in requirements.txt).
+    image, page_dict, contents = image_page_objects(page, resolution)
+    resources = page_dict["/Resources"]
+    resources[NameObject("/XObject")] = DictionaryObject({NameObject("/image"): writer._add_object(image)})
+    pdf_page = writer.add_blank_page(*page_size_pt(page, resolution))
+    pdf_page[NameObject("/Resources")] = resources
+    pdf_page[NameObject("/Contents")] = writer._add_object(contents)
+
+
+def _clone_file(src: Path, dst: Path) -> None:
+    # A copy-on-write clone where the filesystem has them (Btrfs, XFS, ...),
+    # which shares the extents instead of reading and writing them; a plain
+    # copy elsewhere. A hard link would not do: appending to it would change
+    # the source as well.
+    try:
+        import fcntl
+
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
 
 
 def _append_pdf_to_writer(writer: PdfWriter, pdf_path: Path) -> int:
@@ -55,13 +82,40 @@ def _append_pdf_to_writer(writer: PdfWriter, pdf_path: Path) -> int:
     return len(reader.pages)
 
 
-def _append_images_to_writer(writer: PdfWriter, image_paths: List[Path], temp_dir: Path) -> int:
-    if not image_paths:
-        return 0
+def _append_attachments(
+    attachment_paths: List[Path],
+    add_pdf: Callable[[Path], int],
+    add_image: Callable[[PageImage], None],
+    options: PageOptions = _IMAGE_PAGE_OPTIONS,
+    stats: Optional[ConversionStats] = None,
+    page_cache: Optional[PageCache] = None,
+    admission: Optional[AdmissionController] = None,
+    prepared: Optional[Mapping[str, PreparedPages]] = None,
+    add_prepared: Optional[Callable[[PreparedPages], int]] = None,
+) -> int:
+    # add_pdf(path) adds every page of a PDF and returns how many; add_image(page)
+    # adds one image page. Images are added as soon as they are loaded, with no
+    # intermediate PDF to write and parse again. Attachments found in prepared
+    # (by absolute path) go to add_prepared instead.
+    loader = page_cache.load_page if page_cache is not None else load_page
+    if admission is not None:
+        loader = admission.admit_loader(loader)
 
-    tmp_pdf = temp_dir / f"_images_{abs(hash(tuple(str(p) for p in image_paths)))}.pdf"
-    _image_paths_to_pdf(image_paths, tmp_pdf)
-    return _append_pdf_to_writer(writer, tmp_pdf)
+    added_pages = 0
+    for p in attachment_paths:
+        ready = prepared.get(os.path.abspath(p)) if prepared else None
+        if ready is not None:
+            added_pages += add_prepared(ready)
+            continue
+        if p.suffix.lower() == ".pdf":
+            added_pages += add_pdf(p)
+            continue
+        page = loader(p, options)
+        add_image(page)
+        if stats is not None:
+            stats.record_page(page.passthrough)
+        added_pages += 1
+    return added_pages
 
 
 def extend_document(
@@ -72,7 +126,37 @@ def extend_document(
     output_filename: str,
     temp_dir: Path,
     rename_base_to_original: bool = True,
+    stats: Optional[ConversionStats] = None,
+    background: Tuple[int, int, int] = WHITE,
+    target_dpi: Optional[float] = None,
+    page_size: Optional[Tuple[float, float]] = None,
+    page_cache: Optional[PageCache] = None,
+    admission: Optional[AdmissionController] = None,
+    incremental: bool = False,
+    append_in_place: bool = False,
+    docx_converter: Optional[DocxConverter] = None,
+    prepared: Optional[Mapping[str, PreparedPages]] = None,
 ) -> Tuple[Path, Optional[Path], int]:
+    # admission, which may be shared with conversions running alongside, holds
+    # each image back until its decoded size fits the memory budget and may
+    # downscale oversized ones.
+    #
+    # With incremental the base PDF is not rewritten: the attachments are
+    # appended to its bytes as a PDF incremental update. Those bytes still have
+    # to reach the output, though, and unless the filesystem can clone files
+    # copying them costs as much as the base is large. Only appending to the
+    # base file itself avoids that: when the output is the base, or with
+    # append_in_place, which moves a PDF base to the output first (a rename on
+    # the same filesystem). The base path is then gone, but the original stays
+    # recoverable: the output up to pdfappend.previous_revision_size is the
+    # base byte for byte, and a failed append puts the base back as it was.
+    #
+    # A DOCX base is converted by docx_converter, by default one shared by the
+    # whole process with a cache of converted documents.
+    #
+    # prepared maps absolute attachment paths to pages made by
+    # prepare_attachment, which are appended without parsing the attachment
+    # again; it needs incremental.
     base_type_norm = base_type.strip().lower()
 
     if base_type_norm not in {"pdf", "docx"}:
@@ -81,6 +165,15 @@ def extend_document(
     if not attachment_paths:
         raise ValueError("No attachments provided")
 
+    if prepared and not incremental:
+        raise ValueError("prepared attachments can only be appended incrementally")
+
+    if append_in_place and not (incremental and base_type_norm == "pdf"):
+        raise ValueError("only a PDF base can be appended to in place, and only incrementally")
+
+    if append_in_place and rename_base_to_original:
+        raise ValueError("append_in_place gives the base up, so it cannot also be kept as *_original")
+
     output_dir.mkdir(parents=True, exist_ok=True)
 
     output_path = output_dir / output_filename
@@ -89,40 +182,67 @@ def extend_document(
 
     if rename_base_to_original:
         base_original_candidate = base_path.with_name(f"{base_path.stem}_original{base_path.suffix}")
-        renamed_base_path = _ensure_unique_path(base_original_candidate)
-        base_path.rename(renamed_base_path)
+        renamed_base_path = unique_path(base_original_candidate)
+        try:
+            os.replace(base_path, renamed_base_path) # Over the placeholder when a suffixed name was reserved
+        except BaseException:
+            if renamed_base_path != base_original_candidate:
+                renamed_base_path.unlink(missing_ok=True)
+            raise
         base_path = renamed_base_path
 
     base_pdf_path = base_path
-    temp_base_pdf_path: Optional[Path] = None
 
     if base_type_norm == "docx":
-        from docx2pdf import convert
-
-        temp_base_pdf_path = temp_dir / f"{base_path.stem}.pdf"
-        temp_base_pdf_path.parent.mkdir(parents=True, exist_ok=True)
-        convert(str(base_path), str(temp_base_pdf_path))
-        base_pdf_path = temp_base_pdf_path
+        converter = docx_converter if docx_converter is not None else default_docx_converter()
+        base_pdf_path = converter.convert(base_path, temp_dir)
+
+    options = attachment_options(background, target_dpi, page_size)
+
+    if incremental:
+        copied = moved = False
+        if output_path.exists() and os.path.samefile(output_path, base_pdf_path):
+            pass
+        elif append_in_place:
+            shutil.move(base_pdf_path, output_path)
+            moved = True
+        else:
+            _clone_file(base_pdf_path, output_path)
+            copied = True
+        try:
+            with IncrementalPdfAppender(output_path) as appender:
+                added_pages = _append_attachments(
+                    attachment_paths,
+                    appender.add_pdf_pages,
+                    lambda page: appender.add_image_page(page, options.resolution),
+                    options,
+                    stats,
+                    page_cache,
+                    admission,
+                    prepared,
+                    appender.add_prepared,
+                )
+        except BaseException:
+            if copied:
+                output_path.unlink(missing_ok=True)
+            elif moved:
+                shutil.move(output_path, base_pdf_path) # Already cut back to the original
+            raise
+        return output_path, renamed_base_path, added_pages
 
     writer = PdfWriter()
 
     _append_pdf_to_writer(writer, base_pdf_path)
 
-    temp_dir.mkdir(parents=True, exist_ok=True)
-
-    added_pages = 0
-    buffered_images: List[Path] = []
-
-    for p in attachment_paths:
-        suffix = p.suffix.lower()
-        if suffix == ".pdf":
-            added_pages += _append_images_to_writer(writer, buffered_images, temp_dir)
-            buffered_images = []
-            added_pages += _append_pdf_to_writer(writer, p)
-        else:
-            buffered_images.append(p)
-
-    added_pages += _append_images_to_writer(writer, buffered_images, temp_dir)
+    added_pages = _append_attachments(
+        attachment_paths,
+        lambda p: _append_pdf_to_writer(writer, p),
+        lambda page: _add_image_page(writer, page, options.resolution),
+        options,
+        stats,
+        page_cache,
+        admission,
+    )
 
     with output_path.open("wb") as f:
         writer.write(f)
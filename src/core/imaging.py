@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from PIL import Image
+
+from src.core.passthrough import passthrough_page
+from src.core.pdfwriter import PageImage, encode_image
+
+
+WHITE = (255, 255, 255)
+
+# Page sizes in points
+PAGE_SIZES = {
+    "a3": (841.89, 1190.55),
+    "a4": (595.28, 841.89),
+    "a5": (419.53, 595.28),
+    "letter": (612.0, 792.0),
+    "legal": (612.0, 1008.0),
+}
+
+
+@dataclass(frozen=True)
+class PageOptions:
+    # Pixels per inch used to size a page from its image when nothing is reduced
+    resolution: float = 100.0
+    # JPEG quality for re-encoded pages; None keeps Pillow's default
+    quality: Optional[int] = None
+    background: Tuple[int, int, int] = WHITE
+    # Maximum pixel density embedded in a page
+    target_dpi: Optional[float] = None
+    # Maximum physical page size in points; larger images are scaled down to fit
+    page_size: Optional[Tuple[float, float]] = None
+
+    @property
+    def resizes(self) -> bool:
+        return self.target_dpi is not None or self.page_size is not None
+
+# Modes Image.paste() accepts directly as a mask; the alpha band is read in place
+# without splitting the image into separate band images.
+_MASK_MODES = {"LA", "RGBA"}
+_PREMULTIPLIED = {"La": "LA", "RGBa": "RGBA"}
+
+
+def has_alpha(image: Image.Image) -> bool:
+    return image.mode in {"LA", "La", "PA", "RGBA", "RGBa"} or "transparency" in image.info
+
+
+def flatten_to_rgb(image: Image.Image, background: Tuple[int, int, int] = WHITE) -> Image.Image:
+    # Composites any alpha-bearing image onto a solid background and returns RGB.
+    # The only full-size allocation is the background itself, except for palette
+    # and colour-keyed images, which have to be expanded to RGBA first.
+    if image.mode == "RGB" and "transparency" not in image.info:
+        return image
+
+    if not has_alpha(image):
+        return image.convert("RGB")
+
+    if image.mode == "P":
+        return _flatten_palette(image, background)
+
+    if image.mode == "LA" and background[0] == background[1] == background[2]:
+        # Composite in one byte per pixel and expand to RGB once at the end
+        gray_image = Image.new("L", image.size, background[0])
+        gray_image.paste(image.convert("L"), mask=image)
+        return gray_image.convert("RGB")
+
+    if image.mode in _PREMULTIPLIED:
+        image = image.convert(_PREMULTIPLIED[image.mode])
+    elif image.mode not in _MASK_MODES:
+        image = image.convert("RGBA")
+
+    # RGB.paste() only understands RGBA sources; LA keeps its own alpha as the mask
+    source = image.convert("RGB") if image.mode == "LA" else image
+
+    rgb_image = Image.new("RGB", image.size, background)
+    rgb_image.paste(source, mask=image)
+    return rgb_image
+
+
+def _flatten_palette(image: Image.Image, background: Tuple[int, int, int]) -> Image.Image:
+    # Transparency in a palette image is per palette entry, so blending the (at
+    # most 256) entries with the background is enough; no per-pixel composite.
+    transparency = image.info["transparency"]
+    if isinstance(transparency, int):
+        alphas = {transparency: 0}
+    else:
+        alphas = dict(enumerate(transparency))
+
+    palette = image.getpalette("RGB") or []
+    for index, alpha in alphas.items():
+        for channel in range(3):
+            offset = index * 3 + channel
+            if offset < len(palette):
+                palette[offset] = (palette[offset] * alpha + background[channel] * (255 - alpha) + 127) // 255
+
+    flat_image = image.copy()
+    flat_image.info.pop("transparency", None)
+    flat_image.putpalette(palette)
+    return flat_image.convert("RGB")
+
+
+def open_flattened(path: Union[str, Path], background: Tuple[int, int, int] = WHITE) -> Image.Image:
+    return flatten_to_rgb(Image.open(path), background)
+
+
+def page_geometry(
+    width: int,
+    height: int,
+    options: PageOptions,
+) -> Tuple[Tuple[float, float], Optional[Tuple[int, int]]]:
+    # Returns the page size in points and the pixel size to decode at, or None
+    # when the image is already at or below the density the page needs.
+    width_pt = width * 72.0 / options.resolution
+    height_pt = height * 72.0 / options.resolution
+
+    if options.page_size is not None:
+        max_width_pt, max_height_pt = options.page_size
+        scale = min(max_width_pt / width_pt, max_height_pt / height_pt)
+        if scale < 1:
+            width_pt *= scale
+            height_pt *= scale
+
+    if options.target_dpi is None:
+        return (width_pt, height_pt), None
+
+    target_width = max(1, round(width_pt / 72.0 * options.target_dpi))
+    target_height = max(1, round(height_pt / 72.0 * options.target_dpi))
+    if target_width >= width and target_height >= height:
+        return (width_pt, height_pt), None
+    return (width_pt, height_pt), (target_width, target_height)
+
+
+def passthrough_for_page(path: Union[str, Path], options: PageOptions) -> Optional[PageImage]:
+    # The file's own compressed data, when it is eligible and needs no reduction
+    page = passthrough_page(path)
+    if page is None:
+        return None
+    size_pt, decode_size = page_geometry(page.width, page.height, options)
+    if decode_size is not None:
+        return None
+    return dataclasses.replace(page, size_pt=size_pt)
+
+
+def load_page(path: Union[str, Path], options: PageOptions) -> PageImage:
+    page = passthrough_for_page(path, options)
+    if page is not None:
+        return page
+    return decode_page(path, options)
+
+
+def decode_page(path: Union[str, Path], options: PageOptions) -> PageImage:
+    # Decodes only at the size the page needs (JPEG draft mode and reduce() via
+    # thumbnail()), flattens any alpha and re-encodes.
+    image = Image.open(path)
+    size_pt, decode_size = page_geometry(image.width, image.height, options)
+    if decode_size is not None:
+        image.thumbnail(decode_size)
+
+    page = encode_image(flatten_to_rgb(image, options.background), options.quality)
+    return dataclasses.replace(page, size_pt=size_pt)
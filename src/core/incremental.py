@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.core.imaging import PageOptions
+from src.core.page_cache import file_digest
+from src.core.pdfwriter import PageImage, page_fields, page_from_fields
+
+
+# Incremental rebuilds of a combined PDF. A manifest next to the output records,
+# for every page, the input file's size, mtime and hash plus where its image
+# stream sits in the output. On the next run pages whose input is unchanged are
+# copied from the previous output as raw stream bytes, so only changed inputs
+# are decoded and re-encoded. The output itself is still written out in full:
+# what an unchanged page saves is its decode and encode, not its output I/O,
+# which stays proportional to the whole document. Inputs are only hashed when
+# their size and mtime no longer match the manifest, and at most once a run.
+
+_MANIFEST_VERSION = 1
+
+PageLoader = Callable[[Union[str, Path], PageOptions], PageImage]
+
+
+def manifest_path(pdf_path: Union[str, Path]) -> Path:
+    pdf_path = Path(pdf_path)
+    return pdf_path.with_name(f".{pdf_path.name}.manifest.json")
+
+
+def _input_key(path: Union[str, Path]) -> str:
+    return os.path.abspath(path)
+
+
+def _output_stamp(pdf_path: Path) -> Dict[str, int]:
+    st = pdf_path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class IncrementalBuild:
+    def __init__(self, pdf_path: Union[str, Path], options: PageOptions) -> None:
+        self.pdf_path = Path(pdf_path)
+        self.options = options
+
+        self._lock = threading.Lock()
+        self._previous: Dict[str, Dict[str, Any]] = self._load_previous()
+        self._reused: Dict[str, Dict[str, Any]] = {}
+        # Input path -> (size, mtime_ns, sha256) hashed during this run
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._pages: List[Dict[str, Any]] = []
+        self._fp = None
+
+    @property
+    def has_previous(self) -> bool:
+        return bool(self._previous)
+
+    def _load_previous(self) -> Dict[str, Dict[str, Any]]:
+        # The manifest is only trusted while the output is exactly as we left it
+        try:
+            manifest = json.loads(manifest_path(self.pdf_path).read_text(encoding="utf-8"))
+            if (
+                manifest.get("version") != _MANIFEST_VERSION
+                or manifest.get("options") != repr(self.options)
+                or manifest.get("output") != _output_stamp(self.pdf_path)
+            ):
+                return {}
+            return {entry["path"]: entry for entry in manifest["pages"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _digest(self, path: Union[str, Path], st: os.stat_result) -> str:
+        key = _input_key(path)
+        previous = self._previous.get(key)
+        if previous is not None and (previous["size"], previous["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            return previous["sha256"]
+        with self._lock:
+            known = self._digests.get(key)
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[key] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def _unchanged_input(self, path: Union[str, Path], entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Returns the input's current record when its content matches the entry.
+        # A size and mtime match is trusted; otherwise the file is hashed so a
+        # touched but unchanged input is still reused.
+        st = os.stat(path)
+        if st.st_size != entry["size"]:
+            return None
+        if st.st_mtime_ns == entry["mtime_ns"]:
+            return entry
+        if self._digest(path, st) != entry["sha256"]:
+            return None
+        return dict(entry, mtime_ns=st.st_mtime_ns)
+
+    def _previous_page(self, path: Union[str, Path]) -> Optional[PageImage]:
+        key = _input_key(path)
+        entry = self._previous.get(key)
+        if entry is None:
+            return None
+        try:
+            record = self._unchanged_input(path, entry)
+            if record is None:
+                return None
+            with self._lock:
+                if self._fp is None:
+                    self._fp = self.pdf_path.open("rb")
+                self._fp.seek(entry["offset"])
+                data = self._fp.read(entry["length"])
+            if len(data) != entry["length"]:
+                return None
+            page = page_from_fields(entry["page"], data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        with self._lock:
+            self._reused[key] = record
+        return page
+
+    def loader(self, load_page: PageLoader) -> PageLoader:
+        def load(path: Union[str, Path], options: PageOptions) -> PageImage:
+            page = self._previous_page(path)
+            if page is None:
+                page = load_page(path, options)
+            return page
+        return load
+
+    def record(self, path: Union[str, Path], page: PageImage, offset: int) -> bool:
+        # Called in page order once a page has been written to the new output;
+        # returns whether the page was copied from the previous output
+        key = _input_key(path)
+        with self._lock:
+            record = self._reused.get(key)
+        if record is not None:
+            entry = {k: record[k] for k in ("path", "size", "mtime_ns", "sha256")}
+        else:
+            st = os.stat(path)
+            entry = {"path": key, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": self._digest(path, st)}
+
+        entry.update(
+            page_index=len(self._pages),
+            offset=offset,
+            length=len(page.data),
+            page=page_fields(page),
+        )
+        self._pages.append(entry)
+        return record is not None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def commit(self, pdf_path: Union[str, Path]) -> None:
+        # Writes the manifest for the output now at pdf_path
+        self.close()
+        pdf_path = Path(pdf_path)
+        manifest = {
+            "version": _MANIFEST_VERSION,
+            "options": repr(self.options),
+            "output": _output_stamp(pdf_path),
+            "pages": self._pages,
+        }
+        target = manifest_path(pdf_path)
+        tmp_path = target.with_name(f"{target.name}.tmp")
+        tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_path, target)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+# Append-only journal of a conversion job. The first line describes the job;
+# each later line records one input that was converted, with the output it went
+# to. Reopening the journal for the same job lets a rerun skip everything that
+# already finished with one dict lookup and two stats per file. A line cut off
+# by a crash is ignored.
+
+_JOURNAL_VERSION = 1
+
+
+def _stamp(path: Union[str, Path]) -> Optional[Dict[str, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class JobJournal:
+    def __init__(self, path: Union[str, Path], sync_every: int = 64) -> None:
+        self.path = Path(path)
+        self.sync_every = sync_every
+        self._lock = threading.Lock()
+        self._done: Dict[str, Dict[str, Any]] = {}
+        self._fp = None
+        self._unsynced = 0
+
+    def begin(self, job: Dict[str, Any]) -> int:
+        # Opens the journal for this job and returns how many inputs it already
+        # records. A journal written for different job settings is started over.
+        header = dict(job, version=_JOURNAL_VERSION)
+        entries: Dict[str, Dict[str, Any]] = {}
+        matches = False
+        try:
+            with self.path.open("r", encoding="utf-8") as fp:
+                for i, line in enumerate(fp):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # Torn write from an interrupted run
+                    if i == 0:
+                        matches = record == header
+                        if not matches:
+                            break
+                    elif "input" in record:
+                        entries[record["input"]] = record
+        except OSError:
+            pass
+
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if matches:
+            self._fp = self.path.open("a", encoding="utf-8")
+            self._fp.write("\n") # Terminates a torn last line, if there is one
+        else:
+            entries = {}
+            self._fp = self.path.open("w", encoding="utf-8")
+            self._fp.write(json.dumps(header) + "\n")
+        self._fp.flush()
+        self._done = entries
+        return len(entries)
+
+    def completed_output(self, input_path: Union[str, Path]) -> Optional[Path]:
+        # The output recorded for input_path, if the input is unchanged since and
+        # the output is still there
+        record = self._done.get(os.path.abspath(input_path))
+        if record is None:
+            return None
+        if _stamp(input_path) != record["stamp"] or not os.path.exists(record["output"]):
+            return None
+        return Path(record["output"])
+
+    def record(self, input_path: Union[str, Path], output_path: Union[str, Path]) -> None:
+        entry = {
+            "input": os.path.abspath(input_path),
+            "stamp": _stamp(input_path),
+            "output": os.path.abspath(output_path),
+        }
+        with self._lock:
+            self._done[entry["input"]] = entry
+            if self._fp is None:
+                return
+            self._fp.write(json.dumps(entry) + "\n")
+            self._fp.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                os.fsync(self._fp.fileno())
+                self._unsynced = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fp is not None:
+                self._fp.flush()
+                os.fsync(self._fp.fileno())
+                self._fp.close()
+                self._fp = None
+                self._unsynced = 0
+
+
+class JobControl:
+    # Cooperative cancel and pause. The conversion checks it between files; a
+    # pause lets in-flight files finish and then releases worker processes until
+    # resumed, and a cancel stops without starting anything new.
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self._paused = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def cancel(self) -> None:
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def pause(self) -> None:
+        with self._cond:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def wait_while_paused(self) -> bool:
+        # Returns False when the job was cancelled
+        with self._cond:
+            while self._paused and not self._cancelled:
+                self._cond.wait()
+            return not self._cancelled
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+
+
+# Hands out unused file names in one directory: the requested name when it is
+# free, otherwise stem_1, stem_2, ... The directory is listed once with scandir
+# and names are tracked in memory, so each allocation is amortised O(1) even
+# when many inputs share a stem. A name is reserved by creating it exclusively
+# (an empty placeholder the caller then overwrites), so allocators in other
+# threads or processes writing to the same directory never get the same name.
+# Every name an allocator hands out, and every name a caller says is claimed
+# (a pending write the directory does not show yet), stays taken for its
+# lifetime, so the same name is never handed out twice in one run.
+
+
+def _name_key(name: str) -> str:
+    return os.path.normcase(name)
+
+
+class OutputNameAllocator:
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._taken: Optional[Set[str]] = None
+        # Next suffix to try per (stem, extension); every lower one is known taken
+        self._next_suffix: Dict[Tuple[str, str], int] = {}
+
+    def _index(self) -> Set[str]:
+        if self._taken is None:
+            try:
+                with os.scandir(self.directory) as entries:
+                    self._taken = {_name_key(entry.name) for entry in entries}
+            except FileNotFoundError:
+                self._taken = set()
+        return self._taken
+
+    def _reserve(self, name: str) -> bool:
+        try:
+            fd = os.open(self.directory / name, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def is_taken(self, target: Union[str, Path]) -> bool:
+        # Whether the name was in the directory when indexed or handed out since
+        with self._lock:
+            return _name_key(Path(target).name) in self._index()
+
+    def _claim(self, name: str, reserve: bool) -> bool:
+        if reserve:
+            return self._reserve(name)
+        return not os.path.lexists(self.directory / name)
+
+    def allocate(self, target: Union[str, Path], reserve: bool = True, taken: Iterable[Union[str, Path]] = ()) -> Path:
+        # target names a file in this directory. With reserve=False nothing is
+        # created; the name is only checked and remembered, for callers that
+        # write it some other way. taken lists names in this directory that are
+        # already claimed though not on disk, e.g. target itself when the caller
+        # wants a replacement for it.
+        name = Path(target).name
+        stem, suffix = os.path.splitext(name)
+        key = (_name_key(stem), _name_key(suffix))
+
+        with self._lock:
+            index = self._index()
+            index.update(_name_key(Path(claimed).name) for claimed in taken)
+            candidate = name
+            while True:
+                if _name_key(candidate) not in index:
+                    index.add(_name_key(candidate))
+                    if self._claim(candidate, reserve):
+                        return self.directory / candidate
+                    # Created since the directory was indexed
+                n = self._next_suffix.get(key, 1)
+                self._next_suffix[key] = n + 1
+                candidate = f"{stem}_{n}{suffix}"
+
+
+def unique_path(target: Union[str, Path], reserve: bool = True) -> Path:
+    # One-off allocation for callers with a single name to find. A free target
+    # is returned without creating anything; only a substitute name is reserved,
+    # so a caller whose write then fails removes the placeholder when the result
+    # differs from target.
+    target = Path(target)
+    if not os.path.lexists(target):
+        return target
+    return OutputNameAllocator(target.parent).allocate(target, reserve)
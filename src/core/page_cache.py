@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from src.core.imaging import PageOptions, decode_page, passthrough_for_page
+from src.core.pdfwriter import PageImage, page_fields, page_from_fields
+
+
+# On-disk cache of re-encoded page image streams, keyed on the input file's
+# content hash plus the PageOptions used to encode it. Entries are one file
+# each: a 4-byte header length, a JSON header with the PageImage fields, then
+# the raw stream bytes. Least recently used entries are evicted past max_bytes.
+
+_CACHE_VERSION = 1
+_ENTRY_SUFFIX = ".page"
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "utilitybox" / "pages"
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _serialize_page(page: PageImage) -> bytes:
+    header = json.dumps(page_fields(page), separators=(",", ":")).encode("utf-8")
+    return struct.pack(">I", len(header)) + header + page.data
+
+
+def _deserialize_page(raw: bytes) -> PageImage:
+    (header_length,) = struct.unpack(">I", raw[:4])
+    return page_from_fields(json.loads(raw[4:4 + header_length]), raw[4 + header_length:])
+
+
+class PageCache:
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = 1024 * 1024 * 1024) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._ensure_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+    def key(self, path: Union[str, Path], options: PageOptions) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{_CACHE_VERSION}|{options!r}|".encode("utf-8"))
+        digest.update(file_digest(path).encode("ascii"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{_ENTRY_SUFFIX}"
+
+    def _ensure_index(self) -> None:
+        # The index is built lazily, oldest access first, from the entry mtimes
+        if self._entries is not None:
+            return
+        found = []
+        if self.cache_dir.is_dir():
+            for bucket in os.scandir(self.cache_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(_ENTRY_SUFFIX):
+                        st = entry.stat()
+                        found.append((st.st_mtime, entry.name[: -len(_ENTRY_SUFFIX)], st.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, size) for _mtime, key, size in found)
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, key: str) -> Optional[PageImage]:
+        entry_path = self._entry_path(key)
+        try:
+            raw = entry_path.read_bytes()
+            page = _deserialize_page(raw)
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if self._entries is not None:
+                if key not in self._entries:
+                    self._total_bytes += len(raw)
+                self._entries[key] = len(raw)
+                self._entries.move_to_end(key)
+        return page
+
+    def put(self, key: str, page: PageImage) -> None:
+        raw = _serialize_page(page)
+        if len(raw) > self.max_bytes:
+            return
+
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(raw)
+        os.replace(tmp_path, entry_path)
+
+        with self._lock:
+            self._ensure_index()
+            self._total_bytes += len(raw) - self._entries.pop(key, 0)
+            self._entries[key] = len(raw)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+
+    def trim(self) -> None:
+        # Re-reads the directory and evicts down to max_bytes; useful after other
+        # processes have been writing to the same cache.
+        with self._lock:
+            self._entries = None
+            self._ensure_index()
+            self._evict()
+
+    def load_page(self, path: Union[str, Path], options: PageOptions) -> PageImage:
+        # Passthrough pages are already just a file read, so only decoded pages are cached
+        page = passthrough_for_page(path, options)
+        if page is not None:
+            return page
+
+        key = self.key(path, options)
+        page = self.get(key)
+        if page is None:
+            page = decode_page(path, options)
+            self.put(key, page)
+        return page
+
+    def counts(self) -> Tuple[int, int, int]:
+        with self._lock:
+            return self.hits, self.misses, self.evictions
+
+    def add_counts(self, hits: int, misses: int, evictions: int) -> None:
+        # Folds in counters from worker processes sharing the directory
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def __reduce__(self):
+        # Worker processes share one instance per directory, so its index is only
+        # built once per process rather than once per task
+        return (_process_page_cache, (self.cache_dir, self.max_bytes))
+
+
+_process_caches: Dict[Tuple[Path, int], PageCache] = {}
+
+
+def _process_page_cache(cache_dir: Path, max_bytes: int) -> PageCache:
+    key = (Path(cache_dir), max_bytes)
+    if key not in _process_caches:
+        _process_caches[key] = PageCache(cache_dir, max_bytes)
+    return _process_caches[key]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import List, Optional, Union
+
+from src.core.pdfwriter import PageImage, PdfName
+
+
+# Fast paths that embed an input file's compressed data directly as a PDF image
+# stream, without decoding any pixels. Every function returns None when the file
+# is not eligible, and the caller falls back to decoding and re-encoding.
+
+_JPEG_SIGNATURE = b"\xff\xd8"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_DCT_SOF_MARKERS = {0xC0, 0xC1, 0xC2}  # baseline, extended sequential, progressive (Huffman)
+
+
+def jpeg_page(path: Union[str, Path]) -> Optional[PageImage]:
+    try:
+        with open(path, "rb") as fp:
+            if fp.read(2) != _JPEG_SIGNATURE:
+                return None
+
+            adobe = False
+            frame = None
+            while True:
+                if fp.read(1) != b"\xff":
+                    return None
+                marker = fp.read(1)
+                while marker == b"\xff":
+                    marker = fp.read(1)
+                if not marker:
+                    return None
+                code = marker[0]
+
+                if code == 0x01 or 0xD0 <= code <= 0xD8:
+                    continue
+                if code == 0xD9:
+                    return None
+
+                (length,) = struct.unpack(">H", fp.read(2))
+                segment = fp.read(length - 2)
+
+                if code == 0xEE and segment.startswith(b"Adobe"):
+                    adobe = True
+                elif code in _SOF_MARKERS:
+                    if code not in _DCT_SOF_MARKERS:
+                        return None
+                    frame = struct.unpack(">BHHB", segment[:6])
+                elif code == 0xDA:
+                    break
+
+            fp.seek(0)
+            data = fp.read()
+    except (OSError, struct.error):
+        return None
+
+    if frame is None:
+        return None
+
+    precision, height, width, components = frame
+    if precision != 8 or not width or not height:
+        return None
+
+    decode = None
+    if components == 1:
+        color_space, procset = PdfName("DeviceGray"), "ImageB"
+    elif components == 3:
+        color_space, procset = PdfName("DeviceRGB"), "ImageC"
+    elif components == 4 and adobe:
+        # Adobe CMYK JPEGs are stored inverted
+        color_space, procset = PdfName("DeviceCMYK"), "ImageC"
+        decode = [1, 0, 1, 0, 1, 0, 1, 0]
+    else:
+        return None
+
+    return PageImage(
+        width=width,
+        height=height,
+        data=data,
+        filter="DCTDecode",
+        color_space=color_space,
+        decode=decode,
+        procset=procset,
+        passthrough=True,
+    )
+
+
+def _png_header_eligible(header) -> bool:
+    _width, _height, bit_depth, color_type, compression, filter_method, interlace = header
+    if compression != 0 or filter_method != 0 or interlace != 0:
+        return False
+    if color_type in (0, 2):
+        return bit_depth == 8
+    return color_type == 3 and bit_depth in (1, 2, 4, 8)
+
+
+def png_page(path: Union[str, Path]) -> Optional[PageImage]:
+    # Non-interlaced 8-bit gray/RGB and palette PNGs without any transparency
+    # store their pixels as zlib data with per-row PNG predictors, which is exactly
+    # what /FlateDecode with /Predictor 15 expects, so the IDAT chunks are copied.
+    try:
+        with open(path, "rb") as fp:
+            if fp.read(8) != _PNG_SIGNATURE:
+                return None
+
+            header = None
+            palette = None
+            idat: List[bytes] = []
+            while True:
+                chunk_header = fp.read(8)
+                if len(chunk_header) < 8:
+                    return None
+                length, chunk_type = struct.unpack(">I4s", chunk_header)
+
+                if chunk_type == b"IHDR":
+                    header = struct.unpack(">IIBBBBB", fp.read(length))
+                    if not _png_header_eligible(header):
+                        return None
+                elif chunk_type == b"PLTE":
+                    palette = fp.read(length)
+                elif chunk_type == b"IDAT":
+                    idat.append(fp.read(length))
+                elif chunk_type == b"tRNS":
+                    return None
+                elif chunk_type == b"IEND":
+                    break
+                else:
+                    fp.seek(length, 1)
+                fp.seek(4, 1)  # CRC
+    except (OSError, struct.error):
+        return None
+
+    if header is None or not idat:
+        return None
+
+    width, height, bit_depth, color_type, _compression, _filter_method, _interlace = header
+    if color_type == 0:
+        colors, color_space, procset = 1, PdfName("DeviceGray"), "ImageB"
+    elif color_type == 2:
+        colors, color_space, procset = 3, PdfName("DeviceRGB"), "ImageC"
+    elif palette:
+        colors, procset = 1, "ImageI"
+        color_space = [PdfName("Indexed"), PdfName("DeviceRGB"), len(palette) // 3 - 1, palette]
+    else:
+        return None
+
+    return PageImage(
+        width=width,
+        height=height,
+        data=b"".join(idat),
+        filter="FlateDecode",
+        color_space=color_space,
+        bits_per_component=bit_depth,
+        decode_parms={
+            "Predictor": 15,
+            "Colors": colors,
+            "BitsPerComponent": bit_depth,
+            "Columns": width,
+        },
+        procset=procset,
+        passthrough=True,
+    )
+
+
+def passthrough_page(path: Union[str, Path]) -> Optional[PageImage]:
+    try:
+        with open(path, "rb") as fp:
+            signature = fp.read(8)
+    except OSError:
+        return None
+
+    if signature.startswith(_JPEG_SIGNATURE):
+        return jpeg_page(path)
+    if signature == _PNG_SIGNATURE:
+        return png_page(path)
+    return None
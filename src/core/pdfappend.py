@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import io
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    BooleanObject,
+    ByteStringObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+    TextStringObject,
+)
+
+from src.core.pdfwriter import PageImage, PdfName, image_dictionary, page_contents, page_size_pt
+
+
+# Appends pages to an existing PDF as an incremental update: the original bytes
+# are left as they are, and the new objects, a rewritten root page tree node and
+# a cross-reference section pointing back at the previous one are written after
+# them. pypdf reads the base lazily, so only its cross-reference data, trailer,
+# catalog and root page tree node are parsed, and the cost follows the pages
+# added rather than the size of the document. If the append fails the file is
+# cut back to its original length.
+#
+# Pages are first prepared: their objects are serialized once with relative
+# object numbers, and appending renumbers them past the file's last object. The
+# same cover sheet can so be parsed once and appended to many files.
+
+
+def pypdf_object(value: Any) -> PdfObject:
+    # pypdf object for a value as StreamingPdfWriter would serialize it
+    if isinstance(value, PdfObject):
+        return value
+    if isinstance(value, PdfName):
+        return NameObject(f"/{value}")
+    if isinstance(value, bool):
+        return BooleanObject(value)
+    if isinstance(value, int):
+        return NumberObject(value)
+    if isinstance(value, float):
+        return FloatObject(value)
+    if isinstance(value, bytes):
+        return ByteStringObject(value)
+    if isinstance(value, str):
+        return TextStringObject(value)
+    if isinstance(value, (list, tuple)):
+        return ArrayObject(pypdf_object(v) for v in value)
+    if isinstance(value, dict):
+        return DictionaryObject({NameObject(f"/{k}"): pypdf_object(v) for k, v in value.items() if v is not None})
+    raise TypeError(f"cannot convert {type(value).__name__} to a PDF object")
+
+
+def image_page_objects(page: PageImage, resolution: float) -> Tuple[StreamObject, DictionaryObject, StreamObject]:
+    # (image XObject, page, contents) for a page; the page's /Resources name the
+    # image /image and are completed with its reference by the caller
+    image = dict(pypdf_object(image_dictionary(page)), __streamdata__=page.data)
+    width_pt, height_pt = page_size_pt(page, resolution)
+    pdf_page = pypdf_object(
+        {
+            "Type": PdfName("Page"),
+            "MediaBox": [0, 0, width_pt, height_pt],
+            "Resources": {"ProcSet": [PdfName("PDF"), PdfName(page.procset)]},
+        }
+    )
+    contents = StreamObject.initialize_from_dictionary({"__streamdata__": page_contents(width_pt, height_pt)})
+    return StreamObject.initialize_from_dictionary(image), pdf_page, contents
+
+
+class _RelativeRef(IndirectObject):
+    # Reference written as a marker, renumbered when the pages are appended;
+    # number 0 stands for the root page tree node of the file appended to
+    def __init__(self, number: int) -> None:
+        super().__init__(number, 0, None)
+
+    def write_to_stream(self, stream, encryption_key=None) -> None:
+        stream.write(b"\x00ref%d\x00" % self.idnum)
+
+
+_RELATIVE_REF = re.compile(rb"\x00ref(\d+)\x00")
+
+
+@dataclass(frozen=True)
+class PreparedPages:
+    # Pages serialized once, ready to append to any number of files. Objects are
+    # numbered from 1 in the order given, each as its dictionary (or other
+    # value) with reference markers plus, for a stream, the raw stream data.
+    objects: Tuple[Tuple[bytes, Optional[bytes]], ...]
+    pages: Tuple[int, ...]
+
+
+def _template(value: PdfObject, data: Optional[bytes] = None) -> Tuple[bytes, Optional[bytes]]:
+    if data is not None:
+        value[NameObject("/Length")] = NumberObject(len(data))
+    buf = io.BytesIO()
+    value.write_to_stream(buf)
+    return buf.getvalue(), data
+
+
+def _finish_page(page: DictionaryObject) -> DictionaryObject:
+    # Explicit values for the attributes a page would otherwise inherit from the
+    # root node of the file it is appended to
+    page[NameObject("/Parent")] = _RelativeRef(0)
+    page.setdefault(NameObject("/Rotate"), NumberObject(0))
+    page.setdefault(NameObject("/CropBox"), page.raw_get("/MediaBox"))
+    return page
+
+
+def prepare_image_page(page: PageImage, resolution: float = 72.0) -> PreparedPages:
+    image, pdf_page, contents = image_page_objects(page, resolution)
+    pdf_page[NameObject("/Resources")][NameObject("/XObject")] = DictionaryObject({NameObject("/image"): _RelativeRef(1)})
+    pdf_page[NameObject("/Contents")] = _RelativeRef(2)
+    image_head = DictionaryObject({k: v for k, v in image.items()})
+    contents_head = DictionaryObject({k: v for k, v in contents.items()})
+    return PreparedPages(
+        objects=(_template(image_head, page.data), _template(contents_head, contents.get_data()), _template(_finish_page(pdf_page))),
+        pages=(3,),
+    )
+
+
+_IMAGE_CODECS = {"/DCTDecode", "/DCT", "/JPXDecode", "/JBIG2Decode", "/CCITTFaxDecode", "/CCF"}
+
+
+def _stored_bytes(stream: StreamObject) -> Optional[bytes]:
+    # The stream's bytes as they are in the file. pypdf has no public accessor
+    # for them; it keeps them in _data, which the pinned range in
+    # requirements.txt provides.
+    data = getattr(stream, "_data", None)
+    return data if isinstance(data, bytes) else None
+
+
+def _reencoded(stream: StreamObject, head: DictionaryObject) -> bytes:
+    # Falls back on the public decoded data, compressed again, for a pypdf
+    # that no longer has _data. get_data leaves image codecs encoded (or turns
+    # them into another format), so those streams cannot be rebuilt this way.
+    filters = stream.get("/Filter", ())
+    filters = [filters] if isinstance(filters, str) else list(filters)
+    if _IMAGE_CODECS.intersection(filters):
+        raise ValueError(f"cannot copy a {' '.join(filters)} stream without its stored bytes")
+    head.pop(NameObject("/DecodeParms"), None)
+    head[NameObject("/Filter")] = NameObject("/FlateDecode")
+    return zlib.compress(stream.get_data())
+
+
+def prepare_pdf_pages(pdf_path: Union[str, Path]) -> PreparedPages:
+    # Every page of a PDF, with everything its pages refer to; streams stay
+    # encoded and are copied as they are
+    with open(pdf_path, "rb") as fp:
+        reader = PdfReader(fp)
+        numbers: Dict[Tuple[int, int], int] = {}
+        pending: List[Tuple[IndirectObject, int]] = []
+        objects: Dict[int, Tuple[bytes, Optional[bytes]]] = {}
+        pages = list(reader.pages)
+        # Numbered first so links between the copied pages stay intact
+        page_numbers = []
+        for page in pages:
+            source = page.indirect_reference
+            numbers[(source.idnum, source.generation)] = len(numbers) + 1
+            page_numbers.append(len(numbers))
+
+        def remap(value: PdfObject) -> PdfObject:
+            if isinstance(value, IndirectObject):
+                key = (value.idnum, value.generation)
+                if key not in numbers:
+                    target = value.get_object()
+                    if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Page", "/Pages"):
+                        return NullObject() # A page that is not being copied
+                    numbers[key] = len(numbers) + 1
+                    pending.append((value, numbers[key]))
+                return _RelativeRef(numbers[key])
+            if isinstance(value, DictionaryObject):
+                return DictionaryObject({k: remap(v) for k, v in value.items()})
+            if isinstance(value, ArrayObject):
+                return ArrayObject(remap(v) for v in value)
+            return value
+
+        for page, number in zip(pages, page_numbers):
+            copy = DictionaryObject({k: remap(v) for k, v in page.items() if k != "/Parent"})
+            objects[number] = _template(_finish_page(copy))
+            while pending:
+                source, source_number = pending.pop()
+                target = source.get_object()
+                if isinstance(target, StreamObject):
+                    head = DictionaryObject({k: remap(v) for k, v in target.items() if k != "/Length"})
+                    data = _stored_bytes(target)
+                    if data is None:
+                        data = _reencoded(target, head)
+                    objects[source_number] = _template(head, data) # Still encoded
+                else:
+                    objects[source_number] = _template(remap(target))
+    return PreparedPages(objects=tuple(objects[n] for n in range(1, len(numbers) + 1)), pages=tuple(page_numbers))
+
+
+def _find_startxref(fp) -> int:
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell()
+    fp.seek(max(0, size - 1024))
+    tail = fp.read()
+    at = tail.rfind(b"startxref")
+    if at < 0:
+        raise ValueError("startxref not found")
+    return int(tail[at + len(b"startxref"):].split()[0])
+
+
+def previous_revision_size(path: Union[str, Path]) -> int:
+    # Length of the document before its last incremental update, so cutting
+    # the file back to it gives the earlier revision byte for byte. The
+    # update's trailer names the previous cross-reference section, and that
+    # revision ends with the startxref pointing at it; only what follows that
+    # section is read.
+    with open(path, "rb") as fp:
+        fp.seek(_find_startxref(fp))
+        section = fp.read()
+        # /Prev is in the trailer after a table, or in the dictionary of a
+        # cross-reference stream (pypdf's merged trailer drops it for those)
+        if section.startswith(b"xref"):
+            head = section[section.find(b"trailer"):]
+        else:
+            head = section[:section.find(b"stream")]
+        found = re.search(rb"/Prev\s+(\d+)", head)
+        if found is None:
+            raise ValueError("the PDF has no incremental update")
+        prev = int(found.group(1))
+        fp.seek(prev)
+        tail = fp.read()
+    match = re.search(rb"startxref\s+%d\s+%%%%EOF([\r\n]*)" % prev, tail)
+    if match is None:
+        raise ValueError("end of the previous revision not found")
+    # IncrementalPdfAppender starts its update with one newline of its own
+    return prev + match.end() - (1 if match.group(1) else 0)
+
+
+class IncrementalPdfAppender:
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._source = self.path.open("rb")
+        try:
+            self._reader = PdfReader(self._source)
+            if self._reader.is_encrypted:
+                raise ValueError("cannot append to an encrypted PDF")
+            self._prev = _find_startxref(self._source)
+            self._source.seek(self._prev)
+            self._xref_stream = not self._source.read(4).startswith(b"xref")
+
+            trailer = self._reader.trailer
+            self._next_id = int(trailer["/Size"])
+            self._pages_ref = self._reader.trailer["/Root"].raw_get("/Pages")
+            self._pages = self._pages_ref.get_object()
+            if self._pages.get("/Type") != "/Pages":
+                raise ValueError("catalog has no page tree")
+        except Exception:
+            self._source.close()
+            raise
+
+        self._original_size = self.path.stat().st_size
+        self._fp: Optional[io.BufferedWriter] = self.path.open("ab") # tell() is the offset in the whole file
+        self._fp.write(b"\n")
+        self._offsets: Dict[int, Tuple[int, int]] = {} # Object number -> (generation, offset)
+        self._page_refs: List[IndirectObject] = []
+
+    @property
+    def page_count(self) -> int:
+        # Pages added so far
+        return len(self._page_refs)
+
+    def _reserve(self) -> IndirectObject:
+        ref = IndirectObject(self._next_id, 0, None)
+        self._next_id += 1
+        return ref
+
+    def _write_obj(self, ref: IndirectObject, value: PdfObject) -> None:
+        assert self._fp is not None
+        self._offsets[ref.idnum] = (ref.generation, self._fp.tell())
+        self._fp.write(b"%d %d obj\n" % (ref.idnum, ref.generation))
+        value.write_to_stream(self._fp)
+        self._fp.write(b"\nendobj\n")
+
+    def add_prepared(self, prepared: PreparedPages) -> int:
+        # Appends pages prepared earlier, numbering their objects after the
+        # file's last one; returns how many pages were added
+        if self._fp is None:
+            raise ValueError("appender is closed")
+        first = self._next_id - 1
+        self._next_id += len(prepared.objects)
+        parent = b"%d %d R" % (self._pages_ref.idnum, self._pages_ref.generation)
+
+        def relocate(match: "re.Match[bytes]") -> bytes:
+            number = int(match.group(1))
+            return b"%d 0 R" % (first + number) if number else parent
+
+        for number, (template, data) in enumerate(prepared.objects, start=first + 1):
+            self._offsets[number] = (0, self._fp.tell())
+            self._fp.write(b"%d 0 obj\n" % number)
+            self._fp.write(_RELATIVE_REF.sub(relocate, template))
+            if data is not None:
+                self._fp.write(b"\nstream\n")
+                self._fp.write(data)
+                self._fp.write(b"\nendstream")
+            self._fp.write(b"\nendobj\n")
+        self._page_refs.extend(IndirectObject(first + number, 0, None) for number in prepared.pages)
+        return len(prepared.pages)
+
+    def add_image_page(self, page: PageImage, resolution: float = 72.0) -> None:
+        self.add_prepared(prepare_image_page(page, resolution))
+
+    def add_pdf_pages(self, pdf_path: Union[str, Path]) -> int:
+        return self.add_prepared(prepare_pdf_pages(pdf_path))
+
+    def close(self) -> None:
+        if self._fp is None:
+            return
+
+        pages = DictionaryObject(self._pages)
+        pages[NameObject("/Kids")] = ArrayObject(list(self._pages.raw_get("/Kids")) + self._page_refs)
+        pages[NameObject("/Count")] = NumberObject(int(self._pages["/Count"]) + len(self._page_refs))
+        self._write_obj(self._pages_ref, pages)
+
+        trailer = DictionaryObject()
+        for key in ("/Root", "/Info", "/ID"):
+            if key in self._reader.trailer:
+                trailer[NameObject(key)] = self._reader.trailer.raw_get(key)
+        trailer[NameObject("/Prev")] = NumberObject(self._prev)
+
+        if self._xref_stream:
+            xref_offset = self._write_xref_stream(trailer)
+        else:
+            xref_offset = self._fp.tell()
+            # Starts with the head of the free list, as a full table would
+            self._fp.write(b"xref\n0 1\n0000000000 65535 f \n")
+            for first, entries in self._sections():
+                self._fp.write(b"%d %d\n" % (first, len(entries)))
+                for generation, offset in entries:
+                    self._fp.write(b"%010d %05d n \n" % (offset, generation))
+            trailer[NameObject("/Size")] = NumberObject(self._next_id)
+            self._fp.write(b"trailer\n")
+            trailer.write_to_stream(self._fp)
+            self._fp.write(b"\n")
+        self._fp.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+
+        self._fp.close()
+        self._fp = None
+        self._source.close()
+
+    def _sections(self) -> List[Tuple[int, List[Tuple[int, int]]]]:
+        # Runs of consecutive object numbers, for the cross-reference subsections
+        sections: List[Tuple[int, List[Tuple[int, int]]]] = []
+        for obj_id in sorted(self._offsets):
+            if sections and sections[-1][0] + len(sections[-1][1]) == obj_id:
+                sections[-1][1].append(self._offsets[obj_id])
+            else:
+                sections.append((obj_id, [self._offsets[obj_id]]))
+        return sections
+
+    def _write_xref_stream(self, trailer: DictionaryObject) -> int:
+        # The base uses cross-reference streams, so the update does as well
+        xref_ref = self._reserve()
+        xref_offset = self._fp.tell()
+        self._offsets[xref_ref.idnum] = (0, xref_offset)
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        index: List[int] = []
+        rows = bytearray()
+        for first, entries in self._sections():
+            index += [first, len(entries)]
+            for generation, offset in entries:
+                rows += b"\x01" + offset.to_bytes(width, "big") + generation.to_bytes(2, "big")
+        fields: Dict[Any, Any] = dict(trailer)
+        fields.update(pypdf_object({"Type": PdfName("XRef"), "Size": self._next_id, "Index": index, "W": [1, width, 2]}))
+        fields["__streamdata__"] = bytes(rows)
+        self._fp.write(b"%d 0 obj\n" % xref_ref.idnum)
+        StreamObject.initialize_from_dictionary(fields).write_to_stream(self._fp)
+        self._fp.write(b"\nendobj\n")
+        return xref_offset
+
+    def abort(self) -> None:
+        # Leaves the file exactly as it was before the append
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+            os.truncate(self.path, self._original_size)
+        self._source.close()
+
+    def __enter__(self) -> "IncrementalPdfAppender":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import dataclasses
+import io
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+
+# Minimal append-only PDF writer. Pages are written to disk as soon as they are
+# added, so memory use stays at roughly one encoded page regardless of how many
+# pages the document ends up with. The page tree and xref are written on close.
+
+
+class PdfName(str):
+    pass
+
+
+class PdfRef(int):
+    pass
+
+
+@dataclass(frozen=True)
+class PageImage:
+    width: int
+    height: int
+    data: bytes
+    filter: str = "DCTDecode"
+    color_space: Any = PdfName("DeviceRGB")
+    bits_per_component: int = 8
+    decode_parms: Optional[Dict[str, Any]] = None
+    decode: Optional[List[float]] = None
+    procset: str = "ImageC"
+    passthrough: bool = False
+    # Page size in points; when None it is derived from the writer's resolution
+    size_pt: Optional[Tuple[float, float]] = None
+
+
+def _fields_value(value: Any) -> Any:
+    if isinstance(value, PdfName):
+        return {"name": str(value)}
+    if isinstance(value, bytes):
+        return {"hex": value.hex()}
+    if isinstance(value, (list, tuple)):
+        return [_fields_value(v) for v in value]
+    if isinstance(value, dict):
+        return {"dict": {k: _fields_value(v) for k, v in value.items()}}
+    return value
+
+
+def _page_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "name" in value:
+            return PdfName(value["name"])
+        if "hex" in value:
+            return bytes.fromhex(value["hex"])
+        return {k: _page_value(v) for k, v in value["dict"].items()}
+    if isinstance(value, list):
+        return [_page_value(v) for v in value]
+    return value
+
+
+def page_fields(page: PageImage) -> Dict[str, Any]:
+    # JSON-compatible form of every PageImage field except the stream data
+    return {f.name: _fields_value(getattr(page, f.name)) for f in dataclasses.fields(page) if f.name != "data"}
+
+
+def page_from_fields(fields: Dict[str, Any], data: bytes) -> PageImage:
+    values = {k: _page_value(v) for k, v in fields.items()}
+    if values.get("size_pt") is not None:
+        values["size_pt"] = tuple(values["size_pt"])
+    return PageImage(data=data, **values)
+
+
+def encode_image(image: Image.Image, quality: Optional[int] = None) -> PageImage:
+    if image.mode not in {"RGB", "L", "CMYK"}:
+        image = image.convert("RGB")
+
+    buf = io.BytesIO()
+    if quality is None:
+        image.save(buf, "JPEG")
+    else:
+        image.save(buf, "JPEG", quality=quality)
+
+    if image.mode == "L":
+        color_space, procset, decode = PdfName("DeviceGray"), "ImageB", None
+    elif image.mode == "CMYK":
+        color_space, procset, decode = PdfName("DeviceCMYK"), "ImageC", [1, 0, 1, 0, 1, 0, 1, 0]
+    else:
+        color_space, procset, decode = PdfName("DeviceRGB"), "ImageC", None
+
+    return PageImage(
+        width=image.width,
+        height=image.height,
+        data=buf.getvalue(),
+        color_space=color_space,
+        decode=decode,
+        procset=procset,
+    )
+
+
+def image_dictionary(page: PageImage) -> Dict[str, Any]:
+    # Image XObject entries for a page's image, without /Length; None values are
+    # left out when written
+    return {
+        "Type": PdfName("XObject"),
+        "Subtype": PdfName("Image"),
+        "Width": page.width,
+        "Height": page.height,
+        "Filter": PdfName(page.filter),
+        "BitsPerComponent": page.bits_per_component,
+        "ColorSpace": page.color_space,
+        "Decode": page.decode,
+        "DecodeParms": page.decode_parms,
+    }
+
+
+def page_size_pt(page: PageImage, resolution: float = 72.0) -> Tuple[float, float]:
+    if page.size_pt is not None:
+        return page.size_pt
+    return page.width * 72.0 / resolution, page.height * 72.0 / resolution
+
+
+def page_contents(width_pt: float, height_pt: float) -> bytes:
+    # Content stream drawing the XObject named /image over the whole page
+    return b"q %f 0 0 %f 0 0 cm /image Do Q\n" % (width_pt, height_pt)
+
+
+def _escape_string(value: str) -> bytes:
+    try:
+        raw = value.encode("ascii")
+    except UnicodeEncodeError:
+        return b"<" + (b"\xfe\xff" + value.encode("utf-16-be")).hex().encode("ascii") + b">"
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _format_number(value: float) -> bytes:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value)).encode()
+    return (f"{value:.6f}".rstrip("0").rstrip(".")).encode()
+
+
+def _serialize(value: Any) -> bytes:
+    if isinstance(value, PdfRef):
+        return b"%d 0 R" % int(value)
+    if isinstance(value, PdfName):
+        return b"/" + value.encode("ascii")
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, (int, float)):
+        return _format_number(value)
+    if isinstance(value, bytes):
+        return b"<" + value.hex().encode("ascii") + b">"
+    if isinstance(value, str):
+        return _escape_string(value)
+    if isinstance(value, (list, tuple)):
+        return b"[ " + b" ".join(_serialize(v) for v in value) + b" ]"
+    if isinstance(value, dict):
+        parts = [b"/" + str(k).encode("ascii") + b" " + _serialize(v) for k, v in value.items() if v is not None]
+        return b"<<\n" + b"\n".join(parts) + b"\n>>"
+    if value is None:
+        return b"null"
+    raise TypeError(f"cannot serialize {type(value).__name__} to PDF")
+
+
+def _pdf_date(t: time.struct_time) -> str:
+    return time.strftime("D:%Y%m%d%H%M%SZ", t)
+
+
+class StreamingPdfWriter:
+    def __init__(self, path: Union[str, Path], title: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self._fp: Optional[BinaryIO] = self.path.open("wb")
+        self._offsets: Dict[int, int] = {}
+        self._next_id = 1
+        self._page_refs: List[PdfRef] = []
+
+        self._catalog_ref = self._reserve()
+        self._pages_ref = self._reserve()
+
+        now = _pdf_date(time.gmtime())
+        self._info: Dict[str, Any] = {"Title": title, "CreationDate": now, "ModDate": now}
+
+        self._fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_refs)
+
+    def _reserve(self) -> PdfRef:
+        ref = PdfRef(self._next_id)
+        self._next_id += 1
+        return ref
+
+    def _write_obj(self, ref: PdfRef, value: Dict[str, Any], stream: Optional[bytes] = None) -> Optional[int]:
+        # Returns the file offset of the stream data, if there is one
+        assert self._fp is not None
+        self._offsets[int(ref)] = self._fp.tell()
+        stream_offset = None
+        if stream is not None:
+            value = dict(value, Length=len(stream))
+        self._fp.write(b"%d 0 obj\n" % int(ref))
+        self._fp.write(_serialize(value))
+        if stream is not None:
+            self._fp.write(b"\nstream\n")
+            stream_offset = self._fp.tell()
+            self._fp.write(stream)
+            self._fp.write(b"\nendstream")
+        self._fp.write(b"\nendobj\n")
+        return stream_offset
+
+    def add_image_page(self, page: PageImage, resolution: float = 72.0) -> int:
+        # Returns the file offset of the image stream data
+        if self._fp is None:
+            raise ValueError("writer is closed")
+
+        image_ref = self._reserve()
+        page_ref = self._reserve()
+        contents_ref = self._reserve()
+
+        image_offset = self._write_obj(image_ref, image_dictionary(page), stream=page.data)
+        width_pt, height_pt = page_size_pt(page, resolution)
+
+        self._write_obj(
+            page_ref,
+            {
+                "Type": PdfName("Page"),
+                "Parent": self._pages_ref,
+                "Resources": {
+                    "ProcSet": [PdfName("PDF"), PdfName(page.procset)],
+                    "XObject": {"image": image_ref},
+                },
+                "MediaBox": [0, 0, width_pt, height_pt],
+                "Contents": contents_ref,
+            },
+        )
+
+        self._write_obj(contents_ref, {}, stream=page_contents(width_pt, height_pt))
+        self._page_refs.append(page_ref)
+        return image_offset
+
+    def close(self) -> None:
+        if self._fp is None:
+            return
+
+        self._write_obj(self._pages_ref, {"Type": PdfName("Pages"), "Count": len(self._page_refs), "Kids": self._page_refs})
+        self._write_obj(self._catalog_ref, {"Type": PdfName("Catalog"), "Pages": self._pages_ref})
+        info_ref = self._reserve()
+        self._write_obj(info_ref, self._info)
+
+        xref_offset = self._fp.tell()
+        self._fp.write(b"xref\n0 %d\n" % self._next_id)
+        self._fp.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self._next_id):
+            self._fp.write(b"%010d 00000 n \n" % self._offsets[obj_id])
+        trailer = {"Size": self._next_id, "Root": self._catalog_ref, "Info": info_ref}
+        self._fp.write(b"trailer\n" + _serialize(trailer) + b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+
+        self._fp.close()
+        self._fp = None
+
+    def abort(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def __enter__(self) -> "StreamingPdfWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
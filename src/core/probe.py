@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+import stat
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, List, Optional, Set, Tuple, Union
+
+from PIL import Image
+
+
+# Background probing of dropped or browsed files. A probe stats the file and
+# reads the image header (format, size, mode, frame count; no pixels are
+# decoded). Probes run on a thread pool, because on a network share each one is
+# mostly waiting, and the UI collects finished ones with drain() from its own
+# timer. Results are kept in a MetadataCache; a file probed again with the same
+# size and mtime is answered from it without being opened.
+
+IMAGE = "image"
+PDF = "pdf"
+OTHER = "other"
+MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    path: str
+    kind: str
+    size: int = 0
+    mtime_ns: int = 0
+    format: Optional[str] = None
+    dimensions: Optional[Tuple[int, int]] = None
+    mode: Optional[str] = None
+    frames: int = 1
+
+    @property
+    def is_image(self) -> bool:
+        return self.kind == IMAGE
+
+    def describe(self) -> str:
+        # Short text for a file list row
+        if self.kind == IMAGE:
+            width, height = self.dimensions
+            pages = f", {self.frames} frames" if self.frames > 1 else ""
+            return f"{self.format} {width}×{height} {self.mode}{pages}"
+        if self.kind == PDF:
+            return f"PDF {self.size / 1024:.0f} KB"
+        return "not found" if self.kind == MISSING else "unsupported"
+
+
+def probe_file(path: Union[str, Path], previous: Optional[FileInfo] = None) -> FileInfo:
+    path = str(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return FileInfo(path, MISSING)
+    if not stat.S_ISREG(st.st_mode):
+        return FileInfo(path, OTHER)
+    if previous is not None and (previous.size, previous.mtime_ns) == (st.st_size, st.st_mtime_ns):
+        return previous
+
+    if path.lower().endswith(".pdf"):
+        return FileInfo(path, PDF, st.st_size, st.st_mtime_ns)
+    try:
+        with Image.open(path) as image:
+            return FileInfo(
+                path,
+                IMAGE,
+                st.st_size,
+                st.st_mtime_ns,
+                format=image.format,
+                dimensions=image.size,
+                mode=image.mode,
+                frames=getattr(image, "n_frames", 1),
+            )
+    except Exception:
+        return FileInfo(path, OTHER, st.st_size, st.st_mtime_ns)
+
+
+class MetadataCache:
+    # Thread-safe, bounded (least recently used entries go first)
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, FileInfo]" = OrderedDict()
+
+    def get(self, path: Union[str, Path]) -> Optional[FileInfo]:
+        # The last probe result, without checking the file again
+        with self._lock:
+            info = self._entries.get(str(path))
+            if info is not None:
+                self._entries.move_to_end(info.path)
+            return info
+
+    def put(self, info: FileInfo) -> None:
+        with self._lock:
+            self._entries[info.path] = info
+            self._entries.move_to_end(info.path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every view, so a file dropped on a second window is already known
+DEFAULT_CACHE = MetadataCache()
+
+
+class FileProber:
+    def __init__(self, cache: Optional[MetadataCache] = None, workers: Optional[int] = None) -> None:
+        self.cache = cache if cache is not None else DEFAULT_CACHE
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(16, (os.cpu_count() or 1) * 4), thread_name_prefix="probe")
+        self._lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+        self._done: Deque[FileInfo] = deque()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._in_flight) + len(self._done)
+
+    def probe(self, paths) -> None:
+        # Queues paths for probing; a path already being probed is not queued twice
+        for path in paths:
+            path = str(path)
+            with self._lock:
+                if path in self._in_flight:
+                    continue
+                self._in_flight.add(path)
+            self._pool.submit(self._run, path)
+
+    def _run(self, path: str) -> None:
+        try:
+            info = probe_file(path, self.cache.get(path))
+        except Exception:
+            info = FileInfo(path, OTHER)
+        self.cache.put(info)
+        with self._lock:
+            self._in_flight.discard(path)
+            self._done.append(info)
+
+    def drain(self, max_items: Optional[int] = None) -> List[FileInfo]:
+        # Finished probes, oldest first
+        with self._lock:
+            count = len(self._done) if max_items is None else min(max_items, len(self._done))
+            return [self._done.popleft() for _ in range(count)]
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+# Thread-safe channel between a conversion running on a worker thread and a UI
+# that drains it on its own timer. Its methods match the converter's
+# update_status/update_overall_progress callbacks, so it plugs in directly.
+# Updates are coalesced as they arrive: only the latest status per file and
+# the latest overall progress are kept. The number of files with an undrained
+# status is bounded; past that the producer waits for the consumer to catch up.
+# The consumer closes the channel once it has taken the Finished event, or when
+# it goes away mid-run; a closed channel drops further updates and never makes
+# a producer wait, and a drain loop stops once it finds the channel closed.
+
+
+@dataclass(frozen=True)
+class FileStatus:
+    path: str
+    status_text: str
+    color: str
+
+
+@dataclass(frozen=True)
+class OverallProgress:
+    message: str
+    current: int
+    total: int
+
+
+@dataclass(frozen=True)
+class Finished:
+    converted: int
+    skipped: int
+    error: Optional[str] = None
+    # Anything else the producer hands over with the outcome
+    result: Any = None
+
+
+@dataclass
+class ProgressBatch:
+    statuses: List[FileStatus] = field(default_factory=list)
+    overall: Optional[OverallProgress] = None
+    # Only set once every status before it has been drained
+    finished: Optional[Finished] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.statuses) or self.overall is not None or self.finished is not None
+
+
+class ProgressChannel:
+    def __init__(self, max_pending: int = 4096) -> None:
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._statuses: "OrderedDict[str, FileStatus]" = OrderedDict()
+        self._overall: Optional[OverallProgress] = None
+        self._finished: Optional[Finished] = None
+        self._closed = False
+
+    def update_status(self, file_path, status_text: str, color: str) -> None:
+        event = FileStatus(str(file_path), status_text, color)
+        with self._cond:
+            if self._closed:
+                return
+            if event.path in self._statuses:
+                self._statuses[event.path] = event # Replaces the undrained one in place
+                return
+            while len(self._statuses) >= self.max_pending and not self._closed:
+                self._cond.wait()
+            if not self._closed:
+                self._statuses[event.path] = event
+
+    def update_overall_progress(self, message: str, current: int, total: int) -> None:
+        with self._cond:
+            if not self._closed:
+                self._overall = OverallProgress(message, current, total)
+
+    def finish(self, converted: int, skipped: int, error: Optional[str] = None, result: Any = None) -> None:
+        with self._cond:
+            if not self._closed:
+                self._finished = Finished(converted, skipped, error, result)
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def close(self) -> None:
+        # Stops producers from waiting, e.g. when the window is closed mid-run
+        with self._cond:
+            self._closed = True
+            self._statuses.clear()
+            self._overall = None
+            self._finished = None
+            self._cond.notify_all()
+
+    def drain(self, max_statuses: Optional[int] = None) -> ProgressBatch:
+        # Takes up to max_statuses file statuses (oldest first) plus the latest
+        # overall progress; anything left over is returned by the next drain.
+        batch = ProgressBatch()
+        with self._cond:
+            count = len(self._statuses) if max_statuses is None else min(max_statuses, len(self._statuses))
+            for _ in range(count):
+                batch.statuses.append(self._statuses.popitem(last=False)[1])
+            batch.overall, self._overall = self._overall, None
+            if not self._statuses:
+                batch.finished, self._finished = self._finished, None
+            if count:
+                self._cond.notify_all()
+        return batch
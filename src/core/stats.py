@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ConversionStats:
+    # Pages embedded straight from the input file without decoding
+    passthrough_pages: int = 0
+    # Pages decoded and re-encoded
+    encoded_pages: int = 0
+    # Pages copied unchanged from a previous output by an incremental rebuild
+    reused_pages: int = 0
+    # Inputs skipped because an earlier run of the same job already converted them
+    resumed_inputs: int = 0
+
+    def record_page(self, passthrough: bool, reused: bool = False) -> None:
+        if reused:
+            self.reused_pages += 1
+        elif passthrough:
+            self.passthrough_pages += 1
+        else:
+            self.encoded_pages += 1
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import queue
+import struct
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, List, Optional, Set, Tuple, Union
+
+from PIL import Image
+
+from src.core.page_cache import default_cache_dir
+
+
+# Thumbnails for file lists. A thumbnail is keyed on the file's path, size and
+# mtime plus the thumbnail size, so an edited file gets a new one. Lookups go
+# through an in-memory LRU of decoded thumbnails, then a compact on-disk store
+# shared between runs, and only then is the image opened; that happens on one
+# background thread and decodes JPEGs reduced (draft mode). The UI asks for
+# what it is missing with request() and collects results with drain().
+
+_STORE_VERSION = 1
+_RECORD_HEADER = struct.Struct(">16sI") # Key digest, PNG length
+
+
+def default_thumbnail_store() -> Path:
+    return default_cache_dir().parent / "thumbnails.pack"
+
+
+def thumbnail_key(path: Union[str, Path], size: int, mtime_ns: int, box: Tuple[int, int]) -> bytes:
+    text = f"{_STORE_VERSION}|{os.path.abspath(path)}|{size}|{mtime_ns}|{box[0]}x{box[1]}"
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+
+def make_thumbnail(path: Union[str, Path], box: Tuple[int, int]) -> Image.Image:
+    with Image.open(path) as image:
+        image.draft(None, box) # JPEG only: decodes at 1/2, 1/4 or 1/8 scale
+        image.thumbnail(box)
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            return image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+        return image.copy()
+
+
+class ThumbnailStore:
+    # One append-only pack file of (key, PNG) records, indexed in memory when
+    # first used. A torn record at the end is ignored. Past max_bytes the pack
+    # is rewritten with the most recently used entries only.
+    def __init__(self, path: Union[str, Path], max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[bytes, Tuple[int, int]]"] = None
+        self._size = 0
+
+    def _ensure_index(self) -> "OrderedDict[bytes, Tuple[int, int]]":
+        if self._index is None:
+            self._index = OrderedDict()
+            self._size = 0
+            try:
+                with self.path.open("rb") as fp:
+                    while True:
+                        header = fp.read(_RECORD_HEADER.size)
+                        if len(header) < _RECORD_HEADER.size:
+                            break
+                        key, length = _RECORD_HEADER.unpack(header)
+                        offset = fp.tell()
+                        fp.seek(length, os.SEEK_CUR)
+                        if fp.tell() > os.fstat(fp.fileno()).st_size:
+                            break
+                        self._index[key] = (offset, length)
+                        self._index.move_to_end(key)
+                        self._size = fp.tell()
+            except OSError:
+                pass
+        return self._index
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._ensure_index().get(key)
+            if entry is None:
+                return None
+            self._index.move_to_end(key)
+            offset, length = entry
+            try:
+                with self.path.open("rb") as fp:
+                    fp.seek(offset)
+                    data = fp.read(length)
+            except OSError:
+                return None
+            return data if len(data) == length else None
+
+    def put(self, key: bytes, data: bytes) -> None:
+        with self._lock:
+            index = self._ensure_index()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("ab") as fp:
+                    if fp.tell() != self._size:
+                        fp.truncate(self._size) # Drops a torn record
+                        fp.seek(self._size)
+                    fp.write(_RECORD_HEADER.pack(key, len(data)) + data)
+                    index[key] = (self._size + _RECORD_HEADER.size, len(data))
+                    index.move_to_end(key)
+                    self._size = fp.tell()
+                if self._size > self.max_bytes:
+                    self._compact()
+            except OSError:
+                self._index = None
+
+    def _compact(self) -> None:
+        # Keeps the newest entries that fit in half the budget
+        keep: List[Tuple[bytes, bytes]] = []
+        total = 0
+        with self.path.open("rb") as fp:
+            for key in reversed(self._index):
+                offset, length = self._index[key]
+                if total + _RECORD_HEADER.size + length > self.max_bytes // 2:
+                    break
+                fp.seek(offset)
+                keep.append((key, fp.read(length)))
+                total += _RECORD_HEADER.size + length
+
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        index: "OrderedDict[bytes, Tuple[int, int]]" = OrderedDict()
+        with tmp_path.open("wb") as fp:
+            for key, data in reversed(keep):
+                fp.write(_RECORD_HEADER.pack(key, len(data)))
+                index[key] = (fp.tell(), len(data))
+                fp.write(data)
+            size = fp.tell()
+        os.replace(tmp_path, self.path)
+        self._index = index
+        self._size = size
+
+
+class ThumbnailService:
+    def __init__(
+        self,
+        store: Optional[ThumbnailStore] = None,
+        box: Tuple[int, int] = (30, 30),
+        memory_entries: int = 2048,
+    ) -> None:
+        self.store = store if store is not None else ThumbnailStore(default_thumbnail_store())
+        self.box = box
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[Tuple[int, int], Image.Image]]" = OrderedDict()
+        self._requests: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._requested: Set[str] = set()
+        self._done: Deque[Tuple[str, Optional[Image.Image]]] = deque()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, path: Union[str, Path]) -> Optional[Image.Image]:
+        # The thumbnail in memory, if any, without touching the file
+        with self._lock:
+            entry = self._memory.get(str(path))
+            if entry is None:
+                return None
+            self._memory.move_to_end(str(path))
+            return entry[1]
+
+    def request(self, paths) -> None:
+        # Thumbnails for paths are made (or checked against the file, when one is
+        # in memory already) on the background thread and handed out by drain()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+                self._thread.start()
+            for path in paths:
+                path = str(path)
+                if path not in self._requested:
+                    self._requested.add(path)
+                    self._requests.put(path)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._requested) + len(self._done)
+
+    def drain(self, max_items: Optional[int] = None) -> List[Tuple[str, Optional[Image.Image]]]:
+        # (path, thumbnail) pairs; the thumbnail is None when the file could not
+        # be read as an image
+        with self._lock:
+            count = len(self._done) if max_items is None else min(max_items, len(self._done))
+            return [self._done.popleft() for _ in range(count)]
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            path = self._requests.get()
+            if path is None:
+                return
+            try:
+                thumbnail = self._load(path)
+            except Exception:
+                thumbnail = None
+            with self._lock:
+                self._requested.discard(path)
+                self._done.append((path, thumbnail))
+
+    def _load(self, path: str) -> Optional[Image.Image]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._memory.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        key = thumbnail_key(path, st.st_size, st.st_mtime_ns, self.box)
+        data = self.store.get(key)
+        thumbnail = None
+        if data is not None:
+            try:
+                thumbnail = Image.open(io.BytesIO(data))
+                thumbnail.load()
+            except Exception:
+                thumbnail = None
+        if thumbnail is None:
+            thumbnail = make_thumbnail(path, self.box)
+            encoded = io.BytesIO()
+            thumbnail.save(encoded, "PNG", optimize=True)
+            self.store.put(key, encoded.getvalue())
+
+        with self._lock:
+            self._memory[path] = (stamp, thumbnail)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return thumbnail
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+# Watch-folder loop: new images in a directory are picked up, held until their
+# size and mtime stop changing (the writer has finished), collected into a batch
+# by time or count and handed to a conversion callback. Change hints come from
+# inotify on Linux and from periodic directory scans everywhere else. All state
+# is bounded by the number of files currently in the directory, so a daemon can
+# run indefinitely without growing.
+
+# Callback given a batch of paths; returns each path's outcome ("converted",
+# "skipped" or "failed")
+BatchConverter = Callable[[List[str]], Dict[str, str]]
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+Stamp = Tuple[int, int]
+
+
+class _InotifySource:
+    # Yields names touched in the directory; an empty name means "rescan"
+    def __init__(self, directory: Path) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def wait(self, timeout: float) -> Set[str]:
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not readable:
+            return set()
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names: Set[str] = set()
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(buf):
+            _wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                names.add("")
+            elif name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingSource:
+    def __init__(self, interval: float, stop: threading.Event) -> None:
+        self._interval = interval
+        self._stop = stop
+        self._next_scan = 0.0
+
+    def wait(self, timeout: float) -> Set[str]:
+        now = time.monotonic()
+        if now < self._next_scan:
+            self._stop.wait(min(timeout, self._next_scan - now))
+            if time.monotonic() < self._next_scan:
+                return set()
+        self._next_scan = time.monotonic() + self._interval
+        return {""}
+
+    def close(self) -> None:
+        pass
+
+
+@dataclass
+class WatchMetrics:
+    files_seen: int = 0
+    files_converted: int = 0
+    files_failed: int = 0
+    batches: int = 0
+    # Files waiting to settle plus files settled but not yet converted
+    queue_depth: int = 0
+    busy_seconds: float = 0.0
+    # (finish time, files, seconds) of recent batches, for the rolling rate
+    recent: Deque[Tuple[float, int, float]] = field(default_factory=lambda: deque(maxlen=64))
+
+    def throughput(self) -> float:
+        # Files per second of conversion time over the recent batches
+        seconds = sum(s for _t, _n, s in self.recent)
+        return sum(n for _t, n, _s in self.recent) / seconds if seconds else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "files_seen": self.files_seen,
+            "files_converted": self.files_converted,
+            "files_failed": self.files_failed,
+            "batches": self.batches,
+            "queue_depth": self.queue_depth,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "files_per_second": round(self.throughput(), 3),
+        }
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        convert_batch: BatchConverter,
+        extensions: Iterable[str],
+        settle_seconds: float = 2.0,
+        batch_window: float = 5.0,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+        include_existing: bool = False,
+        processed_dir: Optional[Union[str, Path]] = None,
+        report: Optional[Callable[[Dict[str, float]], None]] = None,
+        report_interval: float = 60.0,
+    ) -> None:
+        self.directory = Path(directory)
+        self.convert_batch = convert_batch
+        self.extensions = {e.lower() for e in extensions}
+        self.settle_seconds = settle_seconds
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.include_existing = include_existing
+        self.processed_dir = Path(processed_dir) if processed_dir is not None else None
+        self.report = report
+        self.report_interval = report_interval
+        self.metrics = WatchMetrics()
+
+        self._stop = threading.Event()
+        # Files already handled (or present at startup), by name, with the stamp they had
+        self._known: Dict[str, Stamp] = {}
+        # Files waiting for writes to finish: name -> (last stamp, monotonic time it was first seen)
+        self._pending: Dict[str, Tuple[Stamp, float]] = {}
+        self._ready: List[str] = []
+        self._ready_since = 0.0
+        self.source_name = "polling"
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _is_candidate(self, name: str) -> bool:
+        return not name.startswith(".") and os.path.splitext(name)[1].lower() in self.extensions
+
+    def _stamp(self, name: str) -> Optional[Stamp]:
+        try:
+            st = os.stat(self.directory / name)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _scan(self) -> Dict[str, Stamp]:
+        found = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if self._is_candidate(entry.name) and entry.is_file():
+                    st = entry.stat()
+                    found[entry.name] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def _observe(self, name: str, stamp: Optional[Stamp], now: float) -> None:
+        if stamp is None:
+            self._known.pop(name, None)
+            self._pending.pop(name, None)
+            return
+        if name in self._pending:
+            if self._pending[name][0] != stamp:
+                self._pending[name] = (stamp, now) # Still being written
+        elif self._known.get(name) != stamp and name not in self._ready:
+            self._pending[name] = (stamp, now)
+            self.metrics.files_seen += 1
+
+    def _rescan(self, now: float) -> None:
+        found = self._scan()
+        for name in list(self._known):
+            if name not in found:
+                del self._known[name]
+        for name in list(self._pending):
+            if name not in found:
+                del self._pending[name]
+        for name, stamp in found.items():
+            self._observe(name, stamp, now)
+
+    def _settle(self, now: float) -> None:
+        # Oldest arrivals first, by name among files seen at the same time
+        for name, (stamp, since) in sorted(self._pending.items(), key=lambda item: (item[1][1], item[0])):
+            if now - since < self.settle_seconds:
+                continue
+            current = self._stamp(name)
+            if current is None:
+                del self._pending[name]
+            elif current != stamp:
+                self._pending[name] = (current, now)
+            else:
+                del self._pending[name]
+                self._known[name] = stamp
+                if not self._ready:
+                    self._ready_since = now
+                self._ready.append(name)
+
+    def _flush(self, now: float, force: bool = False) -> None:
+        while self._ready and (force or len(self._ready) >= self.batch_size or now - self._ready_since >= self.batch_window):
+            batch, self._ready = self._ready[:self.batch_size], self._ready[self.batch_size:]
+            self._ready_since = now
+            self.metrics.queue_depth = len(self._pending) + len(self._ready) + len(batch)
+            self._convert(batch)
+            now = time.monotonic()
+
+    def _convert(self, names: List[str]) -> None:
+        paths = [str(self.directory / name) for name in names]
+        started = time.monotonic()
+        try:
+            outcomes = self.convert_batch(paths)
+        except Exception:
+            outcomes = {}
+        elapsed = time.monotonic() - started
+
+        converted = 0
+        for name, path in zip(names, paths):
+            outcome = outcomes.get(path, "failed")
+            if outcome == "converted":
+                converted += 1
+                if self.processed_dir is not None:
+                    self._move_processed(name)
+            elif outcome == "failed":
+                self.metrics.files_failed += 1
+
+        self.metrics.files_converted += converted
+        self.metrics.batches += 1
+        self.metrics.busy_seconds += elapsed
+        self.metrics.recent.append((time.time(), len(names), elapsed))
+
+    def _move_processed(self, name: str) -> None:
+        try:
+            self.processed_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(self.directory / name), str(self.processed_dir / name))
+            self._known.pop(name, None)
+        except OSError:
+            pass
+
+    def _open_source(self):
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                source = _InotifySource(self.directory)
+                self.source_name = "inotify"
+                return source
+            except (OSError, AttributeError):
+                pass
+        self.source_name = "polling"
+        return _PollingSource(self.poll_interval, self._stop)
+
+    def run(self) -> WatchMetrics:
+        # Blocks until stop() is called; settled files are converted before returning
+        source = self._open_source()
+        try:
+            now = time.monotonic()
+            if self.include_existing:
+                self._rescan(now)
+            else:
+                self._known = self._scan()
+            next_report = now + self.report_interval
+
+            while not self._stop.is_set():
+                timeout = self.poll_interval
+                if self._pending:
+                    timeout = min(timeout, self.settle_seconds / 2)
+                if self._ready:
+                    timeout = min(timeout, max(0.0, self._ready_since + self.batch_window - time.monotonic()))
+
+                names = source.wait(timeout)
+                now = time.monotonic()
+                if "" in names:
+                    self._rescan(now)
+                for name in names:
+                    if name and self._is_candidate(name):
+                        self._observe(name, self._stamp(name), now)
+
+                self._settle(now)
+                self.metrics.queue_depth = len(self._pending) + len(self._ready)
+                self._flush(now)
+                self.metrics.queue_depth = len(self._pending) + len(self._ready)
+
+                if self.report is not None and now >= next_report:
+                    self.report(self.metrics.snapshot())
+                    next_report = now + self.report_interval
+
+            self._settle(time.monotonic())
+            self._flush(time.monotonic(), force=True)
+            self.metrics.queue_depth = len(self._pending)
+        finally:
+            source.close()
+        if self.report is not None:
+            self.report(self.metrics.snapshot())
+        return self.metrics
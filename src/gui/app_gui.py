@@ -1,11 +1,20 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, ttk
 from tkinterdnd2 import DND_FILES, TkinterDnD
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import os
 from pathlib import Path
 import threading
-from src.core.converter import process_images_to_pdf # Import the core conversion function
+from src.core.conflicts import OutputPlanner
+from src.core.converter import ConversionOptions, process_images_to_pdf # Import the core conversion function
+from src.core.progress import ProgressChannel
+from src.core.thumbnails import ThumbnailService
+from src.gui.conflict_dialog import ConflictDialog
+
+PROGRESS_POLL_MS = 50 # How often the conversion's progress channel is drained
+PROGRESS_UPDATES_PER_FRAME = 200 # Status labels updated per drain; the rest wait for the next one
+THUMBNAIL_POLL_MS = 50
+THUMBNAILS_PER_FRAME = 100
 
 
 class PNGtoPDFConverter:
@@ -16,6 +25,9 @@ class PNGtoPDFConverter:
         self.root.configure(bg="#F5F5DC")  # Beige background
         
         self.files_to_convert = []  # List of dicts: {'path': '...', 'frame': ..., 'label': ..., 'remove_btn': ..., 'thumbnail': ..., 'status_label': ...}
+        self.files_by_path = {} # Active entries of files_to_convert by path, for status updates
+        self.progress_channel = None
+        self.thumbnails = ThumbnailService()
         self.output_path_manually_set = False # New flag to track if user has manually set output path
         self.pdf_output_mode = tk.StringVar(value="single") # Default to single PDF
         self.dragged_item_path = None
@@ -351,6 +363,7 @@ class PNGtoPDFConverter:
             widget.destroy()
 
         temp_files_info = [] # To rebuild self.files_to_convert with new widget references
+        missing_thumbnails = []
 
         for file_info in self.files_to_convert:
             if file_info['removed']:
@@ -365,19 +378,23 @@ class PNGtoPDFConverter:
             file_frame.bind("<B1-Motion>", self._on_drag_motion)
             file_frame.bind("<ButtonRelease-1>", self._on_drop)
 
-            # Thumbnail
-            tk_img = None
-            try:
-                img = Image.open(file_info['path'])
-                img.thumbnail((30, 30)) # Small thumbnail size
-                tk_img = ImageTk.PhotoImage(img)
+            # Thumbnail: reused from the last refresh or the thumbnail service's
+            # memory; anything else is made in the background and filled in later
+            tk_img = file_info.get('thumbnail')
+            if tk_img is None:
+                img = self.thumbnails.get(file_info['path'])
+                if img is not None:
+                    tk_img = ImageTk.PhotoImage(img)
+                else:
+                    missing_thumbnails.append(file_info['path'])
+            if tk_img is not None:
                 thumb_label = tk.Label(file_frame, image=tk_img, bg="#E0FFFF")
                 thumb_label.image = tk_img # Keep a reference!
-                thumb_label.pack(side="left", padx=5)
-            except Exception:
+            else:
                 thumb_label = tk.Label(file_frame, text="[IMG]", bg="#E0FFFF", fg="#2F4F4F")
-                thumb_label.pack(side="left", padx=5)
+            thumb_label.pack(side="left", padx=5)
             file_info['thumbnail'] = tk_img # Update thumbnail reference
+            file_info['thumb_label'] = thumb_label
 
             file_label = tk.Label(file_frame, text=file_info['path'], bg="#E0FFFF", fg="#2F4F4F", anchor="w")
             file_label.pack(side="left", fill="x", expand=True)
@@ -408,9 +425,28 @@ class PNGtoPDFConverter:
             temp_files_info.append(file_info)
         
         self.files_to_convert = temp_files_info # Reassign the updated list
+        self.files_by_path = {f['path']: f for f in self.files_to_convert if not f['removed']}
         self.canvas.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
 
+        if missing_thumbnails:
+            idle = not self.thumbnails.pending
+            self.thumbnails.request(missing_thumbnails)
+            if idle:
+                self.root.after(THUMBNAIL_POLL_MS, self._drain_thumbnails)
+
+    def _drain_thumbnails(self):
+        for path, img in self.thumbnails.drain(THUMBNAILS_PER_FRAME):
+            file_info = self.files_by_path.get(path)
+            if img is None or file_info is None or file_info['thumbnail'] is not None:
+                continue
+            tk_img = ImageTk.PhotoImage(img)
+            file_info['thumbnail'] = tk_img
+            file_info['thumb_label'].config(image=tk_img, text="")
+            file_info['thumb_label'].image = tk_img
+        if self.thumbnails.pending:
+            self.root.after(THUMBNAIL_POLL_MS, self._drain_thumbnails)
+
     def update_convert_button_state(self):
         active_files = [f for f in self.files_to_convert if not f.get('removed', False)]
         if active_files:
@@ -431,6 +467,7 @@ class PNGtoPDFConverter:
                 file_info['frame'].config(bg="#D3D3D3")  # Light gray
                 file_info['label'].config(bg="#D3D3D3", fg="#A9A9A9") # Light gray, darker text
                 file_info['remove_btn'].config(state=tk.DISABLED, fg="#A9A9A9")
+                self.files_by_path.pop(file_path, None)
                 break
         self.update_convert_button_state()
 
@@ -438,6 +475,7 @@ class PNGtoPDFConverter:
         for file_info in self.files_to_convert:
             file_info['frame'].destroy()  # Destroy the file's frame
         self.files_to_convert = []
+        self.files_by_path = {}
         self.output_path.set(os.getcwd()) # Reset output path to default
         self.output_path_manually_set = False # Reset manual override flag
         self.completion_message_label.config(text="") # Clear completion message on clear all
@@ -449,13 +487,7 @@ class PNGtoPDFConverter:
             messagebox.showwarning("No Files Selected", "Please select PNG files to convert.")
             return
 
-        # Run conversion in separate thread to keep UI responsive
-        thread = threading.Thread(target=self.process_conversion, args=(active_files_paths,))
-        thread.start()
-
-    def process_conversion(self, files_to_convert_paths):
         self.completion_message_label.config(text="") # Clear previous completion message
-        self.root.update_idletasks()
 
         # Reset all status labels
         for file_info in self.files_to_convert:
@@ -465,26 +497,73 @@ class PNGtoPDFConverter:
         output_dir = Path(self.output_path.get())
         output_mode = self.pdf_output_mode.get()
 
-        # Call the core conversion logic
-        converted, skipped = process_images_to_pdf(
-            png_paths=files_to_convert_paths,
-            output_dir=output_dir,
-            output_mode=output_mode,
-            ask_overwrite_callback=self.ask_overwrite,
-            get_new_name_callback=self.get_new_name,
-            update_status_callback=self._update_file_status_label,
-            update_overall_progress_callback=self._update_overall_progress
+        # Every output conflict is settled here, before the conversion starts, so
+        # the worker thread never waits on a dialog
+        planner = OutputPlanner(active_files_paths, output_dir, output_mode)
+        decisions = {}
+        if planner.conflicts:
+            decisions = ConflictDialog(self.root, planner.conflicts).show()
+            if decisions is None:
+                return
+        output_plan = planner.plan(decisions)
+
+        # Run conversion in separate thread to keep UI responsive. The worker only
+        # posts to the progress channel; widgets are updated here on the Tk thread.
+        self.progress_channel = ProgressChannel()
+        thread = threading.Thread(
+            target=self.process_conversion,
+            args=(active_files_paths, output_dir, output_mode, self.progress_channel, output_plan),
+            daemon=True,
         )
+        thread.start()
+        self.root.after(PROGRESS_POLL_MS, self._drain_progress)
+
+    def process_conversion(self, files_to_convert_paths, output_dir, output_mode, progress_channel, output_plan=None):
+        try:
+            # Call the core conversion logic
+            converted, skipped = process_images_to_pdf(
+                png_paths=files_to_convert_paths,
+                output_dir=output_dir,
+                output_mode=output_mode,
+                ask_overwrite_callback=self.ask_overwrite,
+                get_new_name_callback=self.get_new_name,
+                update_status_callback=progress_channel.update_status,
+                update_overall_progress_callback=progress_channel.update_overall_progress,
+                options=ConversionOptions(workers=os.cpu_count() or 1, output_plan=output_plan),
+            )
+        except Exception as e:
+            progress_channel.finish(0, len(files_to_convert_paths), error=str(e))
+        else:
+            progress_channel.finish(converted, skipped)
+
+    def _drain_progress(self):
+        progress_channel = self.progress_channel
+        if progress_channel is None:
+            return
+
+        batch = progress_channel.drain(PROGRESS_UPDATES_PER_FRAME)
+        for event in batch.statuses:
+            self._update_file_status_label(event.path, event.status_text, event.color)
+        if batch.overall is not None:
+            self._update_overall_progress(batch.overall.message, batch.overall.current, batch.overall.total)
 
-        # Show completion message in the app window
-        message = f"Conversion complete!  Converted: {converted}  Skipped: {skipped}"
+        if batch.finished is None:
+            self.root.after(PROGRESS_POLL_MS, self._drain_progress)
+            return
+
+        progress_channel.close()
+        self.progress_channel = None
+        if batch.finished.error:
+            message = f"Conversion failed: {batch.finished.error}"
+        else:
+            # Show completion message in the app window
+            message = f"Conversion complete!  Converted: {batch.finished.converted}  Skipped: {batch.finished.skipped}"
         self.completion_message_label.config(text=message)
 
     def _update_file_status_label(self, file_path, status_text, color):
-        for file_info in self.files_to_convert:
-            if file_info['path'] == file_path and not file_info['removed'] and file_info['status_label']:
-                file_info['status_label'].config(text=status_text, fg=color)
-        self.root.update_idletasks()
+        file_info = self.files_by_path.get(file_path)
+        if file_info is not None and file_info['status_label']:
+            file_info['status_label'].config(text=status_text, fg=color)
 
     def _update_overall_progress(self, message, current, total):
         # For now, we only have a completion message, so this will update that or be empty during process
@@ -0,0 +1,104 @@
+import tkinter as tk
+from tkinter import ttk
+from pathlib import Path
+
+from src.core.conflicts import DECISIONS, OVERWRITE, RENAME, SKIP
+
+ACTION_LABELS = {OVERWRITE: "Overwrite", RENAME: "Rename", SKIP: "Skip"}
+
+
+class ConflictDialog:
+    # Modal window listing every output conflict of a conversion at once. The
+    # buttons at the top decide for all of them; the table lets single rows be
+    # changed (select rows, then pick an action). result is a dict from input
+    # path to decision, or None when the conversion was cancelled.
+    def __init__(self, parent, conflicts):
+        self.conflicts = conflicts
+        self.decisions = {conflict.input_path: RENAME for conflict in conflicts}
+        self.result = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Files Already Exist")
+        self.window.geometry("640x400")
+        self.window.transient(parent)
+        self.window.protocol("WM_DELETE_WINDOW", self._cancel)
+
+        tk.Label(
+            self.window,
+            text=f"{len(conflicts)} output file(s) already exist or are written twice.",
+            font=("Helvetica", 11),
+        ).pack(padx=10, pady=(10, 5), anchor="w")
+
+        all_bar = tk.Frame(self.window)
+        all_bar.pack(fill="x", padx=10)
+        for decision in DECISIONS:
+            tk.Button(
+                all_bar,
+                text=f"{ACTION_LABELS[decision]} All",
+                command=lambda d=decision: self._decide_all(d),
+            ).pack(side="left", padx=(0, 5))
+
+        table_frame = tk.Frame(self.window)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.table = ttk.Treeview(table_frame, columns=("input", "output", "action"), show="headings")
+        self.table.heading("input", text="Image")
+        self.table.heading("output", text="PDF")
+        self.table.heading("action", text="Action")
+        self.table.column("action", width=90, stretch=False)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        self.table.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self._rows = {}
+        for conflict in conflicts:
+            output = Path(conflict.output_path).name
+            if not conflict.exists:
+                output += " (same name as another image)"
+            row = self.table.insert("", "end", values=(Path(conflict.input_path).name, output, ""))
+            self._rows[row] = conflict.input_path
+        self._refresh()
+
+        row_bar = tk.Frame(self.window)
+        row_bar.pack(fill="x", padx=10)
+        tk.Label(row_bar, text="Selected:").pack(side="left")
+        for decision in DECISIONS:
+            tk.Button(
+                row_bar,
+                text=ACTION_LABELS[decision],
+                command=lambda d=decision: self._decide_selected(d),
+            ).pack(side="left", padx=(5, 0))
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill="x", padx=10, pady=10)
+        tk.Button(buttons, text="Cancel", command=self._cancel).pack(side="right")
+        tk.Button(buttons, text="Convert", command=self._accept).pack(side="right", padx=5)
+
+    def show(self):
+        # Blocks (running the event loop) until the window is closed
+        self.window.grab_set()
+        self.window.wait_window()
+        return self.result
+
+    def _refresh(self):
+        for row, input_path in self._rows.items():
+            values = self.table.item(row, "values")
+            self.table.item(row, values=(values[0], values[1], ACTION_LABELS[self.decisions[input_path]]))
+
+    def _decide_all(self, decision):
+        for input_path in self.decisions:
+            self.decisions[input_path] = decision
+        self._accept()
+
+    def _decide_selected(self, decision):
+        for row in self.table.selection():
+            self.decisions[self._rows[row]] = decision
+        self._refresh()
+
+    def _accept(self):
+        self.result = dict(self.decisions)
+        self.window.destroy()
+
+    def _cancel(self):
+        self.result = None
+        self.window.destroy()
@@ -4,13 +4,20 @@ import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, ttk
 
-from PIL import Image
 try:
     from tkinterdnd2 import DND_FILES
 except Exception:  # pragma: no cover
     DND_FILES = None
 
-from src.core.converter import process_images_to_pdf
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.probe import FileProber
+from src.core.progress import ProgressChannel
+from src.gui.virtual_list import VirtualList
+from src.utils.ordered_set import IndexedOrderedSet
+
+PROGRESS_POLL_MS = 50
+PROBE_POLL_MS = 50
+PROBE_RESULTS_PER_FRAME = 500
 
 
 class ConverterView:
@@ -20,11 +27,9 @@ class ConverterView:
 
         self._header_icon = header_icon
 
-        self.files_to_convert = []
-        self.dragged_item_path = None
-        self.dragged_item_frame = None
-        self.drag_offset_y = 0
-        self.placeholder_frame_id = None
+        self.files_to_convert = IndexedOrderedSet() # Path -> {"path", "info"}
+        self.prober = None
+        self.progress_channels = set() # One per conversion still being drained
 
         self.output_dir = tk.StringVar(value=os.getcwd())
         self.output_name = tk.StringVar(value="combined_images.pdf")
@@ -89,20 +94,15 @@ class ConverterView:
         list_outer.configure(height=170)
         list_outer.pack_propagate(False)
 
-        self.canvas = tk.Canvas(list_outer, bg="#FFFFFF", highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(list_outer, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")),
+        self.file_list = VirtualList(
+            list_outer,
+            row_text=self._row_text,
+            on_remove=lambda file_info: self._remove_file(file_info["path"]),
+            on_move=self._move_file,
         )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.scrollbar.pack(side="right", fill="y")
+        self.file_list.pack(fill="both", expand=True)
+        self.file_list.set_items(self.files_to_convert)
+        self.files_to_convert.subscribe(lambda change: self._update_button_state())
 
         self.status_label = ttk.Label(self.frame, text="")
         self.status_label.pack(anchor="w", pady=(12, 0))
@@ -120,184 +120,148 @@ class ConverterView:
     def _handle_drop(self, event):
         files = self.root.tk.splitlist(event.data)
         paths = [Path(f) for f in files if Path(f).suffix]
-        image_paths = [p for p in paths if self._is_image(p)]
-        if image_paths:
-            self._add_files(image_paths)
-
-    def _is_image(self, p: Path) -> bool:
-        try:
-            Image.open(p).close()
-            return True
-        except Exception:
-            return False
+        if paths:
+            self._add_files(paths)
 
     def _add_files(self, new_files):
-        existing = {f["path"] for f in self.files_to_convert if not f.get("removed", False)}
-
-        if not existing and new_files:
+        # Rows appear straight away as "probing…"; files that turn out not to be
+        # images are dropped from the list when their probe finishes
+        if not self.files_to_convert and new_files:
             self.output_dir.set(str(new_files[0].parent))
 
-        for p in new_files:
-            if str(p) in existing:
-                continue
-            self.files_to_convert.append({"path": str(p), "removed": False})
+        added = []
+        with self.files_to_convert.batch():
+            for p in new_files:
+                if self.files_to_convert.add(str(p), {"path": str(p), "info": None}):
+                    added.append(str(p))
+
+        if added:
+            if self.prober is None:
+                self.prober = FileProber()
+            probing = self.prober.pending
+            self.prober.probe(added)
+            if not probing:
+                self.root.after(PROBE_POLL_MS, self._drain_probes)
 
-        self._refresh_list()
         self._update_button_state()
         self.status_label.config(text="", style="TLabel")
 
-    def _refresh_list(self):
-        for child in self.scrollable_frame.winfo_children():
-            child.destroy()
-
-        for file_info in self.files_to_convert:
-            if file_info.get("removed", False):
-                continue
-
-            row = tk.Frame(self.scrollable_frame, bg="#FFFFFF", highlightbackground="#EFEFEF", highlightthickness=1)
-            row.pack(fill="x", pady=4)
-
-            row.bind("<Button-1>", lambda e, p=file_info["path"]: self._on_drag_start(e, p))
-            row.bind("<B1-Motion>", self._on_drag_motion)
-            row.bind("<ButtonRelease-1>", self._on_drop)
-
-            lbl = ttk.Label(row, text=file_info["path"])
-            lbl.pack(side="left", padx=8, pady=8, fill="x", expand=True)
-
-            btn = ttk.Button(row, text="Remove", command=lambda p=file_info["path"]: self._remove_file(p))
-            btn.pack(side="right", padx=8, pady=6)
+    def _drain_probes(self):
+        infos = self.prober.drain(PROBE_RESULTS_PER_FRAME)
+        with self.files_to_convert.batch():
+            for info in infos:
+                file_info = self.files_to_convert.get(info.path)
+                if file_info is None:
+                    continue
+                if not info.is_image:
+                    self.files_to_convert.discard(info.path)
+                    continue
+                file_info["info"] = info
+                self.files_to_convert.touch(info.path)
+        if infos:
+            self._update_button_state()
+
+        if self.prober.pending:
+            self.root.after(PROBE_POLL_MS, self._drain_probes)
+
+    def _row_text(self, file_info):
+        info = file_info.get("info")
+        return file_info["path"], info.describe() if info is not None else "probing…"
 
     def _remove_file(self, file_path: str):
-        for f in self.files_to_convert:
-            if f["path"] == file_path and not f.get("removed", False):
-                f["removed"] = True
-        self._refresh_list()
-        self._update_button_state()
+        self.files_to_convert.discard(file_path)
 
     def _clear_files(self):
-        self.files_to_convert = []
-        self._refresh_list()
-        self._update_button_state()
+        self.files_to_convert.clear()
         self.status_label.config(text="", style="TLabel")
 
+    def _probed(self):
+        # Every file was handed to the prober, so none is left unprobed (and
+        # possibly not an image) once it has nothing pending
+        return self.prober is None or not self.prober.pending
+
     def _update_button_state(self):
-        active = [f for f in self.files_to_convert if not f.get("removed", False)]
-        state = "normal" if active else "disabled"
-        self.convert_btn.config(state=state)
-        self.clear_btn.config(state=state)
+        has_files = bool(self.files_to_convert)
+        self.convert_btn.config(state="normal" if has_files and self._probed() else "disabled")
+        self.clear_btn.config(state="normal" if has_files else "disabled")
 
     def _start_conversion(self):
-        active_paths = [f["path"] for f in self.files_to_convert if not f.get("removed", False)]
-        if not active_paths:
+        active_paths = self.files_to_convert.keys()
+        if not active_paths or not self._probed():
             return
 
-        thread = threading.Thread(target=self._process, args=(active_paths,))
-        thread.start()
-
-    def _process(self, active_paths):
         output_dir = Path(self.output_dir.get())
         output_name = self.output_name.get().strip() or "combined_images.pdf"
-
         if not output_name.lower().endswith(".pdf"):
             output_name = f"{output_name}.pdf"
-            self.root.after(0, lambda: self.output_name.set(output_name))
+            self.output_name.set(output_name)
+
+        progress_channel = ProgressChannel()
+        self.progress_channels.add(progress_channel)
+        thread = threading.Thread(
+            target=self._process,
+            args=(active_paths, output_dir, output_name, progress_channel),
+            daemon=True,
+        )
+        thread.start()
+        self.root.after(PROGRESS_POLL_MS, lambda: self._drain_progress(progress_channel))
 
+    def _process(self, active_paths, output_dir, output_name, progress_channel):
+        # Runs on a worker thread and only talks to the UI through progress_channel
         def ask_overwrite_callback(_png_path, _pdf_path):
             return "overwrite"
 
         def get_new_name_callback(original_path):
             return original_path
 
-        def update_status_callback(_file_path, _status_text, _color):
-            return
-
-        def update_overall_progress_callback(_message, _current, _total):
-            return
-
-        converted, skipped = process_images_to_pdf(
-            png_paths=active_paths,
-            output_dir=output_dir,
-            output_mode="single",
-            ask_overwrite_callback=ask_overwrite_callback,
-            get_new_name_callback=get_new_name_callback,
-            update_status_callback=update_status_callback,
-            update_overall_progress_callback=update_overall_progress_callback,
-            single_pdf_filename=output_name,
-            auto_rename_if_exists=True,
-        )
-
-        def update_status():
-            if converted > 0 and skipped == 0:
-                self.status_label.config(text=f"Converted: {converted}", style="Success.TLabel")
-            elif converted > 0:
-                self.status_label.config(text=f"Converted: {converted}  Skipped: {skipped}", style="Success.TLabel")
-            else:
-                self.status_label.config(text=f"Skipped: {skipped}", style="Error.TLabel")
-
-        self.root.after(0, update_status)
-
-    def _on_drag_start(self, event, file_path):
-        self.dragged_item_path = file_path
-        self.dragged_item_frame = event.widget
-        self.drag_offset_y = event.y_root - self.dragged_item_frame.winfo_rooty()
-
-        if self.placeholder_frame_id is not None:
-            try:
-                self.canvas.delete(self.placeholder_frame_id)
-            except Exception:
-                pass
-            self.placeholder_frame_id = None
-
         try:
-            y = self.canvas.canvasy(event.y)
-            self.placeholder_frame_id = self.canvas.create_rectangle(0, y, self.canvas.winfo_width(), y + 44, outline="#C0C0C0")
-        except Exception:
-            self.placeholder_frame_id = None
-
-    def _on_drag_motion(self, event):
-        if self.placeholder_frame_id is None:
-            return
-        y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty() - self.drag_offset_y)
-        self.canvas.coords(self.placeholder_frame_id, 0, y, self.canvas.winfo_width(), y + 44)
-
-    def _on_drop(self, event):
-        if not self.dragged_item_path:
-            return
-
-        drop_y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty() - self.drag_offset_y)
+            converted, skipped = process_images_to_pdf(
+                png_paths=active_paths,
+                output_dir=output_dir,
+                output_mode="single",
+                ask_overwrite_callback=ask_overwrite_callback,
+                get_new_name_callback=get_new_name_callback,
+                update_status_callback=progress_channel.update_status,
+                update_overall_progress_callback=progress_channel.update_overall_progress,
+                single_pdf_filename=output_name,
+                auto_rename_if_exists=True,
+                options=ConversionOptions(workers=os.cpu_count() or 1),
+            )
+        except Exception as e:
+            progress_channel.finish(0, len(active_paths), error=str(e))
+        else:
+            progress_channel.finish(converted, skipped)
 
-        active_items = [f for f in self.files_to_convert if not f.get("removed", False)]
-        if not active_items:
+    def _drain_progress(self, progress_channel):
+        # Runs until the conversion finishes or the view is closed
+        if progress_channel.closed:
             return
+        batch = progress_channel.drain()
+        if batch.overall is not None:
+            self.status_label.config(text=batch.overall.message, style="TLabel")
 
-        new_index = 0
-        current_y = 0
-        for i, f in enumerate(active_items):
-            current_y += 52
-            if drop_y > current_y:
-                new_index = i + 1
-
-        original_index = next((i for i, f in enumerate(self.files_to_convert) if f["path"] == self.dragged_item_path), None)
-        if original_index is None:
+        finished = batch.finished
+        if finished is None:
+            self.root.after(PROGRESS_POLL_MS, lambda: self._drain_progress(progress_channel))
             return
 
-        item = self.files_to_convert.pop(original_index)
-
-        active_positions = [i for i, f in enumerate(self.files_to_convert) if not f.get("removed", False)]
-        if new_index >= len(active_positions):
-            self.files_to_convert.append(item)
+        progress_channel.close()
+        self.progress_channels.discard(progress_channel)
+        if finished.error:
+            self.status_label.config(text=f"Error: {finished.error}", style="Error.TLabel")
+        elif finished.converted > 0 and finished.skipped == 0:
+            self.status_label.config(text=f"Converted: {finished.converted}", style="Success.TLabel")
+        elif finished.converted > 0:
+            self.status_label.config(text=f"Converted: {finished.converted}  Skipped: {finished.skipped}", style="Success.TLabel")
         else:
-            insert_at = active_positions[new_index]
-            self.files_to_convert.insert(insert_at, item)
-
-        if self.placeholder_frame_id is not None:
-            try:
-                self.canvas.delete(self.placeholder_frame_id)
-            except Exception:
-                pass
-            self.placeholder_frame_id = None
+            self.status_label.config(text=f"Skipped: {finished.skipped}", style="Error.TLabel")
 
-        self.dragged_item_path = None
-        self.dragged_item_frame = None
+    def _move_file(self, old_index, new_index):
+        self.files_to_convert.move(self.files_to_convert.key_at(old_index), new_index)
 
-        self._refresh_list()
+    def cleanup(self):
+        # The window is closing: a conversion still running carries on without
+        # waiting on a channel nobody drains
+        for progress_channel in self.progress_channels:
+            progress_channel.close()
+        self.progress_channels.clear()
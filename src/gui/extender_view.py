@@ -5,13 +5,20 @@ import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, ttk
 
-from PIL import Image
 try:
     from tkinterdnd2 import DND_FILES
 except Exception:  # pragma: no cover
     DND_FILES = None
 
 from src.core.extender import extend_document
+from src.core.probe import IMAGE, PDF, FileProber
+from src.core.progress import ProgressChannel
+from src.gui.virtual_list import VirtualList
+from src.utils.ordered_set import IndexedOrderedSet
+
+PROGRESS_POLL_MS = 50
+PROBE_POLL_MS = 50
+PROBE_RESULTS_PER_FRAME = 500
 
 
 class ExtenderView:
@@ -29,10 +36,9 @@ class ExtenderView:
         self.output_dir = tk.StringVar(value=os.getcwd())
         self.output_name = tk.StringVar(value="")
 
-        self.files_to_append = []
-        self.dragged_item_path = None
-        self.drag_offset_y = 0
-        self.placeholder_frame_id = None
+        self.files_to_append = IndexedOrderedSet() # Path -> {"path", "info"}
+        self.prober = None
+        self.progress_channels = set() # One per extend still being drained
 
         self._build_ui()
         self._update_buttons()
@@ -122,20 +128,15 @@ class ExtenderView:
         list_outer.configure(height=170)
         list_outer.pack_propagate(False)
 
-        self.canvas = tk.Canvas(list_outer, bg="#FFFFFF", highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(list_outer, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")),
+        self.file_list = VirtualList(
+            list_outer,
+            row_text=self._row_text,
+            on_remove=lambda file_info: self._remove_attachment(file_info["path"]),
+            on_move=self._move_attachment,
         )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.scrollbar.pack(side="right", fill="y")
+        self.file_list.pack(fill="both", expand=True)
+        self.file_list.set_items(self.files_to_append)
+        self.files_to_append.subscribe(lambda change: self._on_attachments_changed())
 
         self.status_label = ttk.Label(self.frame, text="")
         self.status_label.pack(anchor="w", pady=(12, 0))
@@ -191,89 +192,78 @@ class ExtenderView:
         paths = [Path(f) for f in files]
         self._add_attachments(paths)
 
-    def _is_image(self, p: Path) -> bool:
-        try:
-            img = Image.open(p)
-            img.close()
-            return True
-        except Exception:
-            return False
-
-    def _is_pdf(self, p: Path) -> bool:
-        return p.suffix.lower() == ".pdf"
-
     def _add_attachments(self, paths):
-        new_items = [
-            p
-            for p in paths
-            if p.is_file() and (self._is_pdf(p) or self._is_image(p))
-        ]
-        existing = {f["path"] for f in self.files_to_append if not f.get("removed", False)}
-
-        for p in new_items:
-            if str(p) in existing:
-                continue
-            self.files_to_append.append({"path": str(p), "removed": False})
-
-        self.attachments_summary.set(f"{len([f for f in self.files_to_append if not f.get('removed', False)])} file(s) selected")
+        # Rows appear straight away as "probing…"; anything that turns out not to
+        # be a PDF or an image file is dropped when its probe finishes
+        added = []
+        with self.files_to_append.batch():
+            for p in paths:
+                if self.files_to_append.add(str(p), {"path": str(p), "info": None}):
+                    added.append(str(p))
+
+        if added:
+            if self.prober is None:
+                self.prober = FileProber()
+            probing = self.prober.pending
+            self.prober.probe(added)
+            if not probing:
+                self.root.after(PROBE_POLL_MS, self._drain_probes)
 
-        self._refresh_list()
         self._update_buttons()
         self.status_label.config(text="", style="TLabel")
 
-    def _refresh_list(self):
-        for child in self.scrollable_frame.winfo_children():
-            child.destroy()
-
-        for file_info in self.files_to_append:
-            if file_info.get("removed", False):
-                continue
-
-            row = tk.Frame(self.scrollable_frame, bg="#FFFFFF", highlightbackground="#EFEFEF", highlightthickness=1)
-            row.pack(fill="x", pady=4)
-
-            row.bind("<Button-1>", lambda e, p=file_info["path"]: self._on_drag_start(e, p))
-            row.bind("<B1-Motion>", self._on_drag_motion)
-            row.bind("<ButtonRelease-1>", self._on_drop)
-
-            lbl = ttk.Label(row, text=file_info["path"])
-            lbl.pack(side="left", padx=8, pady=8, fill="x", expand=True)
+    def _drain_probes(self):
+        infos = self.prober.drain(PROBE_RESULTS_PER_FRAME)
+        with self.files_to_append.batch():
+            for info in infos:
+                file_info = self.files_to_append.get(info.path)
+                if file_info is None:
+                    continue
+                if info.kind not in (PDF, IMAGE):
+                    self.files_to_append.discard(info.path)
+                    continue
+                file_info["info"] = info
+                self.files_to_append.touch(info.path)
+        if infos:
+            self._update_buttons()
+
+        if self.prober.pending:
+            self.root.after(PROBE_POLL_MS, self._drain_probes)
+
+    def _on_attachments_changed(self):
+        self.attachments_summary.set(f"{len(self.files_to_append)} file(s) selected")
+        self._update_buttons()
 
-            btn = ttk.Button(row, text="Remove", command=lambda p=file_info["path"]: self._remove_attachment(p))
-            btn.pack(side="right", padx=8, pady=6)
+    def _row_text(self, file_info):
+        info = file_info.get("info")
+        return file_info["path"], info.describe() if info is not None else "probing…"
 
     def _remove_attachment(self, file_path: str):
-        for f in self.files_to_append:
-            if f["path"] == file_path and not f.get("removed", False):
-                f["removed"] = True
-        self._refresh_list()
-        self._update_buttons()
-
-        self.attachments_summary.set(
-            f"{len([f for f in self.files_to_append if not f.get('removed', False)])} file(s) selected"
-        )
+        self.files_to_append.discard(file_path)
 
     def _clear(self):
         self.base_path.set("")
-        self.files_to_append = []
+        self.files_to_append.clear()
         self.output_name.set("")
         self.output_dir.set(os.getcwd())
         self.attachments_summary.set("")
         self.status_label.config(text="", style="TLabel")
-        self._refresh_list()
         self._update_buttons()
 
     def _update_buttons(self):
         has_base = bool(self.base_path.get())
-        active = [f for f in self.files_to_append if not f.get("removed", False)]
-        can_extend = has_base and bool(active) and bool(self.output_name.get().strip())
+        has_attachments = bool(self.files_to_append)
+        # Every attachment was handed to the prober, so none is left unprobed
+        # once it has nothing pending
+        probed = self.prober is None or not self.prober.pending
+        can_extend = has_base and has_attachments and probed and bool(self.output_name.get().strip())
 
         self.extend_btn.config(state=("normal" if can_extend else "disabled"))
-        self.clear_btn.config(state=("normal" if (has_base or active) else "disabled"))
+        self.clear_btn.config(state=("normal" if (has_base or has_attachments) else "disabled"))
 
     def _start_extend(self):
         base = Path(self.base_path.get())
-        attachments = [Path(f["path"]) for f in self.files_to_append if not f.get("removed", False)]
+        attachments = [Path(p) for p in self.files_to_append.keys()]
         out_dir = Path(self.output_dir.get())
         out_name = self.output_name.get().strip()
         base_type = self.base_type.get().strip().lower()
@@ -282,8 +272,13 @@ class ExtenderView:
             out_name = f"{out_name}.pdf"
             self.output_name.set(out_name)
 
+        progress_channel = ProgressChannel()
+        self.progress_channels.add(progress_channel)
+
         def worker():
+            # Only talks to the UI through progress_channel
             try:
+                progress_channel.update_overall_progress(f"Extending {base.name}…", 0, len(attachments))
                 with tempfile.TemporaryDirectory() as td:
                     out_path, renamed_base, pages = extend_document(
                         base_path=base,
@@ -305,79 +300,45 @@ class ExtenderView:
                             deleted_attachments += 1
                     except Exception:
                         pass
-
-                def update_status():
-                    self.base_path.set(str(out_path))
-                    self.status_label.config(
-                        text=f"Done: {out_path.name} (+{pages} pages). Base and {deleted_attachments} attachment(s) deleted.",
-                        style="Success.TLabel",
-                    )
-
-                self.root.after(0, update_status)
             except Exception as e:
-                self.root.after(0, lambda: self.status_label.config(text=f"Error: {e}", style="Error.TLabel"))
+                progress_channel.finish(0, len(attachments), error=str(e))
+            else:
+                progress_channel.finish(pages, 0, result=(out_path, deleted_attachments))
 
         threading.Thread(target=worker).start()
+        self.root.after(PROGRESS_POLL_MS, lambda: self._drain_progress(progress_channel))
 
-    def _on_drag_start(self, event, file_path):
-        self.dragged_item_path = file_path
-        self.drag_offset_y = event.y_root - event.widget.winfo_rooty()
-
-        if self.placeholder_frame_id is not None:
-            try:
-                self.canvas.delete(self.placeholder_frame_id)
-            except Exception:
-                pass
-            self.placeholder_frame_id = None
-
-        try:
-            y = self.canvas.canvasy(event.y)
-            self.placeholder_frame_id = self.canvas.create_rectangle(0, y, self.canvas.winfo_width(), y + 44, outline="#C0C0C0")
-        except Exception:
-            self.placeholder_frame_id = None
-
-    def _on_drag_motion(self, event):
-        if self.placeholder_frame_id is None:
+    def _drain_progress(self, progress_channel):
+        # Runs until the extend finishes or the view is closed
+        if progress_channel.closed:
             return
-        y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty() - self.drag_offset_y)
-        self.canvas.coords(self.placeholder_frame_id, 0, y, self.canvas.winfo_width(), y + 44)
+        batch = progress_channel.drain()
+        if batch.overall is not None:
+            self.status_label.config(text=batch.overall.message, style="TLabel")
 
-    def _on_drop(self, event):
-        if not self.dragged_item_path:
+        finished = batch.finished
+        if finished is None:
+            self.root.after(PROGRESS_POLL_MS, lambda: self._drain_progress(progress_channel))
             return
 
-        drop_y = self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty() - self.drag_offset_y)
-
-        active_items = [f for f in self.files_to_append if not f.get("removed", False)]
-        if not active_items:
+        progress_channel.close()
+        self.progress_channels.discard(progress_channel)
+        if finished.error:
+            self.status_label.config(text=f"Error: {finished.error}", style="Error.TLabel")
             return
+        out_path, deleted_attachments = finished.result
+        self.base_path.set(str(out_path))
+        self.status_label.config(
+            text=f"Done: {out_path.name} (+{finished.converted} pages). Base and {deleted_attachments} attachment(s) deleted.",
+            style="Success.TLabel",
+        )
 
-        new_index = 0
-        current_y = 0
-        for i, f in enumerate(active_items):
-            current_y += 52
-            if drop_y > current_y:
-                new_index = i + 1
-
-        original_index = next((i for i, f in enumerate(self.files_to_append) if f["path"] == self.dragged_item_path), None)
-        if original_index is None:
-            return
-
-        item = self.files_to_append.pop(original_index)
-
-        active_positions = [i for i, f in enumerate(self.files_to_append) if not f.get("removed", False)]
-        if new_index >= len(active_positions):
-            self.files_to_append.append(item)
-        else:
-            insert_at = active_positions[new_index]
-            self.files_to_append.insert(insert_at, item)
-
-        if self.placeholder_frame_id is not None:
-            try:
-                self.canvas.delete(self.placeholder_frame_id)
-            except Exception:
-                pass
-            self.placeholder_frame_id = None
+    def _move_attachment(self, old_index, new_index):
+        self.files_to_append.move(self.files_to_append.key_at(old_index), new_index)
 
-        self.dragged_item_path = None
-        self._refresh_list()
+    def cleanup(self):
+        # The window is closing: an extend still running carries on without
+        # waiting on a channel nobody drains
+        for progress_channel in self.progress_channels:
+            progress_channel.close()
+        self.progress_channels.clear()
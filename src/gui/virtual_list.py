@@ -0,0 +1,185 @@
+import tkinter as tk
+from tkinter import ttk
+
+from src.utils.ordered_set import UPDATED
+
+
+def visible_range(top, height, row_height, overscan, count):
+    # [first, last) indexes of the rows that need widgets when the view starts
+    # top pixels down and is height pixels tall
+    first = max(0, top // row_height - overscan)
+    last = min(count, (top + height) // row_height + 1 + overscan)
+    return first, max(first, last)
+
+
+def drop_index(y, row_height, count):
+    # Position a row dragged to canvas y lands at, counted without the row itself
+    return max(0, min(count - 1, int((y + row_height / 2) // row_height)))
+
+
+class VirtualList:
+    # Scrollable list of fixed-height rows that only has widgets for the rows in
+    # view plus a few either side. Scrolling moves the same row widgets and
+    # fills them with other items, so an update costs the same with 50 items or
+    # 50,000. Rows are dragged to reorder them.
+    #
+    # row_text(item) returns the (text, detail) shown for an item; on_remove(item)
+    # is called by a row's Remove button and on_move(old_index, new_index) when a
+    # row was dragged to a new position.
+    def __init__(self, parent, row_text, on_remove, on_move, row_height=52, overscan=4, bg="#FFFFFF"):
+        self.row_text = row_text
+        self.on_remove = on_remove
+        self.on_move = on_move
+        self.row_height = row_height
+        self.overscan = overscan
+        self.bg = bg
+        self.items = []
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0, yscrollincrement=row_height)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self._rows = [] # Pool of row widgets, reused for whichever items are in view
+        self._drag_index = None
+        self._drag_offset_y = 0
+        self._placeholder_id = None
+
+        self.canvas.bind("<Configure>", lambda e: self._layout())
+        self._bind_wheel(self.canvas)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_items(self, items):
+        # items is anything with len() and indexing; an IndexedOrderedSet is
+        # used as is, and the list then follows its change notifications
+        if not hasattr(items, "subscribe"):
+            items = list(items)
+        elif items is not self.items:
+            items.subscribe(self.on_change)
+        self.items = items
+        self._update_scrollregion()
+        self._layout()
+
+    def refresh(self):
+        # Re-renders the rows in view, e.g. after an item's text changed
+        self._layout()
+
+    def on_change(self, change):
+        # An updated item only redraws its own row, if that is in view; other
+        # changes shift positions, so the rows in view are laid out again
+        if change.kind == UPDATED:
+            for row in self._rows:
+                if row["index"] == change.index:
+                    self._fill(row, change.index)
+            return
+        self._update_scrollregion()
+        self._layout()
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, 0, len(self.items) * self.row_height))
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._layout()
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self._scroll(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self._scroll(-1))
+        widget.bind("<Button-5>", lambda e: self._scroll(1))
+
+    def _scroll(self, rows):
+        self.canvas.yview_scroll(rows, "units")
+        self._layout()
+
+    def _new_row(self):
+        row = {"frame": tk.Frame(self.canvas, bg=self.bg, highlightbackground="#EFEFEF", highlightthickness=1)}
+        row["label"] = ttk.Label(row["frame"], text="")
+        row["label"].pack(side="left", padx=8, pady=8, fill="x", expand=True)
+        row["button"] = ttk.Button(row["frame"], text="Remove", command=lambda: self._remove(row))
+        row["button"].pack(side="right", padx=8, pady=6)
+        row["detail"] = ttk.Label(row["frame"], text="")
+        row["detail"].pack(side="right", padx=8)
+        row["window"] = self.canvas.create_window(0, 0, window=row["frame"], anchor="nw")
+        row["index"] = None
+
+        for widget in (row["frame"], row["label"], row["detail"]):
+            widget.bind("<Button-1>", lambda e, r=row: self._on_drag_start(e, r))
+            widget.bind("<B1-Motion>", self._on_drag_motion)
+            widget.bind("<ButtonRelease-1>", self._on_drop)
+            self._bind_wheel(widget)
+        return row
+
+    def _layout(self):
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = self.canvas.winfo_width()
+        top = int(self.canvas.canvasy(0))
+        first, last = visible_range(top, height, self.row_height, self.overscan, len(self.items))
+
+        while len(self._rows) < last - first:
+            self._rows.append(self._new_row())
+
+        for slot, row in enumerate(self._rows):
+            index = first + slot
+            if index >= last:
+                if row["index"] is not None:
+                    self.canvas.itemconfigure(row["window"], state="hidden")
+                    row["index"] = None
+                continue
+            self._fill(row, index)
+            row["index"] = index
+            self.canvas.coords(row["window"], 0, index * self.row_height + 2)
+            self.canvas.itemconfigure(row["window"], state="normal", width=width, height=self.row_height - 4)
+
+    def _fill(self, row, index):
+        text, detail = self.row_text(self.items[index])
+        if row["label"].cget("text") != text:
+            row["label"].config(text=text)
+        if row["detail"].cget("text") != detail:
+            row["detail"].config(text=detail)
+
+    def _remove(self, row):
+        if row["index"] is not None and row["index"] < len(self.items):
+            self.on_remove(self.items[row["index"]])
+
+    def _on_drag_start(self, event, row):
+        self._drag_index = row["index"]
+        self._drag_offset_y = event.y_root - row["frame"].winfo_rooty()
+        self._clear_placeholder()
+        y = self._pointer_y(event)
+        self._placeholder_id = self.canvas.create_rectangle(0, y, self.canvas.winfo_width(), y + self.row_height - 8, outline="#C0C0C0")
+
+    def _on_drag_motion(self, event):
+        if self._placeholder_id is None:
+            return
+        # Scrolls while the pointer is held past the top or bottom edge
+        pointer = event.y_root - self.canvas.winfo_rooty()
+        if pointer < 0:
+            self._scroll(-1)
+        elif pointer > self.canvas.winfo_height():
+            self._scroll(1)
+        y = self._pointer_y(event)
+        self.canvas.coords(self._placeholder_id, 0, y, self.canvas.winfo_width(), y + self.row_height - 8)
+
+    def _on_drop(self, event):
+        if self._drag_index is None:
+            return
+        old_index = self._drag_index
+        y = self._pointer_y(event)
+        self._drag_index = None
+        self._clear_placeholder()
+
+        new_index = drop_index(y, self.row_height, len(self.items))
+        if new_index != old_index:
+            self.on_move(old_index, new_index)
+
+    def _pointer_y(self, event):
+        return self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty() - self._drag_offset_y)
+
+    def _clear_placeholder(self):
+        if self._placeholder_id is not None:
+            self.canvas.delete(self._placeholder_id)
+            self._placeholder_id = None
@@ -1,3 +1,4 @@
+import multiprocessing
 import tkinter as tk
 
 try:
@@ -8,6 +9,7 @@ except Exception:  # pragma: no cover
 from src.gui.shell import ShellApp
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = TkinterDnD.Tk() if TkinterDnD is not None else tk.Tk()
     root.title("UtilityBox")
     app = ShellApp(root)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+# Ordered collection of unique keys, each with a value, for lists the user can
+# add to, remove from and reorder. Positions are kept in an implicit treap (a
+# randomly balanced tree ordered by position, where each node knows its subtree
+# size), and a dict maps each key to its node. That gives O(1) membership, count
+# and lookup by key, and O(log n) lookup by position, insertion, removal and
+# moving an entry to another position. Subscribers are told about every change,
+# so a view can redraw only what the change touched.
+
+ADDED = "added"
+REMOVED = "removed"
+MOVED = "moved"
+UPDATED = "updated"
+RESET = "reset" # Many changes at once, see batch()
+
+
+@dataclass(frozen=True)
+class Change:
+    kind: str
+    key: Any = None
+    index: Optional[int] = None
+    # Where the entry ended up, for MOVED
+    new_index: Optional[int] = None
+
+
+class _Node:
+    __slots__ = ("key", "value", "priority", "size", "left", "right", "parent")
+
+    def __init__(self, key: Hashable, value: Any) -> None:
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.size = 1
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.parent: Optional[_Node] = None
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node is not None else 0
+
+
+def _pull(node: _Node) -> _Node:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    if node.left is not None:
+        node.left.parent = node
+    if node.right is not None:
+        node.right.parent = node
+    return node
+
+
+def _split(node: Optional[_Node], count: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    # The first count entries and the rest
+    if node is None:
+        return None, None
+    if _size(node.left) < count:
+        left, right = _split(node.right, count - _size(node.left) - 1)
+        node.right = left
+        return _pull(node), right
+    left, right = _split(node.left, count)
+    node.left = right
+    return left, _pull(node)
+
+
+def _merge(first: Optional[_Node], second: Optional[_Node]) -> Optional[_Node]:
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if first.priority > second.priority:
+        first.right = _merge(first.right, second)
+        return _pull(first)
+    second.left = _merge(first, second.left)
+    return _pull(second)
+
+
+class IndexedOrderedSet:
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+        self._nodes: Dict[Hashable, _Node] = {}
+        self._subscribers: List[Callable[[Change], None]] = []
+        self._batch_depth = 0
+        self._batch_changed = False
+
+    # Reading
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._nodes
+
+    def __getitem__(self, index: int) -> Any:
+        # The value at a position
+        return self._node_at(index).value
+
+    def __iter__(self) -> Iterator[Any]:
+        return (node.value for node in self._in_order())
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        node = self._nodes.get(key)
+        return node.value if node is not None else default
+
+    def keys(self) -> List[Hashable]:
+        return [node.key for node in self._in_order()]
+
+    def key_at(self, index: int) -> Hashable:
+        return self._node_at(index).key
+
+    def index(self, key: Hashable) -> int:
+        node = self._nodes[key]
+        index = _size(node.left)
+        while node.parent is not None:
+            if node is node.parent.right:
+                index += _size(node.parent.left) + 1
+            node = node.parent
+        return index
+
+    # Changing
+
+    def add(self, key: Hashable, value: Any, index: Optional[int] = None) -> bool:
+        # Inserts at index (default: the end); False when key is already present
+        if key in self._nodes:
+            return False
+        index = len(self) if index is None else max(0, min(index, len(self)))
+        node = _Node(key, value)
+        self._nodes[key] = node
+        self._insert(node, index)
+        self._notify(Change(ADDED, key, index))
+        return True
+
+    def discard(self, key: Hashable) -> bool:
+        if key not in self._nodes:
+            return False
+        index = self.index(key)
+        self._take(index)
+        del self._nodes[key]
+        self._notify(Change(REMOVED, key, index))
+        return True
+
+    def move(self, key: Hashable, new_index: int) -> None:
+        # Moves an entry so that it ends up at new_index
+        index = self.index(key)
+        new_index = max(0, min(new_index, len(self) - 1))
+        if new_index == index:
+            return
+        node = self._take(index)
+        self._insert(node, new_index)
+        self._notify(Change(MOVED, key, index, new_index))
+
+    def touch(self, key: Hashable) -> None:
+        # Tells subscribers the entry's value changed in place
+        self._notify(Change(UPDATED, key, self.index(key)))
+
+    def clear(self) -> None:
+        self._root = None
+        self._nodes = {}
+        self._notify(Change(RESET))
+
+    # Notifications
+
+    def subscribe(self, callback: Callable[[Change], None]) -> None:
+        self._subscribers.append(callback)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        # Changes made inside are announced as a single RESET at the end
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_changed:
+                self._batch_changed = False
+                self._notify(Change(RESET))
+
+    def _notify(self, change: Change) -> None:
+        if self._batch_depth:
+            self._batch_changed = True
+            return
+        for callback in self._subscribers:
+            callback(change)
+
+    # Tree
+
+    def _node_at(self, index: int) -> _Node:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        node = self._root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node
+            else:
+                index -= left + 1
+                node = node.right
+
+    def _insert(self, node: _Node, index: int) -> None:
+        node.left = node.right = node.parent = None
+        node.size = 1
+        left, right = _split(self._root, index)
+        self._set_root(_merge(_merge(left, node), right))
+
+    def _take(self, index: int) -> _Node:
+        left, rest = _split(self._root, index)
+        node, right = _split(rest, 1)
+        self._set_root(_merge(left, right))
+        return node
+
+    def _set_root(self, root: Optional[_Node]) -> None:
+        if root is not None:
+            root.parent = None
+        self._root = root
+
+    def _in_order(self) -> Iterator[_Node]:
+        stack: List[_Node] = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.cli import collect_inputs, main
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.images = self.tmp / "images"
+        (self.images / "nested").mkdir(parents=True)
+        for name in ("b.png", "a.png", "nested/c.png"):
+            Image.new("RGB", (10, 10), "red").save(self.images / name)
+        (self.images / "notes.txt").write_text("not an image")
+        self.out = self.tmp / "out"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code = main(list(argv))
+        return code, json.loads(stdout.getvalue())
+
+    def test_collect_inputs(self):
+        self.assertEqual([Path(p).name for p in collect_inputs([str(self.images)])], ["a.png", "b.png"])
+        self.assertEqual(len(collect_inputs([str(self.images)], recursive=True)), 3)
+
+        file_list = self.tmp / "list.txt"
+        file_list.write_text(f"# pages\n{self.images / 'b.png'}\n\n{self.images / 'a.png'}\n")
+        inputs = collect_inputs([str(self.images / "*.png")], str(file_list))
+        self.assertEqual([Path(p).name for p in inputs], ["a.png", "b.png"])
+
+    def test_single_mode_summary(self):
+        code, summary = self._run("convert", str(self.images), "-o", str(self.out), "-j", "1", "-n", "all.pdf")
+        self.assertEqual(code, 0)
+        self.assertEqual((summary["converted"], summary["failed"]), (2, 0))
+        self.assertEqual({f["status"] for f in summary["files"]}, {"converted"})
+        self.assertEqual(len(PdfReader(str(self.out / "all.pdf")).pages), 2)
+
+        code, summary = self._run("convert", str(self.images), "-o", str(self.out), "-n", "all.pdf")
+        self.assertTrue((self.out / "all_1.pdf").exists())
+
+    def test_separate_mode_conflicts_and_failures(self):
+        self.out.mkdir()
+        (self.out / "a.pdf").write_bytes(b"existing")
+        code, summary = self._run(
+            "convert", str(self.images / "a.png"), str(self.tmp / "missing.png"),
+            "-m", "separate", "-o", str(self.out), "--on-conflict", "skip",
+        )
+        self.assertEqual(code, 1)
+        self.assertEqual([f["status"] for f in summary["files"]], ["skipped", "failed"])
+        self.assertEqual((self.out / "a.pdf").read_bytes(), b"existing")
+
+    def test_same_stem_inputs_get_distinct_outputs(self):
+        (self.tmp / "other").mkdir()
+        Image.new("RGB", (10, 20), "blue").save(self.tmp / "other" / "a.png")
+        Image.new("RGB", (20, 10), "green").save(self.images / "a.jpg")
+        inputs = [self.images / "a.png", self.tmp / "other" / "a.png", self.images / "a.jpg"]
+
+        code, summary = self._run("convert", *map(str, inputs), "-m", "separate", "-o", str(self.out), "-j", "2")
+
+        self.assertEqual(code, 0)
+        self.assertEqual(summary["converted"], 3)
+        outputs = sorted(p.name for p in self.out.iterdir())
+        self.assertEqual(outputs, ["a.pdf", "a_1.pdf", "a_2.pdf"])
+        sizes = {tuple(float(v) for v in PdfReader(str(self.out / name)).pages[0].mediabox[2:]) for name in outputs}
+        self.assertEqual(len(sizes), 3)
+
+    def test_does_not_import_tkinter(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, src.cli; print('tkinter' in sys.modules)"],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
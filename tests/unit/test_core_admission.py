@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from src.core.admission import DOWNSCALE, AdmissionController, estimate_cost
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.extender import extend_document
+from src.core.imaging import PageOptions
+
+
+class _PeakTracking(AdmissionController):
+
+    peak = 0
+
+    def acquire(self, cost, blocking=True):
+        admitted = super().acquire(cost, blocking)
+        self.peak = max(self.peak, self.in_use)
+        return admitted
+
+
+class TestAdmission(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _image(self, name, mode, size):
+        path = self.tmp / name
+        Image.new(mode, size).save(path)
+        return str(path)
+
+    def test_estimates_from_the_header(self):
+        rgba = self._image("a.png", "RGBA", (100, 50))
+        rgb = self._image("b.png", "RGB", (100, 50))
+        jpeg = self._image("c.jpg", "RGB", (800, 400))
+
+        self.assertEqual(estimate_cost(rgba, PageOptions()), 100 * 50 * 4 + 100 * 50 * 3)
+        self.assertEqual(estimate_cost(rgb, PageOptions()), os.path.getsize(rgb)) # Embedded as is
+        # Reduced to 200x100; the JPEG decoder scales by 4 while decoding
+        self.assertEqual(estimate_cost(jpeg, PageOptions(target_dpi=25)), 200 * 100 * 3 + 200 * 100 * 3)
+        self.assertEqual(estimate_cost(self.tmp / "missing.png", PageOptions()), 0)
+
+    def test_jobs_wait_for_room_and_oversized_ones_run_alone(self):
+        admission = AdmissionController(100)
+        self.assertTrue(admission.acquire(60))
+        self.assertFalse(admission.acquire(60, blocking=False))
+
+        waiter = threading.Thread(target=admission.acquire, args=(60,))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+        admission.release(60)
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+
+        admission.release(60)
+        self.assertTrue(admission.acquire(500, blocking=False))
+        admission.release(500)
+        self.assertEqual(admission.in_use, 0)
+
+    def test_downscale_policy_fits_the_budget(self):
+        jpeg = self._image("big.jpg", "RGB", (2000, 1000))
+        admission = AdmissionController(1_000_000, DOWNSCALE)
+        requested = PageOptions(target_dpi=90) # Decoded, so not embedded as is
+
+        options, cost = admission.plan(jpeg, requested)
+
+        self.assertLessEqual(cost, 1_000_000)
+        self.assertLess(options.target_dpi, 90)
+        self.assertEqual(AdmissionController(1_000_000).plan(jpeg, requested), (requested, estimate_cost(jpeg, requested)))
+
+    def test_conversions_stay_within_the_budget(self):
+        paths = [self._image(f"{i}.png", "RGBA", (100, 100)) for i in range(6)]
+        page_cost = estimate_cost(paths[0], PageOptions(quality=100))
+        for output_mode, workers in (("single", 3), ("separate", 1), ("separate", 2)):
+            with self.subTest(output_mode=output_mode, workers=workers):
+                admission = _PeakTracking(page_cost * 2)
+                out = self.tmp / f"{output_mode}{workers}"
+                out.mkdir()
+                result = process_images_to_pdf(
+                    png_paths=paths,
+                    output_dir=out,
+                    output_mode=output_mode,
+                    ask_overwrite_callback=MagicMock(),
+                    get_new_name_callback=MagicMock(),
+                    update_status_callback=MagicMock(),
+                    update_overall_progress_callback=MagicMock(),
+                    options=ConversionOptions(workers=workers, admission=admission),
+                )
+                self.assertEqual(result, (6, 0))
+                self.assertLessEqual(admission.peak, page_cost * 2)
+                self.assertEqual(admission.in_use, 0)
+
+    def test_extender_downscales_oversized_images(self):
+        base = self.tmp / "base.pdf"
+        Image.new("RGB", (20, 20), "white").save(base, "PDF")
+        big = self._image("big.jpg", "RGB", (2000, 1000))
+        admission = _PeakTracking(1_000_000, DOWNSCALE)
+
+        out_path, _, pages = extend_document(
+            base_path=base,
+            base_type="pdf",
+            attachment_paths=[Path(big)],
+            output_dir=self.tmp / "out",
+            output_filename="extended.pdf",
+            temp_dir=self.tmp / "work",
+            rename_base_to_original=False,
+            target_dpi=250,
+            admission=admission,
+        )
+
+        self.assertEqual(pages, 1)
+        self.assertLessEqual(admission.peak, 1_000_000)
+        self.assertTrue(out_path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+from src.cli import main
+from src.core import pdfappend
+from src.core.batch_extend import FAILED, OK, ExtendJob, extend_batch, load_manifest
+from src.core.docx_pdf import DocxConverter, UnoserverBackend
+
+
+class TestBatchExtend(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        for name, pages in (("a.pdf", 1), ("b.pdf", 2), ("c.pdf", 3)):
+            writer = PdfWriter()
+            for _ in range(pages):
+                writer.add_blank_page(200, 300)
+            writer.write(self.tmp / name)
+        self.cover = self.tmp / "cover.pdf"
+        Image.new("RGB", (20, 20), "white").save(self.cover, "PDF")
+        self.scan = self.tmp / "scan.png"
+        Image.new("RGB", (30, 10), "red").save(self.scan)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _jobs(self, *bases):
+        return [ExtendJob(self.tmp / base, (self.cover, self.scan), self.tmp / "out" / base) for base in bases]
+
+    def test_load_json_and_csv_manifests(self):
+        json_manifest = self.tmp / "jobs.json"
+        json_manifest.write_text(json.dumps({"jobs": [
+            {"base": "a.pdf", "attachments": ["cover.pdf", "scan.png"], "output": "out/a.pdf"},
+            {"base": "b.pdf", "attachments": "cover.pdf", "output": "out/b.pdf"},
+        ]}))
+        csv_manifest = self.tmp / "jobs.csv"
+        csv_manifest.write_text("base,attachments,output\na.pdf,cover.pdf;scan.png,out/a.pdf\nb.pdf,cover.pdf,out/b.pdf\n")
+
+        for manifest in (json_manifest, csv_manifest):
+            jobs = load_manifest(manifest)
+            self.assertEqual(jobs[0], self._jobs("a.pdf")[0])
+            self.assertEqual(jobs[1].attachments, (self.cover,))
+
+        csv_manifest.write_text("base,attachments,output\na.pdf,cover.pdf,out/a.pdf\nb.pdf,,out/b.pdf\n")
+        with self.assertRaisesRegex(ValueError, "line 3"):
+            load_manifest(csv_manifest)
+
+    def test_jobs_sharing_a_file_are_rejected(self):
+        manifest = self.tmp / "jobs.csv"
+        for rows, error in (
+            ("a.pdf,cover.pdf,out/a.pdf\na.pdf,scan.png,out/a2.pdf\n", "line 3: base .*a.pdf is already used by jobs.csv line 2"),
+            ("a.pdf,cover.pdf,out/x.pdf\nb.pdf,cover.pdf,out/x.pdf\n", "line 3: output .*x.pdf is already used by jobs.csv line 2"),
+            ("a.pdf,cover.pdf,b.pdf\nb.pdf,cover.pdf,out/b.pdf\n", "line 3: base .*b.pdf is already used by jobs.csv line 2"),
+        ):
+            manifest.write_text("base,attachments,output\n" + rows)
+            with self.assertRaisesRegex(ValueError, error):
+                load_manifest(manifest)
+
+        # Extending a base into itself is allowed
+        manifest.write_text("base,attachments,output\na.pdf,cover.pdf,a.pdf\nb.pdf,cover.pdf,b.pdf\n")
+        self.assertEqual([job.output for job in load_manifest(manifest)], [self.tmp / "a.pdf", self.tmp / "b.pdf"])
+
+    def test_shared_attachments_are_parsed_once(self):
+        counting = mock.Mock(wraps=pdfappend.prepare_pdf_pages)
+        with mock.patch("src.core.pdfappend.prepare_pdf_pages", counting), \
+                mock.patch("src.core.extender.prepare_pdf_pages", counting):
+            results, shared = extend_batch(self._jobs("a.pdf", "b.pdf", "c.pdf"))
+
+        self.assertEqual([r.status for r in results], [OK, OK, OK])
+        self.assertEqual([r.pages for r in results], [2, 2, 2])
+        self.assertEqual(counting.call_count, 1)
+        self.assertEqual(set(shared), {str(self.cover), str(self.scan)})
+        for result, base_pages in zip(results, (1, 2, 3)):
+            self.assertEqual(len(PdfReader(result.job.output).pages), base_pages + 2)
+
+    def test_failed_job_does_not_stop_the_batch(self):
+        jobs = self._jobs("a.pdf", "missing.pdf", "c.pdf")
+        seen = []
+        results, _ = extend_batch(jobs, workers=2, on_result=seen.append)
+
+        self.assertEqual([r.status for r in results], [OK, FAILED, OK])
+        self.assertIn("missing.pdf", results[1].error)
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(len(PdfReader(jobs[2].output).pages), 5)
+        self.assertFalse(jobs[1].output.exists())
+
+    @unittest.skipUnless(os.path.exists("/proc/self/io"), "needs Linux I/O accounting")
+    def test_in_place_jobs_do_not_read_or_write_the_base(self):
+        def io_bytes():
+            with open("/proc/self/io") as fp:
+                counters = dict(line.split(": ") for line in fp.read().splitlines())
+            return int(counters["rchar"]), int(counters["wchar"])
+
+        big = self.tmp / "big.pdf"
+        Image.frombytes("RGB", (1500, 1000), os.urandom(4_500_000)).save(big, "PDF")
+        same = self.tmp / "same.pdf"
+        Image.frombytes("RGB", (1500, 1000), os.urandom(4_500_000)).save(same, "PDF")
+        originals = {path: (path.read_bytes(), os.stat(path).st_ino) for path in (big, same)}
+        jobs = [
+            ExtendJob(big, (self.scan,), self.tmp / "out" / "big.pdf"),
+            ExtendJob(same, (self.scan,), same), # Output is the base
+        ]
+
+        before = io_bytes()
+        with mock.patch("shutil.copyfile", side_effect=AssertionError("base copied")), \
+                mock.patch("src.core.extender._clone_file", side_effect=AssertionError("base cloned")):
+            results, _ = extend_batch(jobs, in_place=True)
+        read, written = (after - start for after, start in zip(io_bytes(), before))
+
+        self.assertEqual([r.status for r in results], [OK, OK])
+        base_size = min(len(data) for data, _ in originals.values())
+        self.assertLess(read, base_size // 10)
+        self.assertLess(written, base_size // 10)
+        self.assertFalse(big.exists())
+        for job, (data, inode) in zip(jobs, originals.values()):
+            self.assertEqual(os.stat(job.output).st_ino, inode)
+            with open(job.output, "rb") as fp:
+                self.assertEqual(fp.read(len(data)), data)
+            self.assertEqual(len(PdfReader(job.output).pages), 2)
+
+    def test_docx_workers_share_one_listener(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        starts = self.tmp / "starts.log"
+        server = self._script("unoserver", f"""
+            import socket, sys
+            open({str(starts)!r}, "a").write("start\\n")
+            listener = socket.create_server(("127.0.0.1", int(sys.argv[sys.argv.index("--port") + 1])))
+            while True:
+                listener.accept()[0].close()
+        """)
+        client = self._script("unoconvert", """
+            import sys
+            from pypdf import PdfWriter
+            writer = PdfWriter()
+            writer.add_blank_page(100, 100)
+            writer.write(sys.argv[-1])
+        """)
+        jobs = []
+        for name in ("one", "two"):
+            (self.tmp / f"{name}.docx").write_bytes(b"PK " + name.encode())
+            jobs.append(ExtendJob(self.tmp / f"{name}.docx", (self.scan,), self.tmp / "out" / f"{name}.pdf"))
+
+        backend = UnoserverBackend(port=port, server=str(server), client=str(client), start_timeout=20)
+        try:
+            results, _ = extend_batch(jobs, workers=2, docx_converter=DocxConverter(backend))
+        finally:
+            backend.close()
+
+        self.assertEqual([r.status for r in results], [OK, OK], [r.error for r in results])
+        self.assertEqual(starts.read_text().count("start"), 1)
+        for job in jobs:
+            self.assertEqual(len(PdfReader(job.output).pages), 2)
+
+    def _script(self, name, body):
+        path = self.tmp / name
+        path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        return path
+
+    def test_cli(self):
+        manifest = self.tmp / "jobs.csv"
+        manifest.write_text("base,attachments,output\na.pdf,cover.pdf;scan.png,out/a.pdf\nnope.pdf,cover.pdf,out/nope.pdf\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code = main(["extend-batch", str(manifest), "-j", "1"])
+        summary = json.loads(stdout.getvalue())
+
+        self.assertEqual(code, 1)
+        self.assertEqual((summary["jobs"], summary["succeeded"], summary["failed"]), (2, 1, 1))
+        self.assertEqual(summary["shared_attachments"], 1)
+        self.assertEqual([r["status"] for r in summary["results"]], [OK, FAILED])
+
+        manifest.write_text("base,output\na.pdf,out/a.pdf\n")
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(main(["extend-batch", str(manifest)]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
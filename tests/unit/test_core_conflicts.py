@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from src.core.conflicts import OutputPlanner
+from src.core.converter import ConversionOptions, process_images_to_pdf
+
+
+class TestOutputPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.out = self.tmp / "out"
+        self.out.mkdir()
+        (self.tmp / "other").mkdir()
+        self.paths = []
+        for name in ("a.png", "b.png", "a_1.png", "other/b.png"):
+            path = self.tmp / name
+            Image.new("RGB", (8, 8)).save(path)
+            self.paths.append(str(path))
+        (self.out / "a.pdf").write_bytes(b"old")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_finds_existing_and_duplicate_outputs(self):
+        planner = OutputPlanner(self.paths, self.out)
+        conflicts = [(Path(c.input_path).name, c.output_path.name, c.exists) for c in planner.conflicts]
+        self.assertEqual(conflicts, [("a.png", "a.pdf", True), ("b.png", "b.pdf", False)])
+        self.assertEqual(planner.conflicts[1].input_path, self.paths[3])
+
+    def test_renames_avoid_names_planned_for_other_inputs(self):
+        plan = OutputPlanner(self.paths, self.out).plan("rename")
+        self.assertEqual([plan.output_for(p).name for p in self.paths], ["a_2.pdf", "b.pdf", "a_1.pdf", "b_1.pdf"])
+
+    def test_per_input_decisions(self):
+        plan = OutputPlanner(self.paths, self.out).plan({self.paths[0]: "overwrite"})
+        self.assertEqual(plan.output_for(self.paths[0]), self.out / "a.pdf")
+        self.assertIsNone(plan.output_for(self.paths[3])) # Missing decisions default to skip
+
+    def test_renamed_outputs_are_reserved_until_written(self):
+        first = OutputPlanner(self.paths[:1], self.out).plan("rename")
+        second = OutputPlanner(self.paths[:1], self.out).plan("rename")
+        self.assertEqual(first.output_for(self.paths[0]).name, "a_1.pdf")
+        self.assertEqual(second.output_for(self.paths[0]).name, "a_2.pdf")
+        self.assertEqual((self.out / "a_2.pdf").read_bytes(), b"")
+
+        self.paths = self.paths[:1]
+        self.assertEqual(self._convert("separate", first), (1, 0))
+        Path(self.paths[0]).write_bytes(b"not an image")
+        self.assertEqual(self._convert("separate", second), (0, 1))
+        self.assertEqual(sorted(p.name for p in self.out.iterdir()), ["a.pdf", "a_1.pdf"])
+        self.assertGreater((self.out / "a_1.pdf").stat().st_size, 0)
+
+    def _convert(self, output_mode, plan, workers=1):
+        ask_overwrite = MagicMock()
+        get_new_name = MagicMock()
+        result = process_images_to_pdf(
+            png_paths=self.paths,
+            output_dir=self.out,
+            output_mode=output_mode,
+            ask_overwrite_callback=ask_overwrite,
+            get_new_name_callback=get_new_name,
+            update_status_callback=MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            options=ConversionOptions(workers=workers, output_plan=plan),
+        )
+        ask_overwrite.assert_not_called()
+        get_new_name.assert_not_called()
+        return result
+
+    def test_separate_conversion_follows_the_plan(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.out = self.tmp / f"out{workers}"
+                self.out.mkdir()
+                (self.out / "a.pdf").write_bytes(b"old")
+                plan = OutputPlanner(self.paths, self.out).plan({self.paths[0]: "skip", self.paths[3]: "rename"})
+                self.assertEqual(self._convert("separate", plan, workers), (3, 1))
+                self.assertEqual((self.out / "a.pdf").read_bytes(), b"old")
+                self.assertEqual(sorted(p.name for p in self.out.iterdir()), ["a.pdf", "a_1.pdf", "b.pdf", "b_1.pdf"])
+
+    def test_single_conversion_follows_the_plan(self):
+        (self.out / "combined_images.pdf").write_bytes(b"old")
+        plan = OutputPlanner(self.paths, self.out, "single").plan("rename")
+        self.assertEqual(self._convert("single", plan), (4, 0))
+        self.assertEqual((self.out / "combined_images.pdf").read_bytes(), b"old")
+        self.assertTrue((self.out / "combined_images_1.pdf").exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
-from src.core.converter import process_images_to_pdf
+from PIL import Image
+from pypdf import PdfReader
+from src.core import converter
+from src.core.converter import ConversionOptions, process_images_to_pdf
 
 class TestCoreConverter(unittest.TestCase):
 
@@ -49,7 +53,8 @@ class TestCoreConverter(unittest.TestCase):
             ask_overwrite_callback=self.mock_ask_overwrite,
             get_new_name_callback=self.mock_get_new_name,
             update_status_callback=self.mock_update_status,
-            update_overall_progress_callback=self.mock_update_overall_progress
+            update_overall_progress_callback=self.mock_update_overall_progress,
+            options=ConversionOptions(streaming=False),
         )
 
         self.assertEqual(converted, 2)
@@ -148,14 +153,161 @@ class TestCoreConverter(unittest.TestCase):
                 ask_overwrite_callback=self.mock_ask_overwrite,
                 get_new_name_callback=self.mock_get_new_name,
                 update_status_callback=self.mock_update_status,
-                update_overall_progress_callback=self.mock_update_overall_progress
+                update_overall_progress_callback=self.mock_update_overall_progress,
+                options=ConversionOptions(streaming=False),
             )
 
             self.assertEqual(converted, 1)
             self.assertEqual(skipped, 0)
             mock_image_new.assert_called_once_with('RGB', mock_img_rgba.size, (255, 255, 255))
-            mock_rgb_image.paste.assert_called_once_with(mock_img_rgba, mask=mock_img_rgba.split()[3])
+            mock_rgb_image.paste.assert_called_once_with(mock_img_rgba, mask=mock_img_rgba)
             mock_rgb_image.save.assert_called_once() # Assert on the converted RGB image's save method
 
+
+class TestStreamingSinglePdf(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.paths = []
+        # BMP, GIF and RGBA inputs always take the decode path, so both writers see the same pixels
+        for i, (mode, ext) in enumerate([("RGB", "bmp"), ("RGBA", "png"), ("L", "bmp"), ("P", "gif")]):
+            path = self.tmp / f"image{i}.{ext}"
+            Image.new(mode, (40 + i, 30), 128).save(path)
+            self.paths.append(str(path))
+        self.paths.insert(2, str(self.tmp / "missing.png"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self, filename, streaming, workers=1):
+        return process_images_to_pdf(
+            png_paths=self.paths,
+            output_dir=self.tmp,
+            output_mode="single",
+            ask_overwrite_callback=MagicMock(return_value="overwrite"),
+            get_new_name_callback=MagicMock(),
+            update_status_callback=MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            single_pdf_filename=filename,
+            options=ConversionOptions(streaming=streaming, workers=workers),
+        )
+
+    def test_streaming_matches_in_memory_output(self):
+        self.assertEqual(self._convert("legacy.pdf", False), (4, 1))
+        self.assertEqual(self._convert("streamed.pdf", True), (4, 1))
+
+        legacy = PdfReader(str(self.tmp / "legacy.pdf")).pages
+        streamed = PdfReader(str(self.tmp / "streamed.pdf")).pages
+        self.assertEqual(len(streamed), len(legacy))
+        for old, new in zip(legacy, streamed):
+            self.assertEqual(list(new.mediabox), list(old.mediabox))
+            old_image = old["/Resources"]["/XObject"]["/image"]
+            new_image = new["/Resources"]["/XObject"]["/image"]
+            self.assertEqual(new_image.get_data(), old_image.get_data())
+        self.assertFalse(list(self.tmp.glob(".*.partial")))
+
+    def test_pipelined_keeps_input_order(self):
+        self.paths = self.paths * 5
+        self.assertEqual(self._convert("serial.pdf", True), (20, 5))
+        self.assertEqual(self._convert("pipelined.pdf", True, workers=3), (20, 5))
+
+        serial = PdfReader(str(self.tmp / "serial.pdf")).pages
+        pipelined = PdfReader(str(self.tmp / "pipelined.pdf")).pages
+        self.assertEqual(
+            [p["/Resources"]["/XObject"]["/image"].get_data() for p in pipelined],
+            [p["/Resources"]["/XObject"]["/image"].get_data() for p in serial],
+        )
+
+    def test_streaming_skip_existing_output(self):
+        (self.tmp / "out.pdf").write_bytes(b"existing")
+        converted, skipped = process_images_to_pdf(
+            png_paths=self.paths[:1],
+            output_dir=self.tmp,
+            output_mode="single",
+            ask_overwrite_callback=MagicMock(return_value="skip"),
+            get_new_name_callback=MagicMock(),
+            update_status_callback=MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            single_pdf_filename="out.pdf",
+        )
+        self.assertEqual((converted, skipped), (0, 1))
+        self.assertEqual((self.tmp / "out.pdf").read_bytes(), b"existing")
+        self.assertFalse(list(self.tmp.glob(".*.partial")))
+
+    def test_streams_by_default_beside_other_runs(self):
+        # Another run writing the same output has its own partial file
+        other = self.tmp / ".out.pdf.partial"
+        other.write_bytes(b"other run")
+        with patch("src.core.converter._write_single_pdf_streaming", wraps=converter._write_single_pdf_streaming) as streamed:
+            converted, skipped = process_images_to_pdf(
+                png_paths=self.paths,
+                output_dir=self.tmp,
+                output_mode="single",
+                ask_overwrite_callback=MagicMock(),
+                get_new_name_callback=MagicMock(),
+                update_status_callback=MagicMock(),
+                update_overall_progress_callback=MagicMock(),
+                single_pdf_filename="out.pdf",
+            )
+        self.assertEqual((converted, skipped), (4, 1))
+        streamed.assert_called_once()
+        self.assertEqual(len(PdfReader(str(self.tmp / "out.pdf")).pages), 4)
+        self.assertEqual(other.read_bytes(), b"other run")
+        self.assertEqual(list(self.tmp.glob(".*.partial")), [other])
+
+class TestParallelSeparatePdfs(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        (self.tmp / "sub").mkdir()
+        self.paths = []
+        for i, mode in enumerate(["RGB", "RGBA", "L"]):
+            path = self.tmp / f"image{i}.png"
+            Image.new(mode, (32, 24), 64).save(path)
+            self.paths.append(str(path))
+        Image.new("RGB", (10, 10)).save(self.tmp / "sub" / "image0.png")
+        self.paths.append(str(self.tmp / "sub" / "image0.png"))
+        (self.tmp / "broken.png").write_bytes(b"not an image")
+        self.paths.append(str(self.tmp / "broken.png"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self, output_dir, workers):
+        output_dir.mkdir()
+        update_status = MagicMock()
+        ask_overwrite = MagicMock(return_value="overwrite")
+        result = process_images_to_pdf(
+            png_paths=self.paths,
+            output_dir=output_dir,
+            output_mode="separate",
+            ask_overwrite_callback=ask_overwrite,
+            get_new_name_callback=MagicMock(),
+            update_status_callback=update_status,
+            update_overall_progress_callback=MagicMock(),
+            options=ConversionOptions(workers=workers),
+        )
+        final_status = {c.args[0]: c.args[1] for c in update_status.call_args_list}
+        return result, final_status, ask_overwrite.call_count
+
+    def test_parallel_matches_serial(self):
+        serial = self._convert(self.tmp / "serial", 1)
+        parallel = self._convert(self.tmp / "parallel", 3)
+
+        self.assertEqual(serial, parallel)
+        self.assertEqual(parallel[0], (4, 1))
+        self.assertEqual(
+            sorted(p.name for p in (self.tmp / "parallel").iterdir()),
+            ["image0.pdf", "image1.pdf", "image2.pdf"],
+        )
+        # The later input with the same stem wins, as in the serial loop
+        self.assertEqual(len(PdfReader(str(self.tmp / "parallel" / "image0.pdf")).pages), 1)
+        self.assertEqual(
+            PdfReader(str(self.tmp / "parallel" / "image0.pdf")).pages[0].mediabox.width,
+            PdfReader(str(self.tmp / "serial" / "image0.pdf")).pages[0].mediabox.width,
+        )
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import socket
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.core.docx_pdf import DocxConverter, StubBackend, UnoserverBackend
+from src.core.extender import extend_document
+
+
+class TestDocxConversion(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.docx = self.tmp / "contract.docx"
+        self.docx.write_bytes(b"PK fake docx v1")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_same_content_is_converted_once(self):
+        backend = StubBackend()
+        converter = DocxConverter(backend, cache_dir=self.tmp / "cache")
+
+        first = converter.convert(self.docx, self.tmp / "work")
+        copy = self.tmp / "copy.docx"
+        copy.write_bytes(self.docx.read_bytes())
+        self.assertEqual(converter.convert(copy, self.tmp / "work"), first)
+        self.assertEqual(backend.converted, [self.docx])
+
+        self.docx.write_bytes(b"PK fake docx v2")
+        self.assertNotEqual(converter.convert(self.docx, self.tmp / "work"), first)
+        self.assertEqual(len(backend.converted), 2)
+        self.assertFalse((self.tmp / "work").exists())
+
+    def test_cache_directory_is_walked_only_to_evict(self):
+        def convert_all(converter, count):
+            for i in range(count):
+                self.docx.write_bytes(b"PK fake docx %d" % i)
+                converter.convert(self.docx, self.tmp / "work")
+
+        def cached(cache_dir):
+            return sorted(cache_dir.glob("*/*.pdf"))
+
+        with mock.patch.object(DocxConverter, "_evict", autospec=True, side_effect=DocxConverter._evict) as evict:
+            convert_all(DocxConverter(StubBackend(), cache_dir=self.tmp / "big"), 5)
+            self.assertEqual(evict.call_count, 1) # Counting the cache on the first insert
+            self.assertEqual(len(cached(self.tmp / "big")), 5)
+
+            size = cached(self.tmp / "big")[0].stat().st_size
+            evict.reset_mock()
+            convert_all(DocxConverter(StubBackend(), cache_dir=self.tmp / "small", max_bytes=size * 2), 5)
+            self.assertEqual(evict.call_count, 4)
+            self.assertEqual(len(cached(self.tmp / "small")), 2)
+
+    def test_without_cache_converts_into_the_work_dir(self):
+        converter = DocxConverter(StubBackend())
+        pdf = converter.convert(self.docx, self.tmp / "work")
+        self.assertEqual(pdf, self.tmp / "work" / "contract.pdf")
+        self.assertEqual(len(PdfReader(pdf).pages), 1)
+
+    def test_extend_docx_base(self):
+        image = self.tmp / "scan.png"
+        Image.new("RGB", (10, 10)).save(image)
+        backend = StubBackend()
+        converter = DocxConverter(backend, cache_dir=self.tmp / "cache")
+
+        for name in ("a.pdf", "b.pdf"):
+            out_path, _, pages = extend_document(
+                base_path=self.docx,
+                base_type="docx",
+                attachment_paths=[image],
+                output_dir=self.tmp / "out",
+                output_filename=name,
+                temp_dir=self.tmp / "work",
+                rename_base_to_original=False,
+                docx_converter=converter,
+            )
+            self.assertEqual(len(PdfReader(out_path).pages), 2)
+        self.assertEqual(len(backend.converted), 1)
+
+    def test_unoserver_is_started_once(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        starts = self.tmp / "starts.log"
+        server = self._script("unoserver", f"""
+            import socket, sys
+            open({str(starts)!r}, "a").write("start\\n")
+            listener = socket.create_server(("127.0.0.1", int(sys.argv[sys.argv.index("--port") + 1])))
+            while True:
+                listener.accept()[0].close()
+        """)
+        client = self._script("unoconvert", """
+            import sys
+            from pypdf import PdfWriter
+            writer = PdfWriter()
+            writer.add_blank_page(100, 100)
+            writer.write(sys.argv[-1])
+        """)
+        backend = UnoserverBackend(port=port, server=str(server), client=str(client), start_timeout=20)
+        try:
+            converter = DocxConverter(backend)
+            for i in range(2):
+                self.docx.write_bytes(b"PK %d" % i)
+                pdf = converter.convert(self.docx, self.tmp / f"work{i}")
+                self.assertEqual(len(PdfReader(pdf).pages), 1)
+        finally:
+            backend.close()
+        self.assertEqual(starts.read_text().count("start"), 1)
+
+    def _script(self, name, body):
+        path = self.tmp / name
+        path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        return path
+
+
+if __name__ == '__main__':
+    unittest.main()
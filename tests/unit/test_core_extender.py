@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+from src.core.extender import extend_document
+from src.core.pdfappend import previous_revision_size
+
+
+class TestExtendImagePages(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.base = self.tmp / "base.pdf"
+        writer = PdfWriter()
+        writer.add_blank_page(200, 300)
+        writer.write(self.base)
+        self.jpg = self.tmp / "scan.jpg"
+        Image.new("RGB", (600, 300), (200, 30, 30)).save(self.jpg, quality=90)
+        self.png = self.tmp / "chart.png"
+        Image.new("RGB", (150, 450), (0, 90, 200)).save(self.png)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_image_pages_are_added_without_a_temp_pdf(self):
+        with patch("tempfile.mkstemp", side_effect=AssertionError("temp file")), \
+                patch("tempfile.NamedTemporaryFile", side_effect=AssertionError("temp file")):
+            out_path, renamed, pages = extend_document(
+                base_path=self.base,
+                base_type="pdf",
+                attachment_paths=[self.jpg, self.png],
+                output_dir=self.tmp / "out",
+                output_filename="extended.pdf",
+                temp_dir=self.tmp / "work",
+                rename_base_to_original=False,
+            )
+
+        self.assertEqual((renamed, pages), (None, 2))
+        self.assertFalse((self.tmp / "work").exists())
+        self.assertEqual([p.name for p in (self.tmp / "out").iterdir()], ["extended.pdf"])
+
+        reader = PdfReader(out_path)
+        self.assertEqual(len(reader.pages), 3)
+        jpeg_page, png_page = reader.pages[1], reader.pages[2]
+
+        jpeg_image = jpeg_page["/Resources"]["/XObject"]["/image"]
+        self.assertEqual(jpeg_image["/Filter"], "/DCTDecode")
+        self.assertEqual(jpeg_image._data, self.jpg.read_bytes()) # Passed through untouched
+        png_image = png_page["/Resources"]["/XObject"]["/image"]
+        self.assertEqual(png_image["/Filter"], "/FlateDecode")
+        self.assertEqual((png_image["/Width"], png_image["/Height"]), (150, 450))
+
+        # Attachments are laid out at 300 dpi
+        self.assertEqual([float(v) for v in jpeg_page.mediabox], [0, 0, 144, 72])
+        self.assertEqual([float(v) for v in png_page.mediabox], [0, 0, 36, 108])
+
+
+class TestExtendInPlace(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.base = self.tmp / "base.pdf"
+        writer = PdfWriter()
+        writer.add_blank_page(200, 300)
+        writer.write(self.base)
+        self.original = self.base.read_bytes()
+        self.scan = self.tmp / "scan.png"
+        Image.new("RGB", (30, 10), "red").save(self.scan)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _extend(self, attachments):
+        return extend_document(
+            base_path=self.base,
+            base_type="pdf",
+            attachment_paths=attachments,
+            output_dir=self.tmp / "out",
+            output_filename="extended.pdf",
+            temp_dir=self.tmp / "work",
+            rename_base_to_original=False,
+            incremental=True,
+            append_in_place=True,
+        )
+
+    def test_base_file_becomes_the_output(self):
+        inode = os.stat(self.base).st_ino
+        with patch("shutil.copyfile", side_effect=AssertionError("base copied")), \
+                patch("src.core.extender._clone_file", side_effect=AssertionError("base cloned")):
+            out_path, renamed, pages = self._extend([self.scan])
+
+        self.assertEqual((renamed, pages), (None, 1))
+        self.assertFalse(self.base.exists())
+        self.assertEqual(os.stat(out_path).st_ino, inode)
+        self.assertEqual(len(PdfReader(out_path).pages), 2)
+
+        # The original is the output's first revision
+        size = previous_revision_size(out_path)
+        self.assertEqual(size, len(self.original))
+        self.assertEqual(out_path.read_bytes()[:size], self.original)
+
+    def test_failed_append_puts_the_base_back(self):
+        with self.assertRaises(FileNotFoundError):
+            self._extend([self.scan, self.tmp / "missing.png"])
+        self.assertEqual(self.base.read_bytes(), self.original)
+        self.assertFalse((self.tmp / "out" / "extended.pdf").exists())
+
+    def test_base_cannot_be_given_up_and_kept(self):
+        with self.assertRaisesRegex(ValueError, "_original"):
+            extend_document(self.base, "pdf", [self.scan], self.tmp / "out", "extended.pdf", self.tmp / "work",
+                            incremental=True, append_in_place=True)
+        self.assertEqual(self.base.read_bytes(), self.original)
+
+
+if __name__ == '__main__':
+    unittest.main()
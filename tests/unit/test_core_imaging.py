@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from src.core.imaging import PAGE_SIZES, PageOptions, flatten_to_rgb, has_alpha, load_page, page_geometry
+
+
+class TestFlattenToRgb(unittest.TestCase):
+
+    def setUp(self):
+        gradient = Image.linear_gradient("L").resize((32, 32))
+        self.alpha = gradient.rotate(45)
+        self.rgba = Image.merge("RGBA", [gradient, gradient.rotate(90), gradient.rotate(180), self.alpha])
+
+    def _reference(self, image, background=(255, 255, 255)):
+        rgba = image.convert("RGBA")
+        expected = Image.new("RGB", image.size, background)
+        expected.paste(rgba, mask=rgba.getchannel("A"))
+        return expected
+
+    def test_rgba_matches_split_and_paste(self):
+        self.assertEqual(flatten_to_rgb(self.rgba).tobytes(), self._reference(self.rgba).tobytes())
+
+    def test_la_is_composited_not_dropped(self):
+        la = Image.merge("LA", [self.rgba.getchannel("R"), self.alpha])
+        self.assertEqual(flatten_to_rgb(la).tobytes(), self._reference(la).tobytes())
+
+    def test_palette_transparency_uses_background(self):
+        image = Image.new("P", (4, 4), 0)
+        image.putpalette([10, 20, 30] * 256)
+        image.info["transparency"] = 0
+        self.assertTrue(has_alpha(image))
+        self.assertEqual(flatten_to_rgb(image, (1, 2, 3)).getpixel((0, 0)), (1, 2, 3))
+
+    def test_opaque_images_are_converted_without_compositing(self):
+        rgb = Image.new("RGB", (4, 4), (9, 9, 9))
+        self.assertIs(flatten_to_rgb(rgb), rgb)
+        self.assertEqual(flatten_to_rgb(Image.new("L", (4, 4), 7)).getpixel((0, 0)), (7, 7, 7))
+
+
+class TestPageGeometry(unittest.TestCase):
+
+    def test_no_options_keeps_native_size(self):
+        self.assertEqual(page_geometry(1000, 500, PageOptions()), ((720.0, 360.0), None))
+
+    def test_target_dpi_reduces_only_oversampled_images(self):
+        options = PageOptions(resolution=300.0, target_dpi=150.0)
+        self.assertEqual(page_geometry(3000, 1500, options), ((720.0, 360.0), (1500, 750)))
+        self.assertEqual(page_geometry(3000, 1500, PageOptions(resolution=100.0, target_dpi=150.0))[1], None)
+
+    def test_page_size_fits_image_and_sets_decode_size(self):
+        options = PageOptions(resolution=100.0, target_dpi=200.0, page_size=PAGE_SIZES["a4"])
+        (width_pt, height_pt), decode_size = page_geometry(4000, 3000, options)
+        self.assertAlmostEqual(width_pt, 595.28)
+        self.assertLessEqual(height_pt, 841.89)
+        self.assertEqual(decode_size, (round(595.28 / 72 * 200), round(height_pt / 72 * 200)))
+
+
+class TestLoadPage(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_large_jpeg_is_decoded_at_page_resolution(self):
+        path = self.tmp / "photo.jpg"
+        Image.linear_gradient("L").resize((4000, 3000)).convert("RGB").save(path)
+
+        page = load_page(path, PageOptions(target_dpi=150.0, page_size=PAGE_SIZES["a4"]))
+
+        self.assertFalse(page.passthrough)
+        self.assertEqual(page.width, round(595.28 / 72 * 150))
+        self.assertAlmostEqual(page.size_pt[0], 595.28)
+
+    def test_small_jpeg_still_passes_through(self):
+        path = self.tmp / "small.jpg"
+        Image.new("RGB", (300, 200)).save(path)
+
+        page = load_page(path, PageOptions(target_dpi=150.0, page_size=PAGE_SIZES["a4"]))
+
+        self.assertTrue(page.passthrough)
+        self.assertEqual(page.size_pt, (216.0, 144.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.core import imaging, incremental
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.incremental import manifest_path
+from src.core.stats import ConversionStats
+
+
+class TestIncrementalRebuild(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.paths = []
+        for i in range(4):
+            path = self.tmp / f"page{i}.bmp"
+            Image.new("RGB", (20 + i, 30), (i * 50, 0, 0)).save(path)
+            self.paths.append(str(path))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self, filename="combined.pdf", incremental=True):
+        stats = ConversionStats()
+        ask_overwrite = MagicMock(return_value="overwrite")
+        with patch("src.core.converter.load_page", side_effect=imaging.load_page) as load_page:
+            result = process_images_to_pdf(
+                png_paths=self.paths,
+                output_dir=self.tmp,
+                output_mode="single",
+                ask_overwrite_callback=ask_overwrite,
+                get_new_name_callback=MagicMock(),
+                update_status_callback=MagicMock(),
+                update_overall_progress_callback=MagicMock(),
+                single_pdf_filename=filename,
+                options=ConversionOptions(stats=stats, incremental=incremental),
+            )
+        self.assertEqual(result, (len(self.paths), 0))
+        return stats, load_page.call_count, ask_overwrite.call_count
+
+    def _streams(self, filename):
+        reader = PdfReader(str(self.tmp / filename))
+        return [page["/Resources"]["/XObject"]["/image"].get_data() for page in reader.pages]
+
+    def test_only_changed_inputs_are_encoded(self):
+        stats, decoded, _ = self._convert()
+        self.assertEqual((stats.encoded_pages, stats.reused_pages, decoded), (4, 0, 4))
+        self.assertTrue(manifest_path(self.tmp / "combined.pdf").exists())
+
+        Image.new("RGB", (25, 30), (0, 200, 0)).save(self.paths[2])
+        self.paths.append(self.paths.pop(0))
+        stats, decoded, asked = self._convert()
+
+        self.assertEqual((stats.encoded_pages, stats.reused_pages, decoded, asked), (1, 3, 1, 0))
+        self._convert("fresh.pdf", incremental=False)
+        self.assertEqual(self._streams("combined.pdf"), self._streams("fresh.pdf"))
+
+    def test_touched_but_unchanged_input_is_reused(self):
+        self._convert()
+        os.utime(self.paths[0], ns=(0, 10**18))
+        stats, decoded, _ = self._convert()
+        self.assertEqual((stats.reused_pages, decoded), (4, 0))
+
+    def test_inputs_are_hashed_only_when_their_stat_changes(self):
+        self._convert()
+        # Same size, new content and mtime: hashed once to compare, and that
+        # digest is what the new manifest records
+        Image.new("RGB", (22, 30), (0, 0, 200)).save(self.paths[2])
+        os.utime(self.paths[2], ns=(0, 10**18))
+        with patch("src.core.incremental.file_digest", side_effect=incremental.file_digest) as digest:
+            stats, decoded, _ = self._convert()
+            self.assertEqual((stats.reused_pages, decoded, digest.call_count), (3, 1, 1))
+            stats, decoded, _ = self._convert()
+            self.assertEqual((stats.reused_pages, decoded, digest.call_count), (4, 0, 1))
+
+    def test_modified_output_forces_full_rebuild(self):
+        self._convert()
+        with open(self.tmp / "combined.pdf", "ab") as fp:
+            fp.write(b"\n% edited\n")
+        stats, decoded, asked = self._convert()
+        self.assertEqual((stats.reused_pages, decoded, asked), (0, 4, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
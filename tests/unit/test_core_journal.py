@@ -0,0 +1,123 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.journal import JobControl, JobJournal
+from src.core.stats import ConversionStats
+
+
+class TestJobJournal(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.out = self.tmp / "out"
+        self.out.mkdir()
+        self.journal_path = self.out / "job.journal"
+        self.paths = []
+        for i in range(5):
+            path = self.tmp / f"scan{i}.bmp"
+            Image.new("RGB", (8, 8), (i * 40, 0, 0)).save(path)
+            self.paths.append(str(path))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self, paths, workers=1, control=None, status=None, output_mode="separate"):
+        stats = ConversionStats()
+        ask_overwrite = MagicMock(return_value="rename")
+        result = process_images_to_pdf(
+            png_paths=paths,
+            output_dir=self.out,
+            output_mode=output_mode,
+            ask_overwrite_callback=ask_overwrite,
+            get_new_name_callback=MagicMock(side_effect=lambda p: p.with_name(f"{p.stem}_1.pdf")),
+            update_status_callback=status or MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            options=ConversionOptions(
+                workers=workers,
+                stats=stats,
+                journal=JobJournal(self.journal_path),
+                control=control,
+            ),
+        )
+        return result, stats, ask_overwrite.call_count
+
+    def test_rerun_skips_finished_inputs(self):
+        self._convert(self.paths[:3])
+        Image.new("RGB", (9, 9)).save(self.paths[2])
+
+        (converted, skipped), stats, asked = self._convert(self.paths)
+
+        self.assertEqual((converted, skipped), (5, 0))
+        self.assertEqual((stats.resumed_inputs, stats.encoded_pages), (2, 3))
+        self.assertEqual(asked, 1) # Only the changed input finds its old output in the way
+        self.assertEqual(len(list(self.out.glob("*_1.pdf"))), 1)
+
+    def test_torn_line_and_changed_settings(self):
+        self._convert(self.paths[:2])
+        with open(self.journal_path, "a", encoding="utf-8") as fp:
+            fp.write('{"input": "/trunc')
+
+        journal = JobJournal(self.journal_path)
+        job = json.loads(self.journal_path.read_text(encoding="utf-8").splitlines()[0])
+        job.pop("version")
+        self.assertEqual(journal.begin(job), 2)
+        journal.close()
+
+        self.assertEqual(journal.begin(dict(job, options="other")), 0)
+        journal.close()
+        self.assertEqual(len(self.journal_path.read_text(encoding="utf-8").splitlines()), 1)
+
+    def _cancel_after_first(self, workers):
+        control = JobControl()
+
+        def status(_path, text, _color):
+            if text == "✔":
+                control.cancel()
+
+        (converted, skipped), _, _ = self._convert(self.paths, workers=workers, control=control, status=status)
+        self.assertGreaterEqual(converted, 1)
+        self.assertLess(converted, 5)
+        self.assertEqual(converted + skipped, 5)
+
+        (converted, skipped), stats, asked = self._convert(self.paths, workers=workers)
+        self.assertEqual((converted, skipped, asked), (5, 0, 0))
+        self.assertGreaterEqual(stats.resumed_inputs, 1)
+
+    def test_cancel_then_resume_serial(self):
+        self._cancel_after_first(workers=1)
+
+    def test_cancel_then_resume_parallel(self):
+        self._cancel_after_first(workers=2)
+
+    def test_pause_blocks_until_resumed(self):
+        control = JobControl()
+        control.pause()
+        results = []
+        worker = threading.Thread(target=lambda: results.append(self._convert(self.paths, control=control)))
+        worker.start()
+        worker.join(0.3)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(list(self.out.glob("*.pdf")), [])
+
+        control.resume()
+        worker.join(5)
+        self.assertEqual(results[0][0], (5, 0))
+
+    def test_cancelled_single_pdf_is_not_written(self):
+        control = JobControl()
+        control.cancel()
+        result, _, _ = self._convert(self.paths, control=control, output_mode="single")
+        self.assertEqual(result, (0, 5))
+        self.assertEqual(list(self.out.glob("*.pdf*")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.extender import extend_document
+from src.core.naming import OutputNameAllocator, unique_path
+
+
+class TestOutputNameAllocator(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_free_name_is_returned_as_is(self):
+        self.assertEqual(unique_path(self.tmp / "a.pdf"), self.tmp / "a.pdf")
+        self.assertFalse((self.tmp / "a.pdf").exists()) # Only a substitute name is reserved
+        (self.tmp / "a.pdf").touch()
+        self.assertEqual(unique_path(self.tmp / "a.pdf"), self.tmp / "a_1.pdf")
+        self.assertTrue((self.tmp / "a_1.pdf").exists())
+
+    def test_failed_write_leaves_no_placeholder(self):
+        Image.new("RGB", (10, 10)).save(self.tmp / "scan.png")
+        (self.tmp / "out.pdf").write_bytes(b"existing")
+        for streaming in (True, False):
+            with patch("src.core.converter.shutil.move", side_effect=OSError("disk full")), \
+                    patch("PIL.Image.Image.save", side_effect=OSError("disk full")):
+                converted, skipped = process_images_to_pdf(
+                    png_paths=[str(self.tmp / "scan.png")],
+                    output_dir=self.tmp,
+                    output_mode="single",
+                    ask_overwrite_callback=MagicMock(),
+                    get_new_name_callback=MagicMock(),
+                    update_status_callback=MagicMock(),
+                    update_overall_progress_callback=MagicMock(),
+                    single_pdf_filename="out.pdf",
+                    auto_rename_if_exists=True,
+                    options=ConversionOptions(streaming=streaming),
+                )
+            self.assertEqual(converted, 0)
+            self.assertEqual(sorted(p.name for p in self.tmp.iterdir()), ["out.pdf", "scan.png"])
+
+        base = self.tmp / "base.pdf"
+        base.write_bytes(b"%PDF-1.4")
+        (self.tmp / "base_original.pdf").write_bytes(b"older original")
+        with patch("src.core.extender.os.replace", side_effect=OSError("busy")):
+            with self.assertRaises(OSError):
+                extend_document(
+                    base_path=base,
+                    base_type="pdf",
+                    attachment_paths=[self.tmp / "scan.png"],
+                    output_dir=self.tmp,
+                    output_filename="extended.pdf",
+                    temp_dir=self.tmp / "work",
+                )
+        self.assertFalse((self.tmp / "base_original_1.pdf").exists())
+
+    def test_same_stem_gets_increasing_suffixes(self):
+        (self.tmp / "a.pdf").touch()
+        (self.tmp / "a_2.pdf").touch()
+        allocator = OutputNameAllocator(self.tmp)
+
+        names = [allocator.allocate(self.tmp / "a.pdf").name for _ in range(4)]
+
+        self.assertEqual(names, ["a_1.pdf", "a_3.pdf", "a_4.pdf", "a_5.pdf"])
+
+    def test_names_created_after_indexing_are_skipped(self):
+        allocator = OutputNameAllocator(self.tmp)
+        allocator.allocate(self.tmp / "b.pdf")
+        (self.tmp / "a.pdf").touch()
+        (self.tmp / "a_1.pdf").touch()
+
+        self.assertEqual(allocator.allocate(self.tmp / "a.pdf").name, "a_2.pdf")
+        (self.tmp / "c.pdf").touch()
+        self.assertEqual(allocator.allocate(self.tmp / "c.pdf", reserve=False).name, "c_1.pdf")
+        self.assertFalse((self.tmp / "c_1.pdf").exists())
+
+    def test_claimed_names_are_never_handed_out(self):
+        allocator = OutputNameAllocator(self.tmp)
+        # scan.pdf is not on disk, but a pending write already claims it
+        first = allocator.allocate(self.tmp / "scan.pdf", reserve=False, taken=[self.tmp / "scan.pdf"])
+        second = allocator.allocate(self.tmp / "scan.pdf", reserve=False, taken=[self.tmp / "scan.pdf"])
+        self.assertEqual((first.name, second.name), ("scan_1.pdf", "scan_2.pdf"))
+
+        # A name handed out without a reservation is not handed out again
+        self.assertEqual(allocator.allocate(self.tmp / "other.pdf", reserve=False).name, "other.pdf")
+        self.assertEqual(allocator.allocate(self.tmp / "other.pdf", reserve=False).name, "other_1.pdf")
+        self.assertEqual(list(self.tmp.iterdir()), [])
+
+    def test_concurrent_allocators_never_share_a_name(self):
+        allocators = [OutputNameAllocator(self.tmp) for _ in range(4)]
+        results = []
+
+        def allocate(allocator):
+            for _ in range(50):
+                results.append(allocator.allocate(self.tmp / "scan.pdf"))
+
+        threads = [threading.Thread(target=allocate, args=(a,)) for a in allocators for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 400)
+        self.assertEqual(len(set(results)), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.imaging import PageOptions
+from src.core.page_cache import PageCache
+from src.core.pdfwriter import PageImage, PdfName
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.cache_dir = self.tmp / "cache"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _inputs(self, count):
+        paths = []
+        for i in range(count):
+            path = self.tmp / f"image{i}.png"
+            Image.new("RGBA", (30 + i, 20), (i * 20, 0, 0, 128)).save(path)
+            paths.append(str(path))
+        return paths
+
+    def _convert(self, paths, cache, output_mode="single", workers=1):
+        return process_images_to_pdf(
+            png_paths=paths,
+            output_dir=self.tmp,
+            output_mode=output_mode,
+            ask_overwrite_callback=MagicMock(return_value="overwrite"),
+            get_new_name_callback=MagicMock(),
+            update_status_callback=MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            options=ConversionOptions(workers=workers, page_cache=cache),
+        )
+
+    def test_entries_round_trip(self):
+        cache = PageCache(self.cache_dir)
+        page = PageImage(
+            width=3,
+            height=2,
+            data=b"\x00\x01",
+            filter="FlateDecode",
+            color_space=[PdfName("Indexed"), PdfName("DeviceRGB"), 1, b"\x00\x00\x00\xff\xff\xff"],
+            decode_parms={"Predictor": 15, "Columns": 3},
+            size_pt=(2.16, 1.44),
+        )
+        cache.put("ab" * 32, page)
+        self.assertEqual(PageCache(self.cache_dir).get("ab" * 32), page)
+
+    def test_second_run_reuses_encoded_pages(self):
+        paths = self._inputs(3)
+        cache = PageCache(self.cache_dir)
+
+        self.assertEqual(self._convert(paths, cache), (3, 0))
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        (self.tmp / "combined_images.pdf").rename(self.tmp / "first.pdf")
+
+        cache = PageCache(self.cache_dir)
+        self.assertEqual(self._convert(paths, cache), (3, 0))
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+        def streams(path):
+            return [p["/Resources"]["/XObject"]["/image"].get_data() for p in PdfReader(str(path)).pages]
+
+        self.assertEqual(streams(self.tmp / "combined_images.pdf"), streams(self.tmp / "first.pdf"))
+
+    def test_changed_file_or_options_miss(self):
+        path = self._inputs(1)[0]
+        cache = PageCache(self.cache_dir)
+        cache.load_page(path, PageOptions())
+        cache.load_page(path, PageOptions(background=(0, 0, 0)))
+        Image.new("RGBA", (5, 5)).save(path)
+        cache.load_page(path, PageOptions())
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        paths = self._inputs(3)
+        cache = PageCache(self.cache_dir)
+        for path in paths:
+            cache.load_page(path, PageOptions())
+        entry_size = cache.stats()["bytes"] // 3
+
+        # Touch the first entry so the second becomes the oldest
+        old = time.time() - 100
+        for i, entry in enumerate(sorted(self.cache_dir.rglob("*.page"), key=os.path.getmtime)):
+            os.utime(entry, (old + i, old + i))
+        cache = PageCache(self.cache_dir, max_bytes=entry_size * 3)
+        cache.load_page(paths[0], PageOptions())
+        cache.max_bytes = entry_size * 2 + entry_size // 2
+        cache.trim()
+
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.load_page(paths[0], PageOptions())
+        self.assertEqual(cache.hits, 2)
+
+    def test_worker_process_counts_are_merged(self):
+        paths = self._inputs(3)
+        cache = PageCache(self.cache_dir)
+        self.assertEqual(self._convert(paths, cache, "separate", workers=2), (3, 0))
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(self._convert(paths, cache, "separate", workers=2), (3, 0))
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
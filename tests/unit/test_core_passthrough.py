@@ -0,0 +1,148 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+from pypdf import PdfReader
+
+from src.core.converter import ConversionOptions, process_images_to_pdf
+from src.core.extender import extend_document
+from src.core.passthrough import jpeg_page, png_page
+from src.core.stats import ConversionStats
+
+
+class TestJpegPassthrough(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _jpeg(self, name, mode="RGB", **params):
+        path = self.tmp / name
+        Image.new(mode, (64, 48), 90).save(path, "JPEG", **params)
+        return path
+
+    def test_baseline_and_progressive_are_eligible(self):
+        for name, params in (("baseline.jpg", {}), ("progressive.jpg", {"progressive": True})):
+            path = self._jpeg(name, **params)
+            page = jpeg_page(path)
+            self.assertIsNotNone(page)
+            self.assertEqual((page.width, page.height), (64, 48))
+            self.assertEqual(page.data, path.read_bytes())
+            self.assertEqual(page.color_space, "DeviceRGB")
+
+    def test_grayscale_and_cmyk_color_spaces(self):
+        self.assertEqual(jpeg_page(self._jpeg("gray.jpg", "L")).color_space, "DeviceGray")
+        cmyk = jpeg_page(self._jpeg("cmyk.jpg", "CMYK"))
+        self.assertEqual(cmyk.color_space, "DeviceCMYK")
+        self.assertEqual(cmyk.decode, [1, 0, 1, 0, 1, 0, 1, 0])
+
+    def test_non_jpeg_is_not_eligible(self):
+        png = self.tmp / "image.png"
+        Image.new("RGB", (8, 8)).save(png)
+        self.assertIsNone(jpeg_page(png))
+        self.assertIsNone(jpeg_page(self.tmp / "missing.jpg"))
+
+    def test_converter_embeds_jpeg_bytes(self):
+        jpg = self._jpeg("photo.jpg", quality=60)
+        bmp = self.tmp / "scan.bmp"
+        Image.new("RGB", (16, 16)).save(bmp)
+        stats = ConversionStats()
+
+        converted, skipped = process_images_to_pdf(
+            png_paths=[str(jpg), str(bmp)],
+            output_dir=self.tmp,
+            output_mode="single",
+            ask_overwrite_callback=MagicMock(),
+            get_new_name_callback=MagicMock(),
+            update_status_callback=MagicMock(),
+            update_overall_progress_callback=MagicMock(),
+            options=ConversionOptions(stats=stats),
+        )
+
+        self.assertEqual((converted, skipped), (2, 0))
+        self.assertEqual((stats.passthrough_pages, stats.encoded_pages), (1, 1))
+        page = PdfReader(str(self.tmp / "combined_images.pdf")).pages[0]
+        self.assertEqual(page["/Resources"]["/XObject"]["/image"]._data, jpg.read_bytes())
+
+    def test_extender_embeds_jpeg_bytes(self):
+        base = self.tmp / "base.pdf"
+        Image.new("RGB", (20, 20), "white").save(base, "PDF")
+        jpg = self._jpeg("exhibit.jpg")
+        stats = ConversionStats()
+
+        out_path, _, pages = extend_document(
+            base_path=base,
+            base_type="pdf",
+            attachment_paths=[jpg],
+            output_dir=self.tmp / "out",
+            output_filename="extended.pdf",
+            temp_dir=self.tmp / "work",
+            rename_base_to_original=False,
+            stats=stats,
+        )
+
+        self.assertEqual(pages, 1)
+        self.assertEqual(stats.passthrough_pages, 1)
+        page = PdfReader(str(out_path)).pages[1]
+        self.assertEqual(page["/Resources"]["/XObject"]["/image"]._data, jpg.read_bytes())
+
+
+class TestPngPassthrough(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _png(self, image, name="image.png", **params):
+        path = self.tmp / name
+        image.save(path, **params)
+        return path
+
+    def _gradient(self, mode):
+        return Image.linear_gradient("L").resize((37, 23)).convert(mode)
+
+    def test_eligible_pngs_round_trip_losslessly(self):
+        for mode in ("RGB", "L", "P"):
+            source = self._gradient(mode)
+            path = self._png(source, f"{mode}.png")
+            stats = ConversionStats()
+
+            converted, skipped = process_images_to_pdf(
+                png_paths=[str(path)],
+                output_dir=self.tmp,
+                output_mode="single",
+                ask_overwrite_callback=MagicMock(return_value="overwrite"),
+                get_new_name_callback=MagicMock(),
+                update_status_callback=MagicMock(),
+                update_overall_progress_callback=MagicMock(),
+                single_pdf_filename=f"{mode}.pdf",
+                options=ConversionOptions(stats=stats),
+            )
+
+            self.assertEqual((converted, skipped, stats.passthrough_pages), (1, 0, 1))
+            embedded = PdfReader(str(self.tmp / f"{mode}.pdf")).pages[0].images[0].image
+            self.assertEqual(embedded.size, source.size)
+            self.assertEqual(embedded.convert("RGB").tobytes(), source.convert("RGB").tobytes())
+
+    def test_ineligible_pngs_fall_back(self):
+        self.assertIsNone(png_page(self._png(Image.new("RGBA", (8, 8)), "rgba.png")))
+        self.assertIsNone(png_page(self._png(Image.new("LA", (8, 8)), "la.png")))
+        self.assertIsNone(png_page(self._png(Image.new("I;16", (8, 8)), "deep.png")))
+        self.assertIsNone(png_page(self._png(Image.new("P", (8, 8)), "trns.png", transparency=0)))
+
+        interlaced = bytearray(self._png(Image.new("RGB", (8, 8)), "interlaced.png").read_bytes())
+        interlaced[28] = 1  # IHDR interlace method
+        (self.tmp / "interlaced.png").write_bytes(bytes(interlaced))
+        self.assertIsNone(png_page(self.tmp / "interlaced.png"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject
+
+from src.core.extender import extend_document
+from src.core.pdfappend import IncrementalPdfAppender, prepare_pdf_pages, previous_revision_size
+from src.core.imaging import PageOptions, load_page
+
+
+class TestIncrementalAppend(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.base = self.tmp / "base.pdf"
+        writer = PdfWriter()
+        writer.add_blank_page(200, 300)
+        writer.add_blank_page(200, 300)
+        writer.write(self.base)
+        self.jpg = self.tmp / "scan.jpg"
+        Image.new("RGB", (120, 80), (200, 30, 30)).save(self.jpg, quality=90)
+        self.attachment = self.tmp / "addendum.pdf"
+        Image.new("RGB", (20, 20), "white").save(self.attachment, "PDF")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _extend(self, **kwargs):
+        return extend_document(
+            base_path=self.base,
+            base_type="pdf",
+            attachment_paths=[self.jpg, self.attachment],
+            output_dir=self.tmp / "out",
+            output_filename="extended.pdf",
+            temp_dir=self.tmp / "work",
+            rename_base_to_original=False,
+            incremental=True,
+            **kwargs,
+        )
+
+    def test_base_bytes_are_kept_and_pages_appended(self):
+        original = self.base.read_bytes()
+        out_path, _, pages = self._extend()
+
+        self.assertEqual(pages, 2)
+        self.assertTrue(out_path.read_bytes().startswith(original))
+        reader = PdfReader(out_path)
+        self.assertEqual(len(reader.pages), 4)
+        self.assertEqual(reader.pages[2]["/Resources"]["/XObject"]["/image"]._data, self.jpg.read_bytes())
+        self.assertEqual(reader.pages[3].mediabox.width, 20)
+        self.assertEqual(len(PdfReader(self.base).pages), 2)
+
+    def test_appends_in_place_to_a_base_using_xref_streams(self):
+        # pypdf writes its own incremental updates with a cross-reference stream
+        writer = PdfWriter(self.base, incremental=True)
+        writer.add_blank_page(100, 100)
+        writer.write(self.base)
+        original = self.base.read_bytes()
+
+        with IncrementalPdfAppender(self.base) as appender:
+            appender.add_image_page(load_page(self.jpg, PageOptions(resolution=72.0)), resolution=72.0)
+            appender.add_pdf_pages(self.attachment)
+
+        data = self.base.read_bytes()
+        self.assertTrue(data.startswith(original))
+        self.assertIn(b"/XRef", data[len(original):])
+        self.assertEqual(previous_revision_size(self.base), len(original))
+        reader = PdfReader(self.base)
+        self.assertEqual([float(p.mediabox.width) for p in reader.pages], [200, 200, 100, 120, 20])
+
+    def test_streams_are_rebuilt_without_stored_bytes(self):
+        # What a pypdf without StreamObject._data would give: only decoded data
+        writer = PdfWriter()
+        page = writer.add_blank_page(50, 50)
+        contents = DecodedStreamObject()
+        contents.set_data(b"0 0 m 50 50 l S")
+        page.replace_contents(contents)
+        page.compress_content_streams()
+        flate = self.tmp / "flate.pdf"
+        writer.write(flate)
+        expected = PdfReader(flate).pages[0].get_contents().get_data()
+
+        with mock.patch("src.core.pdfappend._stored_bytes", return_value=None):
+            with IncrementalPdfAppender(self.base) as appender:
+                appender.add_pdf_pages(flate)
+            with self.assertRaisesRegex(ValueError, "DCTDecode"):
+                prepare_pdf_pages(self.attachment) # Pillow embeds a JPEG
+
+        page = PdfReader(self.base).pages[2]
+        self.assertEqual(page.get_contents().get_data(), expected)
+
+    def test_failed_append_leaves_the_file_as_it_was(self):
+        original = self.base.read_bytes()
+        with self.assertRaises(OSError):
+            with IncrementalPdfAppender(self.base) as appender:
+                appender.add_image_page(load_page(self.jpg, PageOptions()))
+                appender.add_pdf_pages(self.tmp / "missing.pdf")
+        self.assertEqual(self.base.read_bytes(), original)
+
+        with self.assertRaises(OSError):
+            extend_document(
+                base_path=self.base,
+                base_type="pdf",
+                attachment_paths=[self.tmp / "missing.jpg"],
+                output_dir=self.tmp / "out",
+                output_filename="extended.pdf",
+                temp_dir=self.tmp / "work",
+                rename_base_to_original=False,
+                incremental=True,
+            )
+        self.assertFalse((self.tmp / "out" / "extended.pdf").exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
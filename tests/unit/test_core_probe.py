@@ -0,0 +1,74 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.core.probe import IMAGE, MISSING, OTHER, PDF, FileProber, MetadataCache, probe_file
+
+
+class TestProbe(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.png = self.tmp / "a.png"
+        Image.new("RGBA", (30, 20)).save(self.png)
+        self.gif = self.tmp / "b.gif"
+        frames = [Image.new("RGB", (8, 8), (i * 100, 0, 0)) for i in range(3)]
+        frames[0].save(self.gif, save_all=True, append_images=frames[1:])
+        self.pdf = self.tmp / "c.pdf"
+        self.pdf.write_bytes(b"%PDF-1.4\n")
+        self.text = self.tmp / "d.txt"
+        self.text.write_text("not an image")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_probe_reads_headers(self):
+        png = probe_file(self.png)
+        self.assertEqual((png.kind, png.format, png.dimensions, png.mode), (IMAGE, "PNG", (30, 20), "RGBA"))
+        self.assertEqual(probe_file(self.gif).frames, 3)
+        self.assertEqual(probe_file(self.pdf).kind, PDF)
+        self.assertEqual(probe_file(self.text).kind, OTHER)
+        self.assertEqual(probe_file(self.tmp / "gone.png").kind, MISSING)
+        self.assertEqual(probe_file(self.tmp).kind, OTHER)
+
+    def test_unchanged_file_is_answered_from_the_previous_probe(self):
+        previous = probe_file(self.png)
+        with patch("src.core.probe.Image.open") as image_open:
+            self.assertIs(probe_file(self.png, previous), previous)
+        image_open.assert_not_called()
+
+        Image.new("RGB", (40, 40)).save(self.png)
+        self.assertEqual(probe_file(self.png, previous).dimensions, (40, 40))
+
+    def test_prober_fills_the_cache_in_the_background(self):
+        cache = MetadataCache()
+        prober = FileProber(cache, workers=4)
+        paths = [self.png, self.gif, self.pdf, self.text, self.png]
+
+        prober.probe(paths)
+        results = []
+        deadline = time.monotonic() + 5
+        while prober.pending and time.monotonic() < deadline:
+            results.extend(prober.drain())
+            time.sleep(0.01)
+        prober.shutdown()
+
+        self.assertEqual({info.path for info in results}, {str(p) for p in paths})
+        self.assertEqual(cache.get(self.gif).frames, 3)
+        self.assertEqual(len(cache), 4)
+
+    def test_cache_is_bounded(self):
+        cache = MetadataCache(max_entries=2)
+        for name in ("a", "b", "c"):
+            cache.put(probe_file(self.tmp / name))
+        self.assertIsNone(cache.get(self.tmp / "a"))
+        self.assertIsNotNone(cache.get(self.tmp / "c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
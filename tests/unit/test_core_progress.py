@@ -0,0 +1,101 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from src.core.converter import process_images_to_pdf
+from src.core.progress import FileStatus, OverallProgress, ProgressChannel
+
+
+class TestProgressChannel(unittest.TestCase):
+
+    def test_updates_are_coalesced(self):
+        channel = ProgressChannel()
+        channel.update_status("a.png", "(Processing)", "blue")
+        channel.update_status("b.png", "(Processing)", "blue")
+        channel.update_status("a.png", "✔", "green")
+        for i in range(1, 4):
+            channel.update_overall_progress(f"{i}/3", i, 3)
+
+        batch = channel.drain()
+        self.assertEqual(batch.statuses, [FileStatus("a.png", "✔", "green"), FileStatus("b.png", "(Processing)", "blue")])
+        self.assertEqual(batch.overall, OverallProgress("3/3", 3, 3))
+        self.assertFalse(channel.drain())
+
+    def test_finished_follows_the_last_status(self):
+        channel = ProgressChannel()
+        for i in range(5):
+            channel.update_status(f"{i}.png", "✔", "green")
+        channel.finish(5, 0)
+
+        first = channel.drain(max_statuses=3)
+        self.assertEqual(len(first.statuses), 3)
+        self.assertIsNone(first.finished)
+        second = channel.drain(max_statuses=3)
+        self.assertEqual([s.path for s in second.statuses], ["3.png", "4.png"])
+        self.assertEqual((second.finished.converted, second.finished.skipped), (5, 0))
+
+    def test_producer_waits_when_full(self):
+        channel = ProgressChannel(max_pending=2)
+        channel.update_status("a.png", "✔", "green")
+        channel.update_status("b.png", "✔", "green")
+        channel.update_status("a.png", "✖", "red") # Coalesced, so it never waits
+
+        producer = threading.Thread(target=channel.update_status, args=("c.png", "✔", "green"))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+
+        self.assertEqual(len(channel.drain(max_statuses=1).statuses), 1)
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual([s.path for s in channel.drain().statuses], ["b.png", "c.png"])
+
+    def test_close_releases_a_waiting_producer(self):
+        channel = ProgressChannel(max_pending=1)
+        channel.update_status("a.png", "✔", "green")
+        producer = threading.Thread(target=channel.update_status, args=("b.png", "✔", "green"))
+        producer.start()
+        channel.close()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+    def test_closed_channel_drops_updates(self):
+        channel = ProgressChannel(max_pending=1)
+        channel.update_status("a.png", "✔", "green")
+        channel.close()
+        channel.update_status("b.png", "✔", "green")
+        channel.update_overall_progress("2/2", 2, 2)
+        channel.finish(2, 0)
+        self.assertTrue(channel.closed)
+        self.assertFalse(channel.drain())
+
+    def test_used_as_converter_callbacks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(3):
+                path = Path(tmp) / f"{i}.png"
+                Image.new("RGB", (8, 8)).save(path)
+                paths.append(str(path))
+
+            channel = ProgressChannel()
+            converted, skipped = process_images_to_pdf(
+                png_paths=paths + [str(Path(tmp) / "missing.png")],
+                output_dir=Path(tmp),
+                output_mode="single",
+                ask_overwrite_callback=MagicMock(),
+                get_new_name_callback=MagicMock(),
+                update_status_callback=channel.update_status,
+                update_overall_progress_callback=channel.update_overall_progress,
+            )
+
+        batch = channel.drain()
+        self.assertEqual([s.status_text for s in batch.statuses], ["✔", "✔", "✔", "✖"])
+        self.assertEqual((converted, skipped), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
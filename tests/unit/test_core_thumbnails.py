@@ -0,0 +1,85 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.core.thumbnails import ThumbnailService, ThumbnailStore
+
+
+def _wait(service):
+    results = {}
+    deadline = time.monotonic() + 5
+    while service.pending and time.monotonic() < deadline:
+        results.update(service.drain())
+        time.sleep(0.01)
+    return results
+
+
+class TestThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.store_path = self.tmp / "thumbs.pack"
+        self.jpg = str(self.tmp / "photo.jpg")
+        Image.new("RGB", (800, 400), "red").save(self.jpg)
+        self.png = str(self.tmp / "logo.png")
+        Image.new("RGBA", (60, 60)).save(self.png)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_thumbnails_are_made_in_the_background(self):
+        service = ThumbnailService(ThumbnailStore(self.store_path))
+        self.assertIsNone(service.get(self.jpg))
+
+        service.request([self.jpg, self.png, str(self.tmp / "missing.png")])
+        results = _wait(service)
+        service.close()
+
+        self.assertEqual(results[self.jpg].size, (30, 15))
+        self.assertEqual(results[self.png].mode, "RGBA")
+        self.assertIsNone(results[str(self.tmp / "missing.png")])
+        self.assertIs(service.get(self.jpg), results[self.jpg])
+
+    def test_store_is_reused_until_the_file_changes(self):
+        first = ThumbnailService(ThumbnailStore(self.store_path))
+        first.request([self.jpg])
+        _wait(first)
+        first.close()
+
+        second = ThumbnailService(ThumbnailStore(self.store_path))
+        with patch("src.core.thumbnails.make_thumbnail") as make_thumbnail:
+            second.request([self.jpg])
+            self.assertEqual(_wait(second)[self.jpg].size, (30, 15))
+        make_thumbnail.assert_not_called()
+
+        Image.new("RGB", (400, 400)).save(self.jpg)
+        os.utime(self.jpg, ns=(time.time_ns(), time.time_ns() + 10**9))
+        second.request([self.jpg])
+        self.assertEqual(_wait(second)[self.jpg].size, (30, 30))
+        second.close()
+
+    def test_store_ignores_a_torn_record_and_compacts(self):
+        store = ThumbnailStore(self.store_path, max_bytes=200)
+        store.put(b"a" * 16, b"x" * 40)
+        with open(self.store_path, "ab") as fp:
+            fp.write(b"b" * 16 + b"\x00\x00")
+
+        store = ThumbnailStore(self.store_path, max_bytes=200)
+        self.assertEqual(store.get(b"a" * 16), b"x" * 40)
+        store.put(b"c" * 16, b"y" * 40)
+        store.put(b"d" * 16, b"z" * 40)
+        store.put(b"e" * 16, b"w" * 40)
+
+        self.assertLessEqual(self.store_path.stat().st_size, 100)
+        self.assertEqual(ThumbnailStore(self.store_path).get(b"e" * 16), b"w" * 40)
+        self.assertIsNone(ThumbnailStore(self.store_path).get(b"a" * 16))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from src.core.watcher import FolderWatcher
+
+
+class TestFolderWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.inbox = self.tmp / "inbox"
+        self.inbox.mkdir()
+        self.batches = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self, paths):
+        self.batches.append(sorted(Path(p).name for p in paths))
+        return {p: "converted" for p in paths}
+
+    def _start(self, **kwargs):
+        options = dict(settle_seconds=0.2, batch_window=0.3, batch_size=10, poll_interval=0.05)
+        options.update(kwargs)
+        watcher = FolderWatcher(self.inbox, self._convert, {".png"}, **options)
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        time.sleep(0.1)
+        return watcher, thread
+
+    def _wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(condition())
+
+    def _check_batches_arrivals(self, use_inotify):
+        (self.inbox / "old.png").write_bytes(b"x")
+        watcher, thread = self._start(use_inotify=use_inotify, batch_size=2)
+        try:
+            for name in ("a.png", "b.png", "c.png", "notes.txt"):
+                (self.inbox / name).write_bytes(b"x")
+            self._wait_for(lambda: sum(map(len, self.batches)) == 3)
+        finally:
+            watcher.stop()
+            thread.join()
+
+        self.assertEqual(self.batches, [["a.png", "b.png"], ["c.png"]])
+        self.assertEqual(watcher.metrics.files_converted, 3)
+        self.assertEqual(watcher.metrics.queue_depth, 0)
+
+    def test_polling_batches_new_files(self):
+        self._check_batches_arrivals(use_inotify=False)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_batches_new_files(self):
+        self._check_batches_arrivals(use_inotify=True)
+
+    def test_waits_for_writes_to_finish(self):
+        watcher, thread = self._start(use_inotify=False, batch_window=0.0)
+        try:
+            path = self.inbox / "scan.png"
+            with open(path, "wb") as fp:
+                for _ in range(6):
+                    fp.write(b"x" * 100)
+                    fp.flush()
+                    time.sleep(0.1)
+                self.assertEqual(self.batches, [])
+            self._wait_for(lambda: self.batches)
+        finally:
+            watcher.stop()
+            thread.join()
+        self.assertEqual(self.batches, [["scan.png"]])
+
+    def test_converted_files_leave_no_state_behind(self):
+        watcher, thread = self._start(use_inotify=False, processed_dir=self.tmp / "done")
+        try:
+            for i in range(5):
+                (self.inbox / f"{i}.png").write_bytes(b"x")
+            self._wait_for(lambda: watcher.metrics.files_converted == 5)
+        finally:
+            watcher.stop()
+            thread.join()
+
+        self.assertEqual(len(list((self.tmp / "done").iterdir())), 5)
+        self.assertEqual((watcher._known, watcher._pending, watcher._ready), ({}, {}, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
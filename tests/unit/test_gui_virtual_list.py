@@ -0,0 +1,22 @@
+import unittest
+
+from src.gui.virtual_list import drop_index, visible_range
+
+
+class TestVirtualListGeometry(unittest.TestCase):
+
+    def test_only_rows_in_view_get_widgets(self):
+        self.assertEqual(visible_range(0, 170, 52, 4, 50_000), (0, 8))
+        self.assertEqual(visible_range(52 * 25_000, 170, 52, 4, 50_000), (24_996, 25_008))
+        self.assertEqual(visible_range(52 * 49_998, 170, 52, 4, 50_000), (49_994, 50_000))
+        self.assertEqual(visible_range(0, 170, 52, 4, 0), (0, 0))
+
+    def test_drop_position(self):
+        self.assertEqual(drop_index(-30, 52, 10), 0)
+        self.assertEqual(drop_index(52 * 3 - 20, 52, 10), 3)
+        self.assertEqual(drop_index(52 * 3 - 30, 52, 10), 2)
+        self.assertEqual(drop_index(52 * 40, 52, 10), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
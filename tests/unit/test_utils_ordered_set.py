@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from src.utils.ordered_set import ADDED, MOVED, REMOVED, RESET, UPDATED, IndexedOrderedSet
+
+
+class TestIndexedOrderedSet(unittest.TestCase):
+
+    def test_matches_a_plain_list(self):
+        rng = random.Random(7)
+        items = IndexedOrderedSet()
+        expected = []
+        for step in range(2000):
+            action = rng.random()
+            if action < 0.5 or not expected:
+                key = f"k{step}"
+                index = rng.randint(0, len(expected))
+                self.assertTrue(items.add(key, key.upper(), index))
+                expected.insert(index, key)
+            elif action < 0.75:
+                key = rng.choice(expected)
+                self.assertTrue(items.discard(key))
+                expected.remove(key)
+            else:
+                key = rng.choice(expected)
+                new_index = rng.randrange(len(expected))
+                items.move(key, new_index)
+                expected.remove(key)
+                expected.insert(new_index, key)
+
+            self.assertEqual(len(items), len(expected))
+            if step % 100 == 0:
+                self.assertEqual(items.keys(), expected)
+                self.assertEqual([items.index(k) for k in expected], list(range(len(expected))))
+                self.assertEqual([items[i] for i in range(len(expected))], [k.upper() for k in expected])
+
+    def test_duplicates_and_missing_keys(self):
+        items = IndexedOrderedSet()
+        self.assertTrue(items.add("a", 1))
+        self.assertFalse(items.add("a", 2))
+        self.assertEqual(items.get("a"), 1)
+        self.assertIn("a", items)
+        self.assertFalse(items.discard("b"))
+        self.assertIsNone(items.get("b"))
+        with self.assertRaises(IndexError):
+            items[1]
+
+    def test_notifications(self):
+        items = IndexedOrderedSet()
+        changes = []
+        items.subscribe(changes.append)
+
+        items.add("a", 1)
+        items.add("b", 2)
+        items.move("b", 0)
+        items.touch("a")
+        items.discard("b")
+        self.assertEqual(
+            [(c.kind, c.key, c.index, c.new_index) for c in changes],
+            [(ADDED, "a", 0, None), (ADDED, "b", 1, None), (MOVED, "b", 1, 0), (UPDATED, "a", 1, None), (REMOVED, "b", 0, None)],
+        )
+
+        changes.clear()
+        with items.batch():
+            items.add("c", 3)
+            items.add("d", 4)
+        with items.batch():
+            items.add("c", 3)
+        self.assertEqual([c.kind for c in changes], [RESET])
+
+
+if __name__ == '__main__':
+    unittest.main()